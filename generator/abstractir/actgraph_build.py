@@ -9,10 +9,10 @@ from actions import *
 from actions_index import ActionsIndex
 from process_concept import ProcessConcept
 from pstree import ProcessTreeConcept
-from pyutils.graph import DirectedGraph
+from pyutils.graph import CsrGraph, DirectedGraph
 
 
-def build_actions_graph(process_tree, resource_types_to_skip=()):
+def build_actions_graph(process_tree, resource_types_to_skip=(), compact=False):
     """ Performs analysis of given process concepts tree and builds up
     a graph of actions, which represents restoration process in terms
     of abstract actions
@@ -24,11 +24,15 @@ def build_actions_graph(process_tree, resource_types_to_skip=()):
            will be skipped; tuple must contain
            types, which are subtypes of ResourceConcept
     :type resource_types_to_skip: tuple[type]
+    :param compact: if True, then graph is stored in compact form (see
+           CsrGraph), it is worth it for large graphs, which are not changed
+           after they are built
     :return: actions graph
-    :rtype: DirectedGraph
+    :rtype: DirectedGraph | CsrGraph
     """
     actions_index = ActionsIndex()
-    actions_graph_proxy = ActionsFilteringGraph(resource_types_to_skip)
+    graph_type = CompactActionsFilteringGraph if compact else ActionsFilteringGraph
+    actions_graph_proxy = graph_type(resource_types_to_skip)
 
     action_index, action_graph = _fill_actions_graph_and_index(process_tree,
                                                                actions_index,
@@ -36,11 +40,14 @@ def build_actions_graph(process_tree, resource_types_to_skip=()):
     _build_all_precedence_edges(process_tree, action_index, action_graph)
     del action_index
 
+    if compact:
+        action_graph.seal()
+
     return action_graph
 
 
-class ActionsFilteringGraph(DirectedGraph):
-    """ This class is a class, which is used to build a graph, it
+class _ActionsFilteringMixin(object):
+    """ Mixin for a graph class, which is used to build a graph, it
     has ability to filter vertices by it's type; This is very helpful
     in case we want to look at the graph manually.
     """
@@ -49,19 +56,19 @@ class ActionsFilteringGraph(DirectedGraph):
         """
         :param vertex_filter_type: tuple of types of actions to be filtered
         """
-        super(ActionsFilteringGraph, self).__init__()
+        super(_ActionsFilteringMixin, self).__init__()
         self._filter_types = vertex_filter_type
 
     def add_vertex(self, vertex):
         if self._is_act_with_resource_types(vertex, self._filter_types):
             return
-        super(ActionsFilteringGraph, self).add_vertex(vertex)
+        super(_ActionsFilteringMixin, self).add_vertex(vertex)
 
     def add_edge(self, v_from, v_to):
         if self._is_act_with_resource_types(v_from, self._filter_types) \
                 or self._is_act_with_resource_types(v_to, self._filter_types):
             return
-        super(ActionsFilteringGraph, self).add_edge(v_from, v_to)
+        super(_ActionsFilteringMixin, self).add_edge(v_from, v_to)
 
     @staticmethod
     def _is_act_with_resource_types(act, r_types):
@@ -70,9 +77,18 @@ class ActionsFilteringGraph(DirectedGraph):
         return False
 
 
+class ActionsFilteringGraph(_ActionsFilteringMixin, DirectedGraph):
+    pass
+
+
+class CompactActionsFilteringGraph(_ActionsFilteringMixin, CsrGraph):
+    pass
+
+
 def _fill_actions_graph_and_index(process_tree, acts_index, acts_graph):
     """ Creates actions index and action graph without edges, but with all
-    action vertices
+    action vertices; Actions are compared by value, so equal actions are one
+    vertex of the graph
 
 
     :type process_tree: ProcessTreeConcept
@@ -85,6 +101,9 @@ def _fill_actions_graph_and_index(process_tree, acts_index, acts_graph):
     actions_generator = actions_gen.gen_actions_vertices(process_tree)
 
     for action in actions_generator:
+        # equal actions describe the same step, it is performed once
+        if action in acts_index:
+            continue
         acts_index.add_action(action)
         acts_graph.add_vertex(action)
 
@@ -1,4 +1,7 @@
 """ High-order actions description
+
+Actions are compared and hashed by value, so structurally identical actions,
+built in different graph building phases, are the same action
 """
 
 import process_concept
@@ -7,11 +10,15 @@ from pyutils.dataclass import DataClass
 
 
 class ForkProcessAction(DataClass):
+    _value_semantics = True
+
     parent = "process, which forks child"  # type: process_concept.ProcessConcept
     child = "child, which is being forked"  # type: process_concept.ProcessConcept
 
 
 class CreateResourceAction(DataClass):
+    _value_semantics = True
+
     process = "process, which creates resource"  # type: process_concept.ProcessConcept
     resource = "resource, which is being created"  # type: resource_concepts.ResourceConcept
     handles = "ist of handles; contains more than one handle " \
@@ -19,6 +26,8 @@ class CreateResourceAction(DataClass):
 
 
 class ShareResourceAction(DataClass):
+    _value_semantics = True
+
     process_from = "process, which has the (resource, handle_from) in it"  # type: process_concept.ProcessConcept
     process_to = "process, with which resource is shared"  # type: process_concept.ProcessConcept
     resource = "resource, which is being shared"  # type: resource_concepts.ResourceConcept
@@ -28,6 +37,8 @@ class ShareResourceAction(DataClass):
 
 
 class RemoveResourceAction(DataClass):
+    _value_semantics = True
+
     process = "process, which executes the action of removing the resource"  # type: process_concept.ProcessConcept
     resource = "resource, handle to which is being removed from the process"  # type: resource_concepts.ResourceConcept
     handle = "handle, which is being released, so (resource, handle) pair " \
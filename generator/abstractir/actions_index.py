@@ -14,6 +14,12 @@ class ActionsIndex(object):
         self._remove_actions = []
         self._obtain_actions = []
         self._obtain_actions_by_proc = {}
+        self._actions = set()
+
+    def __contains__(self, action):
+        """ Checks, if action (or equal one) was added to the index
+        """
+        return action in self._actions
 
     def add_action(self, action):
         if isinstance(action, ForkProcessAction):
@@ -47,6 +53,8 @@ class ActionsIndex(object):
         else:
             raise RuntimeError("unknown action [{}]".format(action))
 
+        self._actions.add(action)
+
     @property
     def obtain_actions(self):
         """
@@ -42,12 +42,14 @@ def init_shared_anon_mem_resources(process_tree, app):
     return shared_mem_files
 
 
-def _construct_pipe_concepts(pipe_files):
+def _construct_pipe_concepts(pipe_files, pipe_data):
     """ Constructs pipe resource concepts; each pipe resource
     contains two pipe files: one for reading and another for writing
     
     :param pipe_files: list of pipe files
     :type pipe_files: list[crdata.PipeFile]
+    :param pipe_data: list of data, buffered in pipes
+    :type pipe_data: list[crdata.PipeData]
     :return: map from pipe ids to pipe concepts
     :rtype: dict[int, PipeConcept]
     """
@@ -63,7 +65,9 @@ def _construct_pipe_concepts(pipe_files):
         else:
             raise RuntimeError("Bad pipe file (not RDONLY or WRONLY")
 
-    pipe_concepts = {id: PipeConcept(PipeResource(id=id, read_end=fs[0], write_end=fs[1]))
+    data_by_pipe = {d.pipe_id: d for d in pipe_data}
+    pipe_concepts = {id: PipeConcept(PipeResource(id=id, read_end=fs[0], write_end=fs[1],
+                                                  data=data_by_pipe.get(id)))
                      for (id, fs) in pipe_resources.iteritems()}
 
     return pipe_concepts
@@ -82,7 +86,7 @@ def init_pipe_resources(process_tree, app):
     """
 
     pipe_files = app.pipe_files
-    pipe_concepts = _construct_pipe_concepts(pipe_files)
+    pipe_concepts = _construct_pipe_concepts(pipe_files, app.pipe_data)
     pipe_files_map = {pf.id: pf for pf in pipe_files}
     raw_processes = app.processes
 
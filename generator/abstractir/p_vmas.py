@@ -32,7 +32,7 @@ def init_shared_vma_resources(process_tree, app, shmem_map, regfile_map):
 
     raw_processes = app.processes
     for p in raw_processes:
-        vmas = [vma for vma in p.vmas if VMA_FLAG_MAP_SHARED in vma.flags]
+        vmas = p.vmas.vmas_at(p.vmas.select(flags=[VMA_FLAG_MAP_SHARED]))
         process_concept = process_tree.proc_by_pid(p.pid)
         _init_vmas_one_process(process_concept, vmas, shmem_map, regfile_map)
 
@@ -73,6 +73,6 @@ def init_private_vma_resources(process_tree, app, regfile_map):
 
     raw_processes = app.processes
     for p in raw_processes:
-        vmas = [vma for vma in p.vmas if VMA_FLAG_MAP_PRIVATE in vma.flags]
+        vmas = p.vmas.vmas_at(p.vmas.select(flags=[VMA_FLAG_MAP_PRIVATE]))
         process_concept = process_tree.proc_by_pid(p.pid)
         _init_vmas_one_process(process_concept, vmas, {}, regfile_map)
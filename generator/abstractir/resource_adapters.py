@@ -15,3 +15,4 @@ class PipeResource(DataClass):
     id = "pipe id"  # type: int
     read_end = "read end of a pipe"  # type: crdata.PipeFile
     write_end = "write end of a pipe"  # type: crdata.PipeFile
+    data = "data, buffered in a pipe, or None"  # type: crdata.PipeData
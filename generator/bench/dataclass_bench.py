@@ -0,0 +1,42 @@
+""" Data class construction: generic constructor versus generated one
+"""
+
+import sys
+import timeit
+
+from crloader import crdata
+from pyutils.dataclass import DataClassMeta
+
+# data class --> keyword arguments to create it with
+CASES = (
+    (crdata.PipeFile, dict(resource_id=("pipe-file", 0, 1), id=1, pipe_id=10, flags=0, fown={})),
+    (crdata.SignalAction, dict(resource_id=("sigaction", 1, 0), action={})),
+    (crdata.Process, dict(resource_id=("process", 1, 0), pid=1, ppid=0, pgid=1, sid=1, thread_cores=[],
+                          core=None, fdt={}, vm_info=None, vmas=None, ids={}, page_map=None, fs=None)),
+)
+
+
+def _measure(cls, kwargs, number, repeat):
+    return min(timeit.repeat(lambda: cls(**kwargs), number=number, repeat=repeat))
+
+
+def main(args):
+    number = int(args[0]) if args else 100000
+    repeat = int(args[1]) if len(args) > 1 else 3
+
+    print("{} instances, best of {}:".format(number, repeat))
+    for cls, kwargs in CASES:
+        generated = _measure(cls, kwargs, number, repeat)
+        generated_init = cls.__init__
+        cls.__init__ = DataClassMeta._hooked_init
+        try:
+            hooked = _measure(cls, kwargs, number, repeat)
+        finally:
+            cls.__init__ = generated_init
+        print("    {:<14} hooked {:.4f}s   generated {:.4f}s   x{:.1f}".format(
+            cls.__name__, hooked, generated, hooked / generated))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,55 @@
+""" Images decoding: pycriu versus crloader.pbdecode
+
+usage: python -m bench.decode_bench IMAGE [repeat]
+"""
+
+import os
+import sys
+import timeit
+
+from pycriu import images
+
+from crloader import loader, pbdecode
+
+PARSERS = {
+    'MM': lambda item: loader._parse_mm(item, pid=0),
+    'PAGEMAP': lambda item: loader._parse_pagemap(item, loader.make_resource_id(loader.RID_PAGEMAP, 0)),
+}
+
+
+def _decode_and_parse(img_path, decode):
+    with open(img_path, "rb") as f:
+        item = decode(f)
+    return PARSERS[item['magic']](item)
+
+
+def main(args):
+    if not args:
+        print(__doc__)
+        return 1
+
+    img_path = args[0]
+    repeat = int(args[1]) if len(args) > 1 else 5
+
+    with open(img_path, "rb") as f:
+        magic = pbdecode.read_magic(f)
+    if magic not in PARSERS:
+        print("Unsupported image: {}, expected one of {}".format(magic, sorted(PARSERS)))
+        return 1
+
+    decoders = [
+        ("pycriu", lambda f: images.load(f, True)),
+        ("pbdecode", pbdecode.load),
+    ]
+
+    print("{} ({}, {} bytes), best of {}:".format(img_path, magic, os.path.getsize(img_path), repeat))
+    timings = {}
+    for name, decode in decoders:
+        timings[name] = min(timeit.repeat(lambda: _decode_and_parse(img_path, decode), number=1, repeat=repeat))
+        print("    {:<10} {:.4f}s".format(name, timings[name]))
+    print("    speedup    {:.1f}x".format(timings["pycriu"] / timings["pbdecode"]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,94 @@
+""" Json images loading: json.load versus crloader.jsonstream
+
+usage: python -m bench.json_bench IMAGE [repeat]
+       python -m bench.json_bench --synthetic NR_ENTRIES [repeat]
+"""
+
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import timeit
+
+from crloader import jsonstream, loader
+
+
+def _parse(item):
+    if item['magic'] == 'MM':
+        return loader._parse_mm(item, pid=0)
+    return loader._parse_pagemap(item, loader.make_resource_id(loader.RID_PAGEMAP, 0))
+
+
+def _load_json(img_path):
+    with open(img_path, "r") as f:
+        return _parse(json.load(f))
+
+
+def _load_streamed(img_path):
+    nested = loader.STREAMED_JSON_IMAGES["mm-"] if "mm-" in os.path.basename(img_path) else ()
+    return _parse(jsonstream.load(open(img_path, "rb"), nested))
+
+
+def _run_method(method, img_path, repeat, results):
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    elapsed = min(timeit.repeat(lambda: method(img_path), number=1, repeat=repeat))
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((elapsed, rss_after - rss_before))
+
+
+def _measure(method, img_path, repeat):
+    """
+    :return: (best time in seconds, peak memory growth in KiB)
+    """
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_method, args=(method, img_path, repeat, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def _write_synthetic_pagemap(nr_entries):
+    """ Writes pretty printed pagemap json image with given number of entries
+    (in the same format as `crit decode --pretty` does)
+
+    :return: path to the image
+    """
+    fd, img_path = tempfile.mkstemp(prefix="pagemap-", suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        f.write('{\n    "magic": "PAGEMAP",\n    "entries": [\n        {\n            "pages_id": 1\n        }')
+        for i in xrange(nr_entries):
+            f.write(',\n        {{\n            "vaddr": "0x{:x}",\n            "nr_pages": 1,\n'
+                    '            "flags": "PE_PRESENT"\n        }}'.format(0x400000 + i * 0x2000))
+        f.write('\n    ]\n}\n')
+    return img_path
+
+
+def main(args):
+    if not args:
+        print(__doc__)
+        return 1
+
+    synthetic = args[0] == "--synthetic"
+    if synthetic:
+        args = args[1:]
+        img_path = _write_synthetic_pagemap(int(args[0]))
+    else:
+        img_path = args[0]
+    repeat = int(args[1]) if len(args) > 1 else 3
+
+    try:
+        print("{} ({} bytes), best of {}:".format(img_path, os.path.getsize(img_path), repeat))
+        for name, method in (("json.load", _load_json), ("jsonstream", _load_streamed)):
+            elapsed, memory = _measure(method, img_path, repeat)
+            print("    {:<12} {:.4f}s   peak memory +{:.1f} MiB".format(name, elapsed, memory / 1024.0))
+    finally:
+        if synthetic:
+            os.remove(img_path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,104 @@
+""" Application pickling: compact tuple state versus state with field names
+"""
+
+import cPickle as pickle
+import sys
+import timeit
+
+from crloader import crdata
+from crloader.pagemap import PageMapEntries
+from crloader.vmtable import VmAreaTable
+from pyutils.dataclass import DataClass
+
+NR_VMAS = 64
+NR_FILES = 16
+NR_SIGACTIONS = 64
+NR_PAGEMAP_ENTRIES = 256
+
+
+def _restore_named(cls, state):
+    obj = cls.__new__(cls)
+    for field, value in state.iteritems():
+        object.__setattr__(obj, field, value)
+    return obj
+
+
+def _reduce_named(self):
+    return _restore_named, (type(self), {field: getattr(self, field) for field in self._fields})
+
+
+# signal action payload, which is interned by the loader (shared by all processes)
+SIGACTION = dict(sigaction=0, flags=0, restorer=0, mask=0, compat_sigaction=False)
+
+
+def _make_process(pid, files):
+    sigactions = [crdata.SignalAction(resource_id=("sigaction", pid, i), action=SIGACTION)
+                  for i in xrange(NR_SIGACTIONS)]
+    core = crdata.ProcessCore(resource_id=("task-core", pid, 0), task_state=1, exit_code=0, personality=0,
+                              flags=0x400000, blk_sigset=0, comm="worker-{}".format(pid), timers=None,
+                              rlimits=None, cg_set=1, signals_s=None, loginuid=1000, oom_score_adj=0,
+                              sigactions=sigactions)
+    thread_core = crdata.ThreadCore(resource_id=("thread-core", pid, 0), thread_id=pid, mtype="X86_64",
+                                    thread_info={"gpregs": {"ip": 0x400000 + pid}}, thread_core={"creds": {}})
+
+    vmas = VmAreaTable(pid)
+    entries = PageMapEntries()
+    for i in xrange(NR_VMAS):
+        start = 0x400000 + i * 0x100000
+        vmas.append(start, start + 0x10000, 0, 0, 3, 0x22, 0x201, -1)
+    for i in xrange(NR_PAGEMAP_ENTRIES):
+        entries.append(0x400000 + i * 0x40000, 4, 1)
+    page_map = crdata.PageMap(resource_id=("pagemap", pid, 0), pages_id=pid, maps=entries, parent=None)
+
+    vm_info = crdata.VmInfo(resource_id=("vm-info", pid, 0), arg_start=0, arg_end=0, brk=0, env_start=0,
+                            env_end=0, code_start=0, code_end=0, data_start=0, data_end=0, brk_start=0,
+                            stack_start=0, dumpable=True, exe_file_id=files[0].id, saved_auxv=[0] * 32)
+    fs = crdata.FSProps(resource_id=("fs", pid, 0), cwd_id=files[0].id, root_id=files[1].id, umask=0o22)
+
+    return crdata.Process(resource_id=("process", pid, 0), pid=pid, ppid=max(pid - 1, 0), pgid=1, sid=1,
+                          thread_cores=[thread_core], core=core, fdt={fd: f.id for fd, f in enumerate(files)},
+                          vm_info=vm_info, vmas=vmas, ids={}, page_map=page_map, fs=fs)
+
+
+def make_application(nr_processes):
+    """
+    :rtype: crdata.Application
+    """
+    files = [crdata.RegFile(resource_id=("reg-file", 0, i), id=i, path="/usr/lib/lib{}.so".format(i),
+                            size=4096 * i, pos=0, flags=0, mode=0o644) for i in xrange(NR_FILES)]
+    processes = [_make_process(pid, files) for pid in xrange(1, nr_processes + 1)]
+    return crdata.Application(processes=processes, regular_files=files, pipe_files=[], pipe_data=[],
+                              shared_anon_mem=[])
+
+
+def _measure(app, repeat):
+    data = pickle.dumps(app, pickle.HIGHEST_PROTOCOL)
+    dump_time = min(timeit.repeat(lambda: pickle.dumps(app, pickle.HIGHEST_PROTOCOL), number=1, repeat=repeat))
+    load_time = min(timeit.repeat(lambda: pickle.loads(data), number=1, repeat=repeat))
+    return len(data), dump_time, load_time
+
+
+def main(args):
+    nr_processes = int(args[0]) if args else 1000
+    repeat = int(args[1]) if len(args) > 1 else 3
+
+    app = make_application(nr_processes)
+    compact = _measure(app, repeat)
+    tuple_reduce = DataClass.__reduce__
+    DataClass.__reduce__ = _reduce_named
+    try:
+        named = _measure(app, repeat)
+    finally:
+        DataClass.__reduce__ = tuple_reduce
+
+    print("Application of {} processes, best of {}:".format(nr_processes, repeat))
+    for name, (size, dump_time, load_time) in (("named", named), ("compact", compact)):
+        print("    {:<8} {:>6.1f} MB   dump {:.3f}s ({:.1f} MB/s)   load {:.3f}s ({:.1f} MB/s)".format(
+            name, size / 1e6, dump_time, size / 1e6 / dump_time, load_time, size / 1e6 / load_time))
+    print("    size x{:.2f}   dump x{:.2f}   load x{:.2f}".format(
+        float(named[0]) / compact[0], named[1] / compact[1], named[2] / compact[2]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
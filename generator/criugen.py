@@ -6,7 +6,7 @@ import sys
 from itertools import chain
 
 from abstractir.resource_concepts import *
-from crloader import loader
+from crloader import convert, loader, snapshot
 from crloader.crdata import Application
 from pyutils.cmdargs import ArgParserBuilder
 
@@ -23,31 +23,47 @@ def main(args):
                    print_help_parser=root_cmd_parser)
 
     # parsing specific for command arguments
-    cmd_parser, processor_callback = child_parsers_dict[cmd_args.command]
+    cmd_parser, processor_callback, images_to_skip = child_parsers_dict[cmd_args.command]
     args = cmd_parser.parse_args(args[1:])
 
-    # each command has obligatory argument
-    dump_dir = args.dump_dir
-    is_json_img = args.json_img
-
-    # loading application, which is needed by every command
-    if is_json_img:
-        application = loader.load_from_jsons(dump_dir)
-    else:
-        application = loader.load_from_imgs(dump_dir)
-
-    # invoking command-special processor
     try:
+        # loading application (only images, which are needed by the command)
+        skip = images_to_skip(args)
+        application = load_application(args, skip=skip) if skip is not None else None
+
+        # invoking command-special processor
         processor_callback(application, args)
     except BadCommandInput as e:
         exit_error(e.message, print_help_parser=cmd_parser)
 
 
+def load_application(args, skip=()):
+    """ Loads application from the dump accordingly to common
+    command arguments
+
+    :param args: parsed command line arguments
+    :param skip: families of images, which are not needed (see loader.load)
+    :rtype: Application
+    """
+    cache = None
+    if args.cache_dir is not None:
+        cache = snapshot.SnapshotCache(args.cache_dir, max_size=args.cache_size * 1024 ** 2)
+
+    # processes are not loaded lazily: every command builds the process tree concept,
+    # which reads all process fields
+    load_options = dict(workers=args.workers, cache=cache, skip=skip)
+    if args.json_img:
+        return loader.load_from_jsons(args.dump_dir, **load_options)
+    return loader.load_from_imgs(args.dump_dir, **load_options)
+
+
 def build_parsers():
     """ Builds parsers for criugen command line utility:
         * top level parser to parse root command
-        * dictionary from command name to corresponding command arguments parser and callback
-          function, to run after argument parsing procedure is done
+        * dictionary from command name to corresponding command arguments parser, callback
+          function, to run after argument parsing procedure is done, and function, which
+          returns families of images not needed by the command (see loader.load) or None,
+          if command does not need application to be loaded
     :return:
     """
     # all available top level commands
@@ -55,6 +71,7 @@ def build_parsers():
     generate_actions_command = "actions-ir"
     draw_graph_command = "actions-graph"
     draw_pstree_command = "pstree"
+    convert_command = "convert"
 
     command_parser = ArgParserBuilder().raw_help() \
         .argument("command",
@@ -64,6 +81,7 @@ def build_parsers():
                        "    * {} -- generate list of abstract intermediate actions\n".format(generate_actions_command) +
                        "    * {} -- render IR actions graph\n".format(draw_graph_command) +
                        "    * {} -- render process tree graph\n".format(draw_pstree_command) +
+                       "    * {} -- convert dump images to json\n".format(convert_command) +
                        "\n"
                        "You can see help for each of any command:\n"
                        "    ./criugen.py <command> -h") \
@@ -72,10 +90,25 @@ def build_parsers():
     # common parser for every command
     root_parser = ArgParserBuilder().no_help() \
         .description('Process tree restoration program generator') \
-        .argument('-d', '--dump_dir', help="Path to process dump images directory", required=True) \
+        .argument('-d', '--dump_dir',
+                  help="Path to process dump images directory or to tar archive "
+                       "(.tar, .tar.gz, .tar.bz2, .tar.zst) with them",
+                  required=True) \
         .argument('--json_img', help="If set, then program parses process dump as json files",
                   default=False,
                   action='store_true') \
+        .argument('-j', '--workers',
+                  help="Number of worker processes to decode process images with",
+                  type=int,
+                  default=1) \
+        .argument('--cache_dir',
+                  help="Directory to cache loaded dumps in; cached dump is reused "
+                       "until any of it's images is changed",
+                  default=None) \
+        .argument('--cache_size',
+                  help="Max size of the dumps cache directory in megabytes",
+                  type=int,
+                  default=snapshot.DEFAULT_MAX_CACHE_SIZE // 1024 ** 2) \
         .build()
 
     # generate program command parser
@@ -107,10 +140,27 @@ def build_parsers():
         .program("{} {}".format(PROGRAM_NAME, draw_pstree_command)) \
         .build()
 
-    return command_parser, {generate_program_command: (gen_program_cmd_parser, run_generate_final_commands),
-                            generate_actions_command: (actions_cmd_parser, run_generate_intermediate_actions),
-                            draw_graph_command: (draw_graph_cmd_parser, run_draw_actions_graph),
-                            draw_pstree_command: (draw_pstree_cmd_parser, run_draw_pstree_graph)}
+    # dump conversion command parser
+    convert_cmd_parser = build_convert_cmd_pb() \
+        .parent(root_parser) \
+        .program("{} {}".format(PROGRAM_NAME, convert_command)) \
+        .build()
+
+    return command_parser, {generate_program_command: (gen_program_cmd_parser,
+                                                       run_generate_final_commands,
+                                                       skip_no_images),
+                            generate_actions_command: (actions_cmd_parser,
+                                                       run_generate_intermediate_actions,
+                                                       skip_no_images),
+                            draw_graph_command: (draw_graph_cmd_parser,
+                                                 run_draw_actions_graph,
+                                                 skip_not_rendered_images),
+                            draw_pstree_command: (draw_pstree_cmd_parser,
+                                                  run_draw_pstree_graph,
+                                                  skip_not_rendered_images),
+                            convert_command: (convert_cmd_parser,
+                                              run_convert_dump,
+                                              skip_all_images)}
 
 
 def build_generate_program_cmd_pb():
@@ -122,6 +172,20 @@ def build_generate_program_cmd_pb():
                        "printed to stdout")
 
 
+def build_convert_cmd_pb():
+    return ArgParserBuilder() \
+        .description('Converts dump images to json images (as `crit decode --pretty` does) '
+                     'using worker processes (see -j option)') \
+        .argument('-o', '--output_dir',
+                  help="Directory to write json images to",
+                  required=True) \
+        .argument('--format',
+                  help="Output format: {} (pretty printed) or {} (without whitespaces, "
+                       "faster to write and to load)".format(*convert.FORMATS),
+                  choices=convert.FORMATS,
+                  default=convert.FORMAT_JSON)
+
+
 def build_generate_actions_cmd_pb():
     return ArgParserBuilder() \
         .description('Generates intermediate program representation -- list of abstract actions') \
@@ -213,6 +277,11 @@ def build_draw_graph_cmd_pb():
         .argument('--cluster_by_depth',
                   help="If set, then actions are clustered by 'depth'\n",
                   default=False,
+                  action='store_true') \
+        .argument('--compact_graph',
+                  help="If set, then actions graph is stored in compact form,\n"
+                       "which needs less memory for large graphs\n",
+                  default=False,
                   action='store_true')
 
 
@@ -241,6 +310,37 @@ def get_resources_types_to_skip(skipped_type_names, keep_type_names):
     return tuple(SUPPORTED_APP_RESOURCES_DICT[n][0] for n in (all_type_names - (keep - skip)))
 
 
+# family of process images --> resource types, which rendering depends on these images;
+# images are not needed only if none of these resources is rendered: files and shared
+# memory, which are only mapped, get into processes as dependencies of VMAs
+IMAGES_RESOURCES_DICT = {
+    loader.IMAGES_VMAS: (VMAConcept, RegularFileConcept, SharedMemConcept),
+    loader.IMAGES_PRIVATE: (ProcessInternalsConcept,)
+}
+
+
+def skip_no_images(arguments):
+    """ Images requirement of commands, which need the whole application
+    """
+    return ()
+
+
+def skip_all_images(arguments):
+    """ Images requirement of commands, which work with images directly
+    """
+    return None
+
+
+def skip_not_rendered_images(arguments):
+    """ Images requirement of visualization commands: images of resources,
+    which are not going to be rendered, are not needed
+    """
+    check_resources_keywords_list(chain(arguments.skip, arguments.keep))
+    resource_types_to_skip = set(get_resources_types_to_skip(arguments.skip, arguments.keep))
+    return tuple(family for family, resource_types in sorted(IMAGES_RESOURCES_DICT.iteritems())
+                 if resource_types_to_skip.issuperset(resource_types))
+
+
 class BadCommandInput(RuntimeError):
     """ Exception, thrown in case command input is wrong
     """
@@ -296,6 +396,24 @@ def run_generate_intermediate_actions(application, arguments):
     raise RuntimeError("This feature is coming soon ;)")
 
 
+def run_convert_dump(application, arguments):
+    """ Converts dump images to json images and reports conversion throughput
+
+    :param application: not used (None)
+    :param arguments: parsed command line arguments
+    """
+
+    def report_image(image_name, input_size, output_size, error):
+        if error is not None:
+            print("{}: {}".format(image_name, error), file=sys.stderr)
+
+    stats = convert.convert_dump(arguments.dump_dir, arguments.output_dir,
+                                 workers=arguments.workers,
+                                 output_format=arguments.format,
+                                 on_image=report_image)
+    print("Converted: {}".format(stats))
+
+
 def check_resources_keywords_list(resources):
     unknown_resources = set(resources) - set(SUPPORTED_APP_RESOURCES_DICT.keys())
     if unknown_resources:
@@ -337,7 +455,7 @@ def run_draw_actions_graph(application, arguments):
     vis_opts = parse_common_visualize_options(arguments)
     process_tree = build_concept_process_tree(application)
     resource_types_to_skip = get_resources_types_to_skip(arguments.skip, arguments.keep)
-    graph = build_actions_graph(process_tree, tuple(resource_types_to_skip))
+    graph = build_actions_graph(process_tree, tuple(resource_types_to_skip), compact=arguments.compact_graph)
 
     print("Graph built.")
     print("Total vertices = {}".format(graph.vertex_num))
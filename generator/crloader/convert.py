@@ -0,0 +1,141 @@
+""" Conversion of binary dump images to json images
+
+Images are decoded the same way as `crit decode --pretty` does, so converted
+dump can be loaded with json image type. Images are converted in parallel by
+the pool of worker processes, every worker holds only one image at a time.
+"""
+
+import json
+import multiprocessing
+import os
+import time
+
+import dumpsource
+
+try:
+    from pycriu import images
+    import pbdecode
+except ImportError:
+    images = None
+
+# output formats
+FORMAT_JSON = "json"  # pretty printed, as crit makes it
+FORMAT_COMPACT = "compact"  # same values, but without whitespaces; faster to write and to read
+FORMATS = (FORMAT_JSON, FORMAT_COMPACT)
+
+# dump source of the worker process (see `_init_worker`)
+_worker_source = None
+
+
+def _require_pycriu():
+    if images is None:
+        raise RuntimeError("pycriu package is required to convert images")
+
+
+def _init_worker(source):
+    global _worker_source
+    _worker_source = source
+
+
+def _convert_image(source, image_name, output_path, output_format):
+    """ Broken image is not converted, but the error is returned, so other
+    images are converted anyway
+
+    :return: (image name, input size, output size, error message or None)
+    """
+    input_size = source.image_size(image_name, "img")
+    with source.open_image(image_name, "img") as f:
+        try:
+            item = pbdecode.load_pretty(f)
+        except images.MagicException as exc:
+            return image_name, input_size, 0, "incorrect magic {}".format(exc)
+        except ValueError as exc:
+            return image_name, input_size, 0, str(exc)
+
+    with open(output_path, "w") as out:
+        if output_format == FORMAT_COMPACT:
+            json.dump(item, out, separators=(',', ':'))
+        else:
+            json.dump(item, out, indent=4)
+    return image_name, input_size, os.path.getsize(output_path), None
+
+
+def _convert_image_in_worker(args):
+    return _convert_image(_worker_source, *args)
+
+
+class ConversionStats(object):
+    """ Conversion results
+    """
+
+    def __init__(self):
+        self.images = 0
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.seconds = 0.0
+        self.errors = []  # (image name, error message) pairs
+
+    @property
+    def throughput(self):
+        """
+        :return: input megabytes per second
+        """
+        return self.input_bytes / 1024.0 ** 2 / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return "{} images, {:.1f} MiB -> {:.1f} MiB in {:.2f}s ({:.1f} MiB/s), {} errors".format(
+            self.images, self.input_bytes / 1024.0 ** 2, self.output_bytes / 1024.0 ** 2,
+            self.seconds, self.throughput, len(self.errors))
+
+
+def convert_dump(source_path, output_dir, workers=1, output_format=FORMAT_JSON, on_image=None):
+    """ Converts all images of the dump (except for raw pages images) to json
+
+    :param source_path: path to images directory or to tar archive with images
+    :param output_dir: directory to write json images to; created if not exists
+    :param workers: number of worker processes to decode images with
+    :param output_format: one of FORMATS
+    :param on_image: function, which is called with (image name, input size, output size,
+           error) after every image is converted
+    :return: conversion results; Images, which can't be decoded (truncated or corrupt
+             ones), are not converted, but reported in errors
+    :rtype: ConversionStats
+    """
+    _require_pycriu()
+    if output_format not in FORMATS:
+        raise ValueError("Unknown output format {}".format(output_format))
+
+    source = dumpsource.open_dump(source_path)
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    image_names = [n for n in source.image_names("img") if not n.startswith(dumpsource.SKIPPED_IMAGE_PREFIXES)]
+    # biggest images go first, so workers finish at the same time
+    image_names.sort(key=lambda n: source.image_size(n, "img"), reverse=True)
+    tasks = [(n, os.path.join(output_dir, "{}.json".format(n)), output_format) for n in image_names]
+
+    stats = ConversionStats()
+    start = time.time()
+    if workers <= 1:
+        results = (_convert_image(source, *t) for t in tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes=workers, initializer=_init_worker, initargs=(source,))
+        results = pool.imap_unordered(_convert_image_in_worker, tasks)
+
+    try:
+        for image_name, input_size, output_size, error in results:
+            stats.images += 1
+            stats.input_bytes += input_size
+            stats.output_bytes += output_size
+            if error is not None:
+                stats.errors.append((image_name, error))
+            if on_image is not None:
+                on_image(image_name, input_size, output_size, error)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    stats.seconds = time.time() - start
+    return stats
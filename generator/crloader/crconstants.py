@@ -19,5 +19,61 @@ VMA_FLAG_MAP_ANON = 'MAP_ANON'
 VMA_FLAG_MAP_GROWSDOWN = 'MAP_GROWSDOWN'
 VMA_FLAG_MAP_SHARED = 'MAP_SHARED'
 
+# (name, bit) pairs for VMA prot, flags and status fields; bit values
+# are the same as in the raw (not pretty decoded) images
+VMA_PROT_FLAGS = (
+    ('PROT_READ', 0x1),
+    ('PROT_WRITE', 0x2),
+    ('PROT_EXEC', 0x4),
+)
+
+VMA_MAP_FLAGS = (
+    (VMA_FLAG_MAP_SHARED, 0x1),
+    (VMA_FLAG_MAP_PRIVATE, 0x2),
+    (VMA_FLAG_MAP_ANON, 0x20),
+    (VMA_FLAG_MAP_GROWSDOWN, 0x100),
+)
+
+VMA_STATUS_FLAGS = (
+    (VMA_STATUS_AREA_REGULAR, 1 << 0),
+    ('VMA_AREA_STACK', 1 << 1),
+    (VMA_STATUS_AREA_VSYSCALL, 1 << 2),
+    (VMA_STATUS_AREA_VDSO, 1 << 3),
+    ('VMA_FORCE_READ', 1 << 4),
+    ('VMA_AREA_HEAP', 1 << 5),
+    (VMA_STATUS_FILE_PRIVATE, 1 << 6),
+    (VMA_STATUS_FILE_SHARED, 1 << 7),
+    (VMA_STATUS_ANON_SHARED, 1 << 8),
+    (VMA_STATUS_ANON_PRIVATE, 1 << 9),
+    ('VMA_AREA_SYSVIPC', 1 << 10),
+    ('VMA_AREA_SOCKET', 1 << 11),
+    (VMA_STATUS_AREA_VVAR, 1 << 12),
+    ('VMA_AREA_AIORING', 1 << 13),
+    ('VMA_UNSUPP', 1 << 31),
+)
+
 FILE_WRONLY_FLAG = 0x1
 FILE_RDONLY_FLAG = 0x0
+# access mode bits of file open flags (O_ACCMODE)
+FILE_ACCMODE_MASK = 0x3
+
+PAGE_SIZE = 4096
+
+# pagemap entry flags
+PE_PARENT = 0x1
+PE_LAZY = 0x2
+PE_PRESENT = 0x4
+# not a CRIU flag: present pages, which are all zeros (see pages.annotate_zero_pages)
+PE_ZERO = 0x100
+# not a CRIU flag: pages, which are equal to the pages of the parent process
+# at the same address, so they are inherited on fork (see pages.annotate_cow_pages)
+PE_COW = 0x200
+# not a CRIU flag: pages of private file mappings, which are equal to the contents
+# of the file, so they are restored by mapping the file (see pages.annotate_file_pages)
+PE_FILE = 0x400
+
+PAGEMAP_FLAGS = (
+    ('PE_PARENT', PE_PARENT),
+    ('PE_LAZY', PE_LAZY),
+    ('PE_PRESENT', PE_PRESENT),
+)
@@ -23,7 +23,7 @@ class Process(Resource):
     core = """task core info"""  # type: ProcessCore
     fdt = """file descriptor table: map from file descriptor to file id"""  # type: dict
     vm_info = """global vm info (start and end addresses of segments and other stuff)"""
-    vmas = """array of VmArea structures, describing mappings in process vm"""  # type: list[VmArea]
+    vmas = """table of VMAs, describing mappings in process vm"""  # type: vmtable.VmAreaTable
     ids = """various ids for process like it's namespace ids"""
     page_map = """map of pages to fill in target process VM"""
     fs = """file system properties"""
@@ -85,6 +85,19 @@ class PipeFile(File):
     fown = """file owner props"""
 
 
+class PipeData(Resource):
+    """
+    Data, buffered in the pipe at dump time; Data itself is not loaded,
+    only its location in the pipes-data image is stored
+    """
+    pipe_id = """id of the pipe (see PipeFile.pipe_id)"""
+    pipe_size = """pipe buffer size (F_GETPIPE_SZ) or None if it is the default one"""
+    image_path = """absolute path to the image, which stores the data, or None if data can't
+                    be spliced from the dump (json images and archives)"""
+    offset = """offset of the data in the image file (None if image_path is None)"""
+    length = """length of the data in bytes"""
+
+
 class VmInfo(Resource):
     """
     Virtual process memory global map
@@ -125,7 +138,10 @@ class PageMap(Resource):
     Map of pages to fill in a target process address space
     """
     pages_id = """id to identify file, where raw pages are stored"""
-    maps = """list of entries { "vaddr": ..., "nr_pages": ... }"""
+    maps = """pagemap entries (see pagemap.PageMapEntries)"""
+    parent = """page map of the same memory in the parent dump, pages of entries
+    with PE_PARENT flag are stored there (None if there are no such entries or
+    dump is not incremental one); see pagechain module"""
 
 
 class SharedAnonMem(Resource):
@@ -139,11 +155,9 @@ class SharedAnonMem(Resource):
 
 
 class SignalAction(Resource):
-    sigaction = """signal action"""
-    flags = """flags"""
-    restorer = """restorer"""
-    mask = """signal mask"""
-    compat_sigaction = "TODO"
+    action = """dict with signal action payload: sigaction, flags, restorer, mask and
+    compat_sigaction; Payload is interned, so equal actions of all processes share
+    one dict (see interning module), it must not be mutated"""
 
 
 class FSProps(Resource):
@@ -159,4 +173,5 @@ class Application(DataClass):
     processes = """list of processes"""  # type: list[Process]
     regular_files = """list of regular files"""  # type: list[RegFile]
     pipe_files = """list of pipes"""  # type: list[PipeFile]
+    pipe_data = """list of buffered pipe data"""  # type: list[PipeData]
     shared_anon_mem = """list of shared anonymous memory files"""  # type: list[SharedAnonMem]
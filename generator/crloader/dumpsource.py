@@ -0,0 +1,440 @@
+""" Sources of dump images
+
+Dump may be a directory with images or a tar archive with them, possibly
+compressed (gzip, bzip2 or zstd; zstd requires `zstandard` package). Archive
+is never extracted: plain archive is memory mapped and members are read right
+from it; Compressed archive is read in one streaming pass, where images are
+decompressed into memory, except for pages images, which are decompressed
+only when they are mapped (see `DumpArchive.map_image`).
+"""
+
+import mmap
+import os
+import stat
+import tarfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+GZIP_TAR_EXTENSIONS = (".tar.gz", ".tgz")
+BZIP2_TAR_EXTENSIONS = (".tar.bz2", ".tbz2")
+TAR_EXTENSIONS = (".tar",) + GZIP_TAR_EXTENSIONS + BZIP2_TAR_EXTENSIONS
+ZSTD_TAR_EXTENSIONS = (".tar.zst", ".tar.zstd", ".tzst")
+PLAIN_TAR_EXTENSIONS = (".tar",)
+
+# prefixes of images, which are never read by the loader (only page contents
+# analysis reads them, see pagechain module)
+SKIPPED_IMAGE_PREFIXES = ("pages-",)
+
+# link to the previous (parent) dump in incremental dump directory
+PARENT_LINK = "parent"
+
+
+def is_archive(path):
+    """
+    :return: True if path looks like a path to the dump archive
+    """
+    return path.endswith(TAR_EXTENSIONS + ZSTD_TAR_EXTENSIONS)
+
+
+def open_dump(path):
+    """ Creates dump source for the dump directory or archive
+
+    :param path: path to images directory or to archive with images
+    :rtype: DumpDirectory | DumpArchive
+    """
+    if not os.path.exists(path):
+        raise RuntimeError("Images path [{}] does not exists".format(path))
+    if os.path.isfile(path) and is_archive(path):
+        return DumpArchive(path)
+    return DumpDirectory(path)
+
+
+def _image_file_name(image_name, image_type):
+    return "{}.{}".format(image_name, image_type)
+
+
+def _split_image_file_name(file_name, image_type):
+    """
+    :return: image name or None if file is not an image of given type
+    """
+    suffix = ".{}".format(image_type)
+    if not file_name.endswith(suffix):
+        return None
+    return file_name[:-len(suffix)]
+
+
+class ImageData(object):
+    """ Read only data of the whole image (see `map_image` of dump sources);
+    It must be closed, when it is not needed anymore
+    """
+
+    def __init__(self, data, mapping=None):
+        """
+        :param data: buffer or string with the image data
+        :param mapping: memory mapping, which is closed together with the data
+        """
+        self.data = data
+        self._mapping = mapping
+
+    def close(self):
+        if self._mapping is not None:
+            self._mapping.close()
+        self.data = self._mapping = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class _ListdirEntry(object):
+    """ Directory entry with the same interface as scandir.DirEntry (the
+    part of it, which is used here) for platforms without scandir
+    """
+    __slots__ = ("name", "path", "_stat")
+
+    def __init__(self, dir_path, name):
+        self.name = name
+        self.path = os.path.join(dir_path, name)
+        self._stat = None
+
+    def stat(self):
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+    def is_file(self):
+        return stat.S_ISREG(self.stat().st_mode)
+
+    def is_dir(self):
+        return stat.S_ISDIR(self.stat().st_mode)
+
+
+def _scan_dir(path):
+    """
+    :return: entries of the directory (see scandir.DirEntry)
+    """
+    if scandir is not None:
+        return list(scandir(path))
+    return [_ListdirEntry(path, name) for name in os.listdir(path)]
+
+
+class DumpDirectory(object):
+    """ Dump images, which are stored as files in the directory; Directory
+    is scanned only once (on first access to images) and all lookups are
+    done with that index, so no file system requests are made to find out,
+    whether image exists, and dump on network file system is loaded fast
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self._index = None
+        self._parent = None
+
+    @property
+    def _entries(self):
+        """
+        :return: file name --> directory entry
+        """
+        if self._index is None:
+            self._index = {e.name: e for e in _scan_dir(self.path)}
+        return self._index
+
+    def _image_entry(self, image_name, image_type):
+        """
+        :return: directory entry of the image file or None if there is no such image
+        """
+        entry = self._entries.get(_image_file_name(image_name, image_type))
+        if entry is None or not entry.is_file():
+            return None
+        return entry
+
+    def image_names(self, image_type):
+        """
+        :param image_type: image extension
+        :return: sorted names (without extension) of all images of given type
+        :rtype: list[str]
+        """
+        # images are found by names only, entries are not stat'ed here (they
+        # are stat'ed by `_image_entry`, when image is opened)
+        names = (_split_image_file_name(f, image_type) for f in self._entries)
+        return sorted(n for n in names if n is not None)
+
+    def image_size(self, image_name, image_type):
+        """
+        :return: size of the image file in bytes or None if there is no such image
+        """
+        entry = self._image_entry(image_name, image_type)
+        return None if entry is None else entry.stat().st_size
+
+    def open_image(self, image_name, image_type):
+        """
+        :param image_name: image name without extension (e.g. core-1)
+        :param image_type: image extension
+        :return: image file opened in binary mode or None if there is no such image
+        """
+        entry = self._image_entry(image_name, image_type)
+        if entry is None:
+            return None
+        return open(entry.path, "rb")
+
+    def map_image(self, image_name, image_type):
+        """ Zero copy access to the image data (e.g. to pages images)
+
+        :return: memory mapped image or None if there is no such image
+        :rtype: ImageData
+        """
+        entry = self._image_entry(image_name, image_type)
+        if entry is None:
+            return None
+        with open(entry.path, "rb") as f:
+            f.seek(0, 2)
+            if f.tell() == 0:
+                return ImageData("")
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return ImageData(mapping, mapping)
+
+    def stat_images(self, image_type):
+        """ Describes dump state, so it can be fingerprinted
+
+        :return: sorted list of (file name, size, modification time) of images;
+                 images, which are never read by the loader, are not included
+        """
+        stats = []
+        for name in self.image_names(image_type):
+            if name.startswith(SKIPPED_IMAGE_PREFIXES):
+                continue
+            entry = self._image_entry(name, image_type)
+            if entry is None:
+                continue
+            st = entry.stat()
+            stats.append((entry.name, st.st_size, st.st_mtime))
+        return stats
+
+    def image_path(self, image_name, image_type):
+        """
+        :return: path to the image file (which may not exist)
+        """
+        return os.path.join(self.path, _image_file_name(image_name, image_type))
+
+    def parent(self):
+        """ Incremental dump (made after pre-dump) refers to the previous
+        dump with `parent` symlink
+
+        :return: parent dump or None if this dump is not incremental one
+        :rtype: DumpDirectory
+        """
+        if self._parent is None:
+            entry = self._entries.get(PARENT_LINK)
+            if entry is None or not entry.is_dir():
+                return None
+            # parent is created once, so its directory is scanned once too
+            self._parent = DumpDirectory(os.path.realpath(entry.path))
+        return self._parent
+
+    def __repr__(self):
+        return "DumpDirectory({})".format(self.path)
+
+
+class _MemberFile(object):
+    """ Read only file object over the archive member data
+    """
+
+    def __init__(self, data, offset, size):
+        """
+        :param data: memory mapped archive or data of the member
+        :param offset: offset of the member data in the `data`
+        :param size: size of the member data
+        """
+        self._data = data
+        self._start = offset
+        self._end = offset + size
+        self._pos = offset
+
+    def read(self, size=-1):
+        end = self._end if size < 0 else min(self._pos + size, self._end)
+        chunk = self._data[self._pos:end]
+        self._pos = max(self._pos, end)
+        return chunk
+
+    def seek(self, offset, whence=0):
+        base = {0: self._start, 1: self._pos, 2: self._end}[whence]
+        self._pos = max(base + offset, self._start)
+
+    def tell(self):
+        return self._pos - self._start
+
+    def close(self):
+        self._data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class DumpArchive(object):
+    """ Dump images, which are stored in the tar archive; Images are looked
+    up by their file names, so archive may have images either in the root
+    or in some directory (but file names of the members must be unique)
+    """
+
+    def __init__(self, path):
+        """
+        :param path: path to the archive
+        """
+        self.path = os.path.abspath(path)
+        self._compressed = not self.path.endswith(PLAIN_TAR_EXTENSIONS)
+        self._data = None  # plain archive is mapped on first access to images
+        self._members_dict = None
+
+    @property
+    def _members(self):
+        """
+        :return: member file name --> (offset of the member data, size, data);
+                 data is None for members of plain archive (they are read from
+                 the mapped archive) and for pages images of compressed one
+        """
+        if self._members_dict is None:
+            self._members_dict = self._index_members()
+        return self._members_dict
+
+    def _iter_stream(self):
+        """ Reads the archive in one streaming pass, compressed archive is
+        decompressed on the fly
+
+        :return: iterator over (member, member file) pairs of regular files;
+                 member file can be read only before the next pair is taken
+        """
+        stream = None
+        if self.path.endswith(ZSTD_TAR_EXTENSIONS):
+            if zstandard is None:
+                raise RuntimeError("zstandard package is required to read [{}]".format(self.path))
+            stream = zstandard.ZstdDecompressor().stream_reader(open(self.path, "rb"))
+            tar = tarfile.open(fileobj=stream, mode="r|")
+        else:
+            tar = tarfile.open(self.path, "r|*")
+
+        try:
+            for member in tar:
+                if member.isfile():
+                    yield member, tar.extractfile(member)
+        finally:
+            tar.close()
+            if stream is not None:
+                stream.close()
+
+    def _iter_headers(self):
+        """
+        :return: iterator over (member, None) pairs of regular files of the
+                 plain archive; only headers of the members are read
+        """
+        with tarfile.open(self.path, "r:") as tar:
+            for member in tar:
+                if member.isfile():
+                    yield member, None
+
+    def _index_members(self):
+        """
+        :return: member file name --> (offset of the member data, size, data)
+        """
+        members = {}
+        for member, member_file in self._iter_stream() if self._compressed else self._iter_headers():
+            name = os.path.basename(member.name)
+            if name in members:
+                raise RuntimeError("Archive [{}] has more than one [{}] file".format(self.path, name))
+            # compressed stream can't be read at random, so images are read, while
+            # the stream passes by them (but not the huge pages images)
+            data = None
+            if member_file is not None and not name.startswith(SKIPPED_IMAGE_PREFIXES):
+                data = member_file.read()
+            members[name] = (member.offset_data, member.size, data)
+        return members
+
+    def _mapped_archive(self):
+        """
+        :return: memory mapped plain archive
+        """
+        if self._data is None:
+            with open(self.path, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._data
+
+    def _read_member(self, file_name):
+        """ Reads data of the member, which was not kept in memory, with one more
+        streaming pass over the compressed archive
+
+        :return: data of the member
+        :rtype: str
+        """
+        for member, member_file in self._iter_stream():
+            if os.path.basename(member.name) == file_name:
+                return member_file.read()
+        raise RuntimeError("Archive [{}] has no [{}] file".format(self.path, file_name))
+
+    def _member_data(self, file_name):
+        """
+        :return: (data, offset of the member data in it, size) or None if there is no such member
+        """
+        member = self._members.get(file_name)
+        if member is None:
+            return None
+        offset, size, data = member
+        if not self._compressed:
+            return self._mapped_archive(), offset, size
+        if data is None:
+            data = self._read_member(file_name)
+        return data, 0, size
+
+    def image_names(self, image_type):
+        names = (_split_image_file_name(f, image_type) for f in self._members)
+        return sorted(n for n in names if n is not None)
+
+    def image_size(self, image_name, image_type):
+        member = self._members.get(_image_file_name(image_name, image_type))
+        return None if member is None else member[1]
+
+    def open_image(self, image_name, image_type):
+        member_data = self._member_data(_image_file_name(image_name, image_type))
+        if member_data is None:
+            return None
+        return _MemberFile(*member_data)
+
+    def map_image(self, image_name, image_type):
+        """ Image data is not copied for plain archive, pages images of compressed
+        archive are decompressed into memory on every call
+
+        :return: image data or None if there is no such image
+        :rtype: ImageData
+        """
+        member_data = self._member_data(_image_file_name(image_name, image_type))
+        if member_data is None:
+            return None
+        # mapping of the archive is shared by images, it is not closed with them
+        return ImageData(buffer(*member_data))
+
+    def stat_images(self, image_type):
+        # archive is never changed partially; it is not read here, so
+        # snapshot of the dump is looked up without decompressing it
+        st = os.stat(self.path)
+        return [(os.path.basename(self.path), st.st_size, st.st_mtime)]
+
+    def parent(self):
+        # archive holds only one dump, parent dump is not packed with it
+        return None
+
+    def __repr__(self):
+        return "DumpArchive({})".format(self.path)
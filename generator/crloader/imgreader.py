@@ -0,0 +1,195 @@
+""" Memory mapped CRIU image reader
+
+Image is a magic followed by length-prefixed protobuf messages (entries).
+The reader maps the image into memory and walks entries lazily: only entry
+sizes are read while looking for an entry, so entries nobody asked for are
+never decoded and the whole image is never read into memory at once.
+"""
+
+import mmap
+import struct
+from array import array
+
+from pycriu import images
+
+_INT_STRUCT = struct.Struct('i')
+
+
+class ImageReader(object):
+    """ Lazy entries reader over the image buffer (memory mapped file or string)
+    """
+
+    def __init__(self, buf):
+        """
+        :param buf: image contents, any object which supports slicing
+        """
+        self._buf = buf
+        self.magic, entries_offset = self._read_magic()
+        # offsets of entries found so far, entries are walked lazily
+        self._entry_offsets = array('L', [entries_offset])
+        self._walked_all = False
+
+    @classmethod
+    def from_file(cls, f):
+        """ Creates reader for opened image file; File is memory mapped if
+        it is a real file and read into memory otherwise
+
+        :param f: image file object opened in binary mode
+        :rtype: ImageReader
+        """
+        try:
+            fileno = f.fileno()
+        except (AttributeError, IOError):
+            return cls(f.read())
+
+        f.seek(0, 2)
+        if f.tell() == 0:
+            return cls("")
+        return cls(mmap.mmap(fileno, 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def open(cls, img_path):
+        """
+        :param img_path: path to the image file
+        :rtype: ImageReader
+        """
+        with open(img_path, "rb") as f:
+            return cls.from_file(f)
+
+    def close(self):
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _read_int(self, offset):
+        """
+        :return: int at given offset or None if buffer ends there
+        """
+        end = offset + _INT_STRUCT.size
+        if end > len(self._buf):
+            if offset < len(self._buf):
+                raise ValueError("Image is truncated at offset {}".format(offset))
+            return None
+        return _INT_STRUCT.unpack(self._buf[offset:end])[0]
+
+    def _check_entry(self, offset, size):
+        """ Makes sure, that entry payload of given size at given offset is in the image
+        """
+        if offset + size > len(self._buf):
+            raise ValueError("Entry exceeds the image at offset {}".format(offset))
+
+    def _read_magic(self):
+        try:
+            magic_val = self._read_int(0)
+            offset = _INT_STRUCT.size
+            if magic_val in (images.magic.by_name.get('IMG_COMMON'), images.magic.by_name.get('IMG_SERVICE')):
+                magic_val = self._read_int(offset)
+                offset += _INT_STRUCT.size
+        except ValueError:
+            # image is shorter than its magic
+            magic_val = None
+
+        if magic_val not in images.magic.by_val:
+            raise images.MagicException(magic_val)
+        return images.magic.by_val[magic_val], offset
+
+    def _walk_next(self):
+        """ Finds offset of the next not yet found entry
+
+        :return: False if there are no more entries
+        """
+        if self._walked_all:
+            return False
+
+        offset = self._entry_offsets[-1]
+        size = self._read_int(offset)
+        if size is None:
+            self._walked_all = True
+            return False
+
+        self._check_entry(offset + _INT_STRUCT.size, size)
+        self._entry_offsets.append(offset + _INT_STRUCT.size + size)
+        return True
+
+    def _entry_range(self, idx):
+        """
+        :return: (offset, size) of idx-th entry payload or None if there is no such entry
+        """
+        while len(self._entry_offsets) <= idx + 1:
+            if not self._walk_next():
+                return None
+        offset = self._entry_offsets[idx] + _INT_STRUCT.size
+        return offset, self._entry_offsets[idx + 1] - offset
+
+    def raw_entry(self, idx):
+        """
+        :return: serialized idx-th message
+        :rtype: str
+        """
+        entry_range = self._entry_range(idx)
+        if entry_range is None:
+            raise IndexError(idx)
+        offset, size = entry_range
+        return self._buf[offset:offset + size]
+
+    def entry(self, idx, pb_class):
+        """ Decodes only idx-th entry of the image
+
+        :param pb_class: protobuf message class of the entry
+        """
+        message = pb_class()
+        message.ParseFromString(self.raw_entry(idx))
+        return message
+
+    def iter_entries(self, pb_class, start=0):
+        """ Lazily decodes entries one by one
+
+        :param pb_class: protobuf message class of the entries
+        :param start: index of the first entry to decode
+        """
+        idx = start
+        while self._entry_range(idx) is not None:
+            yield self.entry(idx, pb_class)
+            idx += 1
+
+    def iter_entries_with_payload(self, pb_class, payload_size):
+        """ Lazily decodes entries of the image, in which every entry is followed
+        by raw payload (e.g. pipes-data image, where payload is buffered pipe data);
+        Payload is skipped, only its location is returned. Entry offsets are not
+        cached for such images, so `entry` and `__len__` must not be used with them
+
+        :param pb_class: protobuf message class of the entries
+        :param payload_size: function, which returns the size of the payload,
+               following the given message
+        :return: iterator over (message, payload offset, payload size); offset
+                 is counted from the start of the image file
+        """
+        offset = self._entry_offsets[0]
+        while True:
+            size = self._read_int(offset)
+            if size is None:
+                return
+            offset += _INT_STRUCT.size
+            self._check_entry(offset, size)
+            message = pb_class()
+            message.ParseFromString(self._buf[offset:offset + size])
+            offset += size
+
+            nbytes = payload_size(message)
+            if offset + nbytes > len(self._buf):
+                raise ValueError("Payload of the entry exceeds the image at offset {}".format(offset))
+            yield message, offset, nbytes
+            offset += nbytes
+
+    def __len__(self):
+        """
+        :return: number of entries in the image (walks the whole image)
+        """
+        while self._walk_next():
+            pass
+        return len(self._entry_offsets) - 1
@@ -0,0 +1,47 @@
+""" Interning (hash consing) of values, loaded from images
+
+Processes of the same application (e.g. forked workers) have lots of equal
+data: signal actions, resource limits, cgroup sets, credentials. Interner replaces
+structurally equal values with the single instance, so every unique value
+is stored in memory (and in snapshot) only once. Interned values are shared,
+so they must never be mutated.
+"""
+
+
+class Interner(object):
+    """ Interns values, which consist of dicts, lists and scalars; Nested values
+    are interned too, so equal parts of different values are shared as well.
+    Any other object is treated as a scalar, which is equal only to itself
+    """
+
+    def __init__(self):
+        self._values = {}  # value key --> interned value
+
+    def intern(self, value):
+        """
+        :return: value, which is equal to the given one; the same instance is
+                 returned for all equal values
+        """
+        return self._intern(value)[0]
+
+    def _intern(self, value):
+        """
+        :return: pair of the interned value and its key; Key of a container is
+                 built from identities of interned elements, so it is cheap to hash
+        """
+        if isinstance(value, dict):
+            items = [(k, self._intern(v)) for k, v in value.iteritems()]
+            key = (dict, frozenset((k, element_key) for k, (_, element_key) in items))
+            make = lambda: {k: element for k, (element, _) in items}
+        elif isinstance(value, list):
+            elements = [self._intern(v) for v in value]
+            key = (list, tuple(element_key for _, element_key in elements))
+            make = lambda: [element for element, _ in elements]
+        else:
+            # type is a part of the key, because 1 == 1.0 == True
+            return value, (type(value), value)
+
+        interned = self._values.get(key)
+        if interned is None:
+            interned = self._values[key] = make()
+        return interned, (id(interned),)
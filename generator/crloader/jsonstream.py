@@ -0,0 +1,252 @@
+""" Incremental parsing of json images (made with `crit decode --pretty`)
+
+Json image is an object with 'magic' and 'entries' members. Images like mm
+and pagemap may take hundreds of megabytes, so instead of parsing the whole
+document, 'entries' array is parsed one entry at a time, while it is iterated;
+Arrays inside of the entries may be streamed the same way (e.g. 'vmas' of mm
+entry). File is read in chunks, so memory is bounded by the size of the largest
+single value, which is not streamed.
+
+Streamed arrays can be iterated only once. Members, which follow the streamed
+array in the file, are added to the object after the array is iterated to the
+end. If the entry is left before it's streamed arrays are iterated, these arrays
+are parsed into lists, so the entry stays complete.
+"""
+
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# characters, which may follow complete json value
+_VALUE_DELIMITERS = frozenset(",:]} \t\n\r")
+
+_decoder = json.JSONDecoder()
+
+
+class _Reader(object):
+    """ Json tokens reader over the file, which is read in chunks
+    """
+
+    def __init__(self, f, chunk_size):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        """ Reads next chunk of the file
+
+        :return: False if there is nothing to read
+        """
+        if self._eof:
+            return False
+        data = self._f.read(self._chunk_size)
+        if not data:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """ Skips whitespaces
+
+        :return: next character or None in the end of the file
+        """
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return None
+
+    def expect(self, char):
+        next_char = self.peek()
+        if next_char != char:
+            raise ValueError("Expected '{}', but got '{}'".format(char, next_char))
+        self._pos += 1
+
+    def value(self):
+        """ Parses next json value completely
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+            except ValueError:
+                # value is not read completely yet
+                if not self._fill():
+                    raise
+                continue
+            # number may be cut by the end of the chunk ("12" of "123", "-2" of "-2.5")
+            if (end == len(self._buf) or self._buf[end] not in _VALUE_DELIMITERS) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def close(self):
+        self._f.close()
+
+
+def _parse_plain_value(reader):
+    """ Element parser (see `_iter_array`) for values, which are parsed completely
+    """
+    return reader.value(), None
+
+
+def _iter_array(reader, parse_element):
+    """
+    :param parse_element: function, which parses array element and returns pair of
+           parsed element and function to call before parsing the next element (or None)
+    :return: iterator over array elements
+    """
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.expect("]")
+        return
+
+    while True:
+        element, finish = parse_element(reader)
+        yield element
+        if finish is not None:
+            finish()
+
+        if reader.peek() != ",":
+            reader.expect("]")
+            return
+        reader.expect(",")
+
+
+class ArrayStream(object):
+    """ Json array, which elements are parsed while it is iterated
+    """
+
+    def __init__(self, reader, parse_element, on_end):
+        """
+        :param parse_element: see `_iter_array`
+        :param on_end: function to call after the whole array is parsed
+        """
+        self._elements = self._iterate(reader, parse_element, on_end)
+        self.started = False
+
+    @staticmethod
+    def _iterate(reader, parse_element, on_end):
+        for element in _iter_array(reader, parse_element):
+            yield element
+        on_end()
+
+    def __iter__(self):
+        if self.started:
+            raise RuntimeError("Streamed json array can be iterated only once")
+        self.started = True
+        return self._elements
+
+    def drain(self):
+        """ Skips not iterated elements
+        """
+        self.started = True
+        for _ in self._elements:
+            pass
+
+
+class _ObjectParser(object):
+    """ Parses json object, some of the array members of which are streamed;
+    `obj` is filled while the object is parsed
+    """
+
+    def __init__(self, reader, streamed_members, on_end=None):
+        """
+        :param streamed_members: member name --> element parser (see `_iter_array`)
+               for array members, which are streamed
+        :param on_end: function to call after the whole object is parsed
+        """
+        self.obj = {}
+        self._reader = reader
+        self._streamed_members = streamed_members
+        self._on_end = on_end
+        self._stream_key = None
+
+        reader.expect("{")
+        if reader.peek() == "}":
+            self._end()
+        else:
+            self._parse_members()
+
+    def _end(self):
+        self._reader.expect("}")
+        self._stream_key = None
+        if self._on_end is not None:
+            self._on_end()
+
+    def _parse_members(self):
+        """ Parses members till the end of the object or till the streamed member
+        """
+        while True:
+            key = self._reader.value()
+            self._reader.expect(":")
+
+            if key in self._streamed_members and self._reader.peek() == "[":
+                self._stream_key = key
+                self.obj[key] = ArrayStream(self._reader, self._streamed_members[key], self._parse_next_members)
+                return
+
+            self.obj[key] = self._reader.value()
+            if self._reader.peek() != ",":
+                self._end()
+                return
+            self._reader.expect(",")
+
+    def _parse_next_members(self):
+        """ Continues parsing after the streamed member
+        """
+        self._stream_key = None
+        if self._reader.peek() != ",":
+            self._end()
+            return
+        self._reader.expect(",")
+        self._parse_members()
+
+    def finish(self):
+        """ Parses the rest of the object; Streamed arrays, which are not
+        iterated yet, are stored as lists
+        """
+        while self._stream_key is not None:
+            key = self._stream_key
+            stream = self.obj[key]
+            if not stream.started:
+                self.obj[key] = list(stream)
+            else:
+                stream.drain()
+
+
+def _object_element_parser(streamed_members):
+    """
+    :return: element parser (see `_iter_array`) for objects with streamed members
+    """
+    def parse_object(reader):
+        parser = _ObjectParser(reader, streamed_members)
+        return parser.obj, parser.finish
+
+    return parse_object
+
+
+def load(f, nested=(), chunk_size=CHUNK_SIZE):
+    """ Loads json image incrementally; Result has the same structure as the
+    one of `json.load`, but 'entries' member is an ArrayStream; Only members,
+    which precede 'entries' in the file, are available before entries are
+    iterated (in crit output 'magic' is always the first one). File is closed
+    after the whole image is parsed
+
+    :param f: json image file, which is owned by the result from now on
+    :param nested: names of array members of entries, which are streamed too
+    :param chunk_size: size of the chunk to read file with
+    :rtype: dict
+    """
+    reader = _Reader(f, chunk_size)
+    entry_parser = _object_element_parser({key: _parse_plain_value for key in nested}) \
+        if nested else _parse_plain_value
+    return _ObjectParser(reader, {"entries": entry_parser}, on_end=reader.close).obj
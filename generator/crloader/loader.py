@@ -1,41 +1,114 @@
-import glob
-import itertools
 import json
+import multiprocessing
 import os
 
-import pycriu
-
 import crconstants
 import crdata
+import dumpsource
+import interning
+import jsonstream
+import pagemap
+import vmtable
+
+try:
+    import pycriu
+    import imgreader
+    import pbdecode
+except ImportError:
+    # pycriu is needed to decode img images only, json images are loaded without it
+    pycriu = None
 
 # from resource_handles import *
 
-# resource ids generator
-__gen_resource_id = itertools.count()
+# families of process images, which may be skipped during loading (see `load`)
+IMAGES_VMAS = "vmas"  # memory mappings
+IMAGES_PRIVATE = "private"  # process internals: thread cores, vm info, page map, fs
+
+# json images, which may be huge, so they are parsed incrementally (see jsonstream):
+# image name prefix --> names of entry arrays, which are streamed too
+STREAMED_JSON_IMAGES = {
+    "mm-": ("vmas",),
+    "pagemap-": (),
+}
+
+# kinds of resources (see `make_resource_id`)
+RID_PROCESS = "process"
+RID_TASK_CORE = "task-core"
+RID_THREAD_CORE = "thread-core"
+RID_SIGACTION = "sigaction"
+RID_VM_INFO = "vm-info"
+RID_VMA = vmtable.VMA_RESOURCE_KIND
+RID_PAGEMAP = "pagemap"
+RID_FS = "fs"
+RID_REG_FILE = "reg-file"
+RID_PIPE_FILE = "pipe-file"
+RID_PIPE_DATA = "pipe-data"
+RID_SHMEM = "shmem"
+RID_SHMEM_PAGEMAP = "shmem-pagemap"
+
+# fields of the signal action payload (see crdata.SignalAction)
+_SIGACTION_FIELDS = ("sigaction", "flags", "restorer", "mask", "compat_sigaction")
+
+
+def make_resource_id(kind, owner, idx=0):
+    """ Resource id is derived from the identity of the image entry, the resource
+    is parsed from, so ids do not depend on the loading order (or on the number of
+    worker processes) and the same dump is always loaded with the same ids
+
+    :param kind: kind of the resource (RID_* constant)
+    :param owner: pid of the process (tid of the thread), which the resource belongs
+           to; id of shared memory for shared memory resources; 0 for resources
+           from images, which are common for all processes (reg-files, pipes)
+    :param idx: index of the resource entry among entries of the same kind and owner
+           (e.g. VMA index or index of the file in reg-files image); generation of the
+           dump for page maps (see crdata.PageMap.parent)
+    :rtype: tuple
+    """
+    return kind, owner, idx
 
 
-def next_resource_id():
-    """ generates new resource id
-    :rtype: int
+def _require_pycriu():
+    if pycriu is None:
+        raise RuntimeError("pycriu package is required to load img images")
+
+
+def _materialize(item):
+    """ Makes sure, that item entries are stored in a list, so item
+    can be pickled or iterated more than once
+
+    :param item: loaded item, which entries may be a lazy iterator (see
+           pbdecode.load and jsonstream.load)
     """
-    return next(__gen_resource_id)
+    if item is not None and not isinstance(item['entries'], list):
+        item['entries'] = list(item['entries'])
+    return item
 
 
-def _load_img(img_path):
-    with open(img_path, "r") as f:
+def _load_img(f, item_name):
+    with f:
         try:
-            return pycriu.images.load(f, True)
+            return pbdecode.load(f)
         except pycriu.images.MagicException as exc:
-            print("Incorrect magic in {}".format(img_path))
+            print("Incorrect magic in {}".format(item_name))
             return None
 
 
-def _load_json(img_path):
-    with open(img_path, "r") as f:
+def _load_json(f, item_name):
+    for prefix, nested in STREAMED_JSON_IMAGES.iteritems():
+        if item_name.startswith(prefix):
+            return jsonstream.load(f, nested)
+    with f:
         return json.load(f)
 
 
-def _load_item(source_path, item_name, item_type):
+def _load_item(source, item_name, item_type):
+    """
+    :param source: dump to load the item from
+    :type source: dumpsource.DumpDirectory | dumpsource.DumpArchive
+    :param item_name: image name without extension
+    :param item_type: type of image item (json or img)
+    :return: loaded item or None if there is no such image
+    """
     loaders = {
         "img": _load_img,
         "json": _load_json
@@ -44,16 +117,47 @@ def _load_item(source_path, item_name, item_type):
     if item_type not in loaders:
         raise ValueError("Unknown item type {}".format(item_type))
 
-    img_path = os.path.join(source_path, "{}.{}".format(item_name, item_type))
-    if not os.path.isfile(img_path):
+    f = source.open_image(item_name, item_type)
+    if f is None:
         return None
-    return loaders[item_type](img_path)
+    # loader owns the file: streamed json image is read after loader returns
+    return loaders[item_type](f, item_name)
+
+
+def _parse_hex(value):
+    """ Parses integer, which is represented as a hex string in pretty
+    decoded images (and as a plain integer otherwise)
+    """
+    if isinstance(value, basestring):
+        return int(value, 16)
+    return value
+
+
+def _parse_flags(value, flags_map):
+    """ Parses flags, which are represented in pretty decoded images as a string
+    of flag names and hex numbers, separated by '|' (and as a plain integer otherwise)
+
+    :param flags_map: sequence of (flag name, flag value) pairs
+    :return: flags bit mask
+    :rtype: int
+    """
+    if not isinstance(value, basestring):
+        return value
+
+    flags_dict = dict(flags_map)
+    mask = 0
+    for name in value.split("|"):
+        name = name.strip()
+        if not name:
+            continue
+        mask |= flags_dict[name] if name in flags_dict else int(name, 16)
+    return mask
 
 
-def _parse_one_reg_file(entry):
+def _parse_one_reg_file(entry, idx):
     size = None if "size" not in entry else entry["size"]
     flags = [s.strip() for s in entry["flags"].split("|")]
-    return crdata.RegFile(resource_id=next_resource_id(),
+    return crdata.RegFile(resource_id=make_resource_id(RID_REG_FILE, 0, idx),
                           id=entry["id"],
                           path=entry["name"],
                           size=size,
@@ -62,10 +166,10 @@ def _parse_one_reg_file(entry):
                           mode=entry["mode"])
 
 
-def _parse_one_pipe_file(entry):
+def _parse_one_pipe_file(entry, idx):
     flags = int(entry["flags"], 16)  # hex str
     return crdata.PipeFile(
-        resource_id=next_resource_id(),
+        resource_id=make_resource_id(RID_PIPE_FILE, 0, idx),
         id=entry["id"],
         pipe_id=entry["pipe_id"],
         flags=flags,
@@ -73,94 +177,143 @@ def _parse_one_pipe_file(entry):
     )
 
 
-def _parse_one_vma(e):
-    return crdata.VmArea(
-        resource_id=next_resource_id(),
-        start=int(e['start'], 16),
-        end=int(e['end'], 16),
+def _append_one_vma(vmas, e):
+    """
+    :param vmas: table to append VMA to
+    :type vmas: vmtable.VmAreaTable
+    :param e: vma entry of mm image
+    """
+    vmas.append(
+        start=_parse_hex(e['start']),
+        end=_parse_hex(e['end']),
         pgoff=e['pgoff'],
         shmid=int(e['shmid']),
-        prot=set([s.strip() for s in e['prot'].split("|")]),
-        flags=set([s.strip() for s in e['flags'].split("|")]),
-        status=set([s.strip() for s in e['status'].split("|")]),
+        prot=_parse_flags(e['prot'], crconstants.VMA_PROT_FLAGS),
+        flags=_parse_flags(e['flags'], crconstants.VMA_MAP_FLAGS),
+        status=_parse_flags(e['status'], crconstants.VMA_STATUS_FLAGS),
         fd=e['fd'],
-        fdflags=e['fdflags'] if 'fdflags' in e else None
+        fdflags=_parse_hex(e['fdflags']) if 'fdflags' in e else None
     )
 
 
-def _parse_vm_info(e):
+def _parse_vm_info(e, pid):
     return crdata.VmInfo(
-        resource_id=next_resource_id(),
-        arg_start=e['mm_arg_start'],
-        arg_end=e['mm_arg_end'],
-        brk=e['mm_brk'],
-        env_start=e['mm_env_start'],
-        env_end=e['mm_env_end'],
-        code_start=e['mm_start_code'],
-        code_end=e['mm_end_code'],
-        data_start=e['mm_start_data'],
-        data_end=e['mm_end_data'],
-        brk_start=e['mm_start_brk'],
-        stack_start=e['mm_start_stack'],
+        resource_id=make_resource_id(RID_VM_INFO, pid),
+        arg_start=_parse_hex(e['mm_arg_start']),
+        arg_end=_parse_hex(e['mm_arg_end']),
+        brk=_parse_hex(e['mm_brk']),
+        env_start=_parse_hex(e['mm_env_start']),
+        env_end=_parse_hex(e['mm_env_end']),
+        code_start=_parse_hex(e['mm_start_code']),
+        code_end=_parse_hex(e['mm_end_code']),
+        data_start=_parse_hex(e['mm_start_data']),
+        data_end=_parse_hex(e['mm_end_data']),
+        brk_start=_parse_hex(e['mm_start_brk']),
+        stack_start=_parse_hex(e['mm_start_stack']),
         dumpable=e['dumpable'],
         exe_file_id=e['exe_file_id'],
         saved_auxv=e['mm_saved_auxv']
     )
 
 
-def _parse_pagemap(pagemap_item):
+def _parse_pagemap_entry_flags(e):
+    if 'flags' in e:
+        return _parse_flags(e['flags'], crconstants.PAGEMAP_FLAGS)
+    # images made by older CRIU versions have no flags, but in_parent field
+    return crconstants.PE_PARENT if e.get('in_parent') else crconstants.PE_PRESENT
+
+
+def _parse_pagemap(pagemap_item, resource_id, load_parent=lambda: None):
     """
     :param pagemap_item: item loaded from pagemap-{pid} image or from pagemap-shmem-{shmid} image
+    :param resource_id: id of the page map
+    :param load_parent: function, which loads page map of the parent dump; it is
+           called only if some pages are stored in the parent dump
     """
+    items_iter = iter(pagemap_item['entries'])
+    head = next(items_iter)
+
+    entries = pagemap.PageMapEntries()
+    for e in items_iter:
+        entries.append(_parse_hex(e['vaddr']), e['nr_pages'], _parse_pagemap_entry_flags(e))
+
     return crdata.PageMap(
-        resource_id=next_resource_id(),
-        pages_id=pagemap_item['entries'][0]['pages_id'],
-        maps=pagemap_item['entries'][1:]
+        resource_id=resource_id,
+        pages_id=head['pages_id'],
+        maps=entries,
+        parent=load_parent() if entries.total_pages(crconstants.PE_PARENT) else None
     )
 
 
-def _parse_fs(fs_item):
+def _load_pagemap(source, item_name, image_type, pagemap_item, kind, owner, generation=0):
+    """ Parses page map and loads page maps from the parent dumps of the
+    incremental dump; Parent dumps are loaded recursively, but only as long
+    as there are pages, which are stored in the parent
+
+    :param source: dump, which page map is loaded from
+    :param item_name: pagemap image name
+    :param pagemap_item: item, loaded from `item_name` image of the source
+    :param kind: resource kind of the page map (RID_PAGEMAP or RID_SHMEM_PAGEMAP)
+    :param owner: pid of the process or id of the shared memory
+    :param generation: number of parent links from the loaded dump to the source
+    :rtype: crdata.PageMap
+    """
+    def load_parent():
+        parent_source = source.parent()
+        if parent_source is None:
+            return None
+        parent_item = _load_item(parent_source, item_name, image_type)
+        if parent_item is None:
+            return None
+        return _load_pagemap(parent_source, item_name, image_type, parent_item, kind, owner, generation + 1)
+
+    return _parse_pagemap(pagemap_item, make_resource_id(kind, owner, generation), load_parent)
+
+
+def _parse_fs(fs_item, pid):
     """
     :param fs_item: item loaded from fs-{pid} image
     :return: file system process properties
     :rtype: crdata.FSProps
     """
     return crdata.FSProps(
-        resource_id=next_resource_id(),
+        resource_id=make_resource_id(RID_FS, pid),
         cwd_id=fs_item['entries'][0]['cwd_id'],
         root_id=fs_item['entries'][0]['root_id'],
         umask=fs_item['entries'][0]['umask']
     )
 
 
-def _parse_sigacts(task_core):
-    """
+def _parse_sigacts(task_core, pid, interner):
+    """ Signal actions are per process resources, so only their payloads
+    are interned, resource ids are not shared
+
     :param task_core: task core element
+    :param pid: id of the process, which core is parsed
+    :type interner: interning.Interner
     :rtype: list[crdata.SignalAction]
     """
     return [
         crdata.SignalAction(
-            resource_id=next_resource_id(),
-            sigaction=e['sigaction'],
-            flags=e['flags'],
-            restorer=e['restorer'],
-            mask=e['mask'],
-            compat_sigaction=e["compat_sigaction"]
+            resource_id=make_resource_id(RID_SIGACTION, pid, idx),
+            action=interner.intern({field: e[field] for field in _SIGACTION_FIELDS})
         )
-        for e in task_core['sigactions']
+        for idx, e in enumerate(task_core['sigactions'])
     ]
 
 
-def _parse_task_core(core_item):
+def _parse_task_core(core_item, pid, interner):
     """
     :param core_item: item, loaded from core-{pid}, where pid is not thread id, but
     process id, i.e. main thread id
+    :param interner: interner of payloads, which are usually equal in many processes
+    :type interner: interning.Interner
     :return: task core object (tc item field)
     :rtype: crdata.ProcessCore
     """
     tc = core_item['entries'][0]['tc']
     return crdata.ProcessCore(
-        resource_id=next_resource_id(),
+        resource_id=make_resource_id(RID_TASK_CORE, pid),
         task_state=tc['task_state'],
         exit_code=tc['exit_code'],
         personality=tc['personality'],
@@ -168,72 +321,170 @@ def _parse_task_core(core_item):
         blk_sigset=tc['blk_sigset'],
         comm=tc['comm'],
         timers=tc['timers'],
-        rlimits=tc['rlimits'],
-        cg_set=tc['cg_set'],
+        rlimits=interner.intern(tc['rlimits']),
+        cg_set=interner.intern(tc['cg_set']),
         signals_s=tc['signals_s'],
         loginuid=tc['loginuid'],
         oom_score_adj=tc['oom_score_adj'],
-        sigactions=_parse_sigacts(tc)
+        sigactions=_parse_sigacts(tc, pid, interner)
     )
 
 
-def _parse_thread_core(core_item, thread_id):
+def _parse_thread_core(core_item, thread_id, interner):
     """
     :param core_item: item, loaded from core-{tid}, tid is a thread id
+    :param interner: interner of payloads, which are usually equal in many threads
+           (thread core contains credentials, which are shared this way)
+    :type interner: interning.Interner
     :return: thread core object
     :rtype: crdata.ThreadCore
     """
 
     core = core_item['entries'][0]
     return crdata.ThreadCore(
-        resource_id=next_resource_id(),
+        resource_id=make_resource_id(RID_THREAD_CORE, thread_id),
         thread_id=thread_id,
         mtype=core['mtype'],
         thread_info=core['thread_info'],
-        thread_core=core['thread_core']
+        thread_core=interner.intern(core['thread_core'])
     )
 
 
-def _parse_one_process(process_item, source_path, image_type):
+def _get_task_state(core_item):
+    """
+    :param core_item: item, loaded from core-{pid} image
+    :return: task state of the process
+    """
+    return core_item['entries'][0]['tc']['task_state']
+
+
+def _load_process_items(process_item, source, image_type, skip=frozenset()):
+    """ Decodes all images, which belong to one process; That is the most
+    expensive part of loading, so it may be executed in a worker process
+
+    :param process_item: pstree entry of the process
+    :param source: dump to load images from
+    :param image_type: type of image items (json or img)
+    :param skip: families of images, which are not decoded (see `load`)
+    :return: map from image name to loaded item
+    :rtype: dict[str, dict]
+    """
+    pid = process_item["pid"]
+    skip_private = IMAGES_PRIVATE in skip
+    items = {}
+
+    def load_one(item_name):
+        items[item_name] = _load_item(source, item_name, image_type)
+        return items[item_name]
+
+    # main thread core is always needed to find out the task state
+    thread_ids = [pid] if skip_private else process_item["threads"]
+    for tid in thread_ids:
+        load_one("core-{}".format(tid))
+
+    if _get_task_state(items["core-{}".format(pid)]) == crconstants.TASK_STATE_DEAD:
+        # nothing else is dumped for dead task
+        return items
+
+    ids = load_one("ids-{}".format(pid))["entries"][0]
+    load_one("fdinfo-{}".format(ids["files_id"]))
+
+    if IMAGES_VMAS not in skip or not skip_private:
+        load_one("mm-{}".format(pid))
+    if not skip_private:
+        load_one("pagemap-{}".format(pid))
+        load_one("fs-{}".format(pid))
+
+    return items
+
+
+# dump source of the worker process (see `_init_worker`)
+_worker_source = None
+
+
+def _init_worker(source):
+    """ Initializes worker process of the pool; Source is passed once per worker
+    and not with every task, because archive source holds all images in memory
+    """
+    global _worker_source
+    _worker_source = source
+
+
+def _load_process_items_materialized(args):
+    """ Calls `_load_process_items` in the worker process, so items are
+    ready to be sent from it
+
+    :param args: `_load_process_items` arguments, except for the source
+    """
+    process_item, image_type, skip = args
+    items = _load_process_items(process_item, _worker_source, image_type, skip)
+    return {name: _materialize(item) for name, item in items.iteritems()}
+
+
+def _parse_one_process(process_item, items, source, image_type, skip=frozenset(), interner=None):
+    """
+    :param process_item: pstree entry of the process
+    :param items: images of the process, see `_load_process_items`
+    :param interner: interner, which is shared by all processes of the application,
+           so equal payloads of different processes are stored once
+    :type interner: interning.Interner
+    :param skip: families of images, which are not decoded (see `load`); process
+           fields, which are parsed from these images, are left empty
+    :rtype: crdata.Process
+    """
     pid = process_item["pid"]
     ppid = process_item["ppid"]
     pgid = process_item["pgid"]
     sid = process_item["sid"]
+    if interner is None:
+        interner = interning.Interner()
 
-    thread_ids = process_item["threads"]
-    core_items = {tid: _load_item(source_path, "core-{}".format(tid), image_type)
-                  for tid in thread_ids}
-
-    process_core = _parse_task_core(core_items[pid])
-    thread_cores = [_parse_thread_core(core_items[tid], tid) for tid in core_items]
+    def get_item(item_name):
+        if item_name not in items:
+            items[item_name] = _load_item(source, item_name, image_type)
+        return items[item_name]
 
-    p_state = process_core.task_state
-    if p_state == crconstants.TASK_STATE_DEAD:
+    main_core_item = get_item("core-{}".format(pid))
+    if _get_task_state(main_core_item) == crconstants.TASK_STATE_DEAD:
         # dead task (as I got it's a zombie) is empty one...
-        return crdata.Process(resource_id=next_resource_id(),
+        return crdata.Process(resource_id=make_resource_id(RID_PROCESS, pid),
                               pid=pid, ppid=ppid, pgid=pgid,
                               sid=sid, thread_cores=[], core=None,
-                              fdt={}, ids=None, vmas=[], vm_info=None, page_map=None)
+                              fdt={}, ids=None, vmas=vmtable.VmAreaTable(pid), vm_info=None,
+                              page_map=None, fs=None)
 
-    ids_item = _load_item(source_path, "ids-{}".format(pid), image_type)
-    ids = ids_item["entries"][0]
+    skip_private = IMAGES_PRIVATE in skip
+    if skip_private:
+        process_core, thread_cores = None, []
+    else:
+        process_core = _parse_task_core(main_core_item, pid, interner)
+        thread_cores = [_parse_thread_core(get_item("core-{}".format(tid)), tid, interner)
+                        for tid in process_item["threads"]]
+
+    ids = get_item("ids-{}".format(pid))["entries"][0]
 
     # building file descriptor table
     p_fdt = {}
-    fd_info_item = _load_item(source_path, "fdinfo-{}".format(ids["files_id"]), image_type)
+    fd_info_item = get_item("fdinfo-{}".format(ids["files_id"]))
     if fd_info_item is not None:
         p_fdt = {e["fd"]: e["id"] for e in fd_info_item["entries"]}
 
-    mm_item = _load_item(source_path, "mm-{}".format(pid), image_type)
-    p_vminfo, p_vmas = _parse_mm(mm_item)
-
-    pagemap_item = _load_item(source_path, "pagemap-{}".format(pid), image_type)
-    pagemap = _parse_pagemap(pagemap_item)
-
-    fs_item = _load_item(source_path, "fs-{}".format(pid), image_type)
-    fs_props = _parse_fs(fs_item)
-
-    return crdata.Process(resource_id=next_resource_id(),
+    p_vminfo, p_vmas = None, vmtable.VmAreaTable(pid)
+    if IMAGES_VMAS not in skip or not skip_private:
+        mm_vminfo, mm_vmas = _parse_mm(get_item("mm-{}".format(pid)), pid)
+        if not skip_private:
+            p_vminfo = mm_vminfo
+        if IMAGES_VMAS not in skip:
+            p_vmas = mm_vmas
+
+    if skip_private:
+        page_map, fs_props = None, None
+    else:
+        pagemap_name = "pagemap-{}".format(pid)
+        page_map = _load_pagemap(source, pagemap_name, image_type, get_item(pagemap_name), RID_PAGEMAP, pid)
+        fs_props = _parse_fs(get_item("fs-{}".format(pid)), pid)
+
+    return crdata.Process(resource_id=make_resource_id(RID_PROCESS, pid),
                           pid=pid,
                           ppid=ppid,
                           pgid=pgid,
@@ -244,7 +495,7 @@ def _parse_one_process(process_item, source_path, image_type):
                           ids={},
                           vmas=p_vmas,
                           vm_info=p_vminfo,
-                          page_map=pagemap,
+                          page_map=page_map,
                           fs=fs_props)
 
 
@@ -254,7 +505,7 @@ def _parse_reg_files(reg_files_item):
     :param reg_files_item: item, loaded from reg-files image
     :return: list of crdata.RegFile structures
     """
-    return [_parse_one_reg_file(entry) for entry in reg_files_item["entries"]]
+    return [_parse_one_reg_file(entry, idx) for idx, entry in enumerate(reg_files_item["entries"])]
 
 
 def _parse_pipe_files(pipe_files_item):
@@ -263,103 +514,195 @@ def _parse_pipe_files(pipe_files_item):
     :param pipe_files_item: item, loaded from pipes image
     :return: list of crdata.PipeFile structures
     """
-    return [_parse_one_pipe_file(entry) for entry in pipe_files_item["entries"]]
+    return [_parse_one_pipe_file(entry, idx) for idx, entry in enumerate(pipe_files_item["entries"])]
+
 
+def _make_pipe_data(idx, pipe_id, pipe_size, image_path, offset, length):
+    return crdata.PipeData(resource_id=make_resource_id(RID_PIPE_DATA, 0, idx),
+                           pipe_id=pipe_id,
+                           pipe_size=pipe_size,
+                           image_path=image_path,
+                           offset=offset,
+                           length=length)
 
-def _parse_mm(mm_item):
+
+def _load_pipe_data(source, image_type):
+    """ Indexes buffered pipe data: every entry of pipes-data image is followed
+    by the data itself, which is not read, only its location in the image is
+    stored, so the data can be spliced into the pipe straight from the image;
+    Data of json images (where it is inlined) and of archive members can't be
+    spliced, so for them pipe data is loaded without location (see crdata.PipeData)
+
+    :param source: dump to load images from
+    :param image_type: type of image items (json or img)
+    :return: list of crdata.PipeData structures
+    """
+    if "pipes-data" not in source.image_names(image_type):
+        return []
+
+    if image_type != "img":
+        item = _load_item(source, "pipes-data", image_type)
+        pipe_data = [_make_pipe_data(idx, e["pipe_id"], e.get("size"), None, None, e["bytes"])
+                     for idx, e in enumerate(item["entries"])]
+    else:
+        image_path = None
+        if isinstance(source, dumpsource.DumpDirectory):
+            image_path = os.path.abspath(source.image_path("pipes-data", image_type))
+        with source.open_image("pipes-data", image_type) as f:
+            reader = imgreader.ImageReader.from_file(f)
+        with reader:
+            entries = reader.iter_entries_with_payload(pycriu.images.pb.pipe_data_entry, lambda e: e.bytes)
+            pipe_data = [_make_pipe_data(idx, e.pipe_id, e.size if e.HasField('size') else None, image_path,
+                                         offset if image_path else None, length)
+                         for idx, (e, offset, length) in enumerate(entries)]
+
+    if any(d.length and d.image_path is None for d in pipe_data):
+        print("Buffered pipe data of {} can't be spliced from {} images, pipes will not be "
+              "refilled".format(source.path, image_type))
+    return pipe_data
+
+
+def _parse_mm(mm_item, pid):
     """
     :param mm_item: item loaded from mm-{pid} image
-    :return: (VmInfo, array of VmArea)
+    :return: (VmInfo, table of VMAs)
+    :rtype: tuple[crdata.VmInfo, vmtable.VmAreaTable]
     """
-    vm_info = _parse_vm_info(mm_item['entries'][0])
-    vmas = [_parse_one_vma(e) for e in mm_item['entries'][0]['vmas']]
-    return vm_info, vmas
+    mm_entry = next(iter(mm_item['entries']))
+
+    # vmas are parsed first: members, which follow them, are available
+    # only after vmas are read, if the image is streamed
+    vmas = vmtable.VmAreaTable(pid)
+    for e in mm_entry['vmas']:
+        _append_one_vma(vmas, e)
+    return _parse_vm_info(mm_entry, pid), vmas
 
 
-def _parse_shared_anon_pagemaps(source_path, image_type):
+def _parse_shared_anon_pagemaps(source, image_type):
     """
     Parses all image files with names `pagemap-shmem-{shmid}.{image_type}'
-    :param source_path: root directory of dumped images
+    :param source: dump to load images from
     :param image_type: type of image item (json or img)
     :return: list of item names
     """
-    shmem_pagemaps = [os.path.splitext(os.path.basename(s))[0]
-                      for s in glob.glob(os.path.join(source_path, "pagemap-shmem-*.{}".format(image_type)))]
-    return shmem_pagemaps
+    return [name for name in source.image_names(image_type) if name.startswith("pagemap-shmem-")]
 
 
-def _load_shared_anon_mems(source_path, image_type):
+def _load_shared_anon_mems(source, image_type):
     """ Loads info about shared anon memory
     
-    :param source_path: root directory of dumped images
+    :param source: dump to load images from
     :param image_type: type of image items (json or img)
     :return: list of shared anon memory objects
     """
-    image_names = _parse_shared_anon_pagemaps(source_path, image_type)
+    image_names = _parse_shared_anon_pagemaps(source, image_type)
 
     shmems = []
 
     for img in image_names:
         shmid = int(img.split("-")[-1])
-        pagemap_item = _load_item(source_path, img, image_type)
-        pagemap = _parse_pagemap(pagemap_item)
+        pagemap_item = _load_item(source, img, image_type)
+        page_map = _load_pagemap(source, img, image_type, pagemap_item, RID_SHMEM_PAGEMAP, shmid)
 
         shmems.append(
             crdata.SharedAnonMem(
-                resource_id=next_resource_id(),
-                id=shmid, pagemap=pagemap)
+                resource_id=make_resource_id(RID_SHMEM, shmid),
+                id=shmid, pagemap=page_map)
         )
 
     return shmems
 
 
-def _load_processes(source_path, image_type):
-    """
+def _load_processes(source, image_type, workers=None, skip=frozenset()):
+    """ Loads processes; Images decoding may be done in parallel, but
+    parsing is always done here in pstree order, so the result does
+    not depend on the number of workers
+
+    :param workers: number of worker processes to decode images with
+    :param skip: families of images, which are not decoded
     :return: list of parsed processes
     """
-    processes_item = _load_item(source_path, "pstree", image_type)
+    processes_item = _load_item(source, "pstree", image_type)
     if not processes_item:
-        raise RuntimeError("No pstree item! Probably bad image path [{}] specified.".format(source_path))
-
-    return [_parse_one_process(e, source_path, image_type)
-            for e in processes_item["entries"]]
-
-
-def load(source_path, image_type):
+        raise RuntimeError("No pstree item! Probably bad image path [{}] specified.".format(source.path))
+
+    process_entries = processes_item["entries"]
+    interner = interning.Interner()
+    if not workers or workers <= 1:
+        return [_parse_one_process(e, _load_process_items(e, source, image_type, skip),
+                                   source, image_type, skip, interner)
+                for e in process_entries]
+
+    load_args = [(e, image_type, skip) for e in process_entries]
+    pool = multiprocessing.Pool(processes=workers, initializer=_init_worker, initargs=(source,))
+    try:
+        items_iter = pool.imap(_load_process_items_materialized, load_args,
+                               chunksize=max(1, len(load_args) // (workers * 4)))
+        return [_parse_one_process(e, items, source, image_type, skip, interner)
+                for e, items in zip(process_entries, items_iter)]
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def load(source_path, image_type, workers=None, cache=None, skip=()):
     """
-    :param source_path: path to images
+    :param source_path: path to images directory or to tar archive with images
+           (see dumpsource module for supported archives)
     :param image_type: image extension
+    :param workers: number of worker processes to decode per-process images
+           with; process images are decoded in the current process if not specified
+    :param cache: snapshot cache to look up the application in before loading and
+           to store loaded application to
+    :type cache: snapshot.SnapshotCache
+    :param skip: families of process images (IMAGES_* constants), which are not
+           needed, so they are not decoded; process fields, which are parsed
+           from these images, are left empty (empty VMA table or None)
     """
-    if not os.path.exists(source_path):
-        raise RuntimeError("Images path [{}] does not exists".format(source_path))
-    source_path = os.path.abspath(source_path)
+    if image_type == "img":
+        _require_pycriu()
+    source = dumpsource.open_dump(source_path)
+    skip = frozenset(skip)
 
-    available_imgs = [os.path.splitext(os.path.basename(s))[0]
-                      for s in glob.glob(os.path.join(source_path, "*.{}".format(image_type)))]
+    if cache is not None:
+        # full application is fine even if some images may be skipped
+        application = cache.get(source, image_type)
+        if application is not None:
+            return application
+
+    available_imgs = source.image_names(image_type)
 
     reg_files = {}
     if "reg-files" in available_imgs:
-        reg_files_item = _load_item(source_path, "reg-files", image_type)
+        reg_files_item = _load_item(source, "reg-files", image_type)
         reg_files = _parse_reg_files(reg_files_item)
 
     pipe_files = {}
     if "pipes" in available_imgs:
-        item = _load_item(source_path, "pipes", image_type)
+        item = _load_item(source, "pipes", image_type)
         pipe_files = _parse_pipe_files(item)
 
-    shared_anon_mem_list = _load_shared_anon_mems(source_path, image_type)
+    pipe_data = _load_pipe_data(source, image_type)
+
+    shared_anon_mem_list = _load_shared_anon_mems(source, image_type)
 
     # reading every process specific data
-    processes = _load_processes(source_path, image_type)
-    return crdata.Application(processes=processes,
-                              regular_files=reg_files,
-                              pipe_files=pipe_files,
-                              shared_anon_mem=shared_anon_mem_list)
+    processes = _load_processes(source, image_type, workers, skip)
+    application = crdata.Application(processes=processes,
+                                     regular_files=reg_files,
+                                     pipe_files=pipe_files,
+                                     pipe_data=pipe_data,
+                                     shared_anon_mem=shared_anon_mem_list)
+
+    if cache is not None and not skip:
+        cache.put(source, image_type, application)
+
+    return application
 
 
-def load_from_jsons(source_path):
-    return load(source_path, "json")
+def load_from_jsons(source_path, **kwargs):
+    return load(source_path, "json", **kwargs)
 
 
-def load_from_imgs(source_path):
-    return load(source_path, "img")
+def load_from_imgs(source_path, **kwargs):
+    return load(source_path, "img", **kwargs)
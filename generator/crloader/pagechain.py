@@ -0,0 +1,213 @@
+""" Merged view of pages of the incremental dump
+
+Every pre-dump iteration dumps only pages, which were changed since the previous
+iteration. Pagemap entries of such dump with PE_PARENT flag refer to pages, which
+are stored in the parent dump (parent's entry may refer to its parent and so on),
+see crdata.PageMap.parent. Generation of the page is a number of parent links to
+follow to find the dump, where the page is stored: 0 for the dump itself, 1 for
+its parent and so on.
+
+Pages are resolved with binary search over parent entries, so the cost of the
+resolution depends on the number of entries in the delta, not on the size of the
+whole memory. Page data is never copied: pages images are memory mapped.
+"""
+
+import crconstants
+
+
+def _page_floor(vaddr):
+    return vaddr - vaddr % crconstants.PAGE_SIZE
+
+
+def iter_segments(page_map, start=0, end=None, skip_flags=0):
+    """ Iterates over the merged page map: pages of [start, end) address range,
+    described by the page map, are resolved to the dumps they are stored in
+
+    :type page_map: crdata.PageMap
+    :param start: start of the address range
+    :param end: end (exclusive) of the address range or None for the whole map
+    :param skip_flags: pages of entries with any of these flags are omitted (e.g.
+           crconstants.PE_ZERO); flags of the entry in the dump, where the page is
+           stored, are checked
+    :return: iterator over (vaddr, nr_pages, generation, pages_id, page_idx)
+             segments, sorted by vaddr; page_idx is an index of the first page
+             of the segment in pages-{pages_id} image of the `generation` dump;
+             pages, which are not stored in any dump (lazy ones), are omitted
+    """
+    if end is None:
+        end = page_map.maps.entry_end(len(page_map.maps) - 1) if len(page_map.maps) else 0
+    return _iter_segments(page_map, 0, start, end, skip_flags)
+
+
+def _iter_segments(page_map, generation, start, end, skip_flags):
+    entries = page_map.maps
+    lo, hi = entries.range_indices(start, end)
+    if lo == hi:
+        return
+
+    offsets = entries.page_offsets()
+    for idx in xrange(lo, hi):
+        vaddr, nr_pages, flags = entries[idx]
+        seg_start = max(vaddr, start)
+        seg_end = min(entries.entry_end(idx), end)
+
+        if flags & skip_flags:
+            continue
+        if flags & crconstants.PE_PRESENT:
+            yield (seg_start,
+                   (seg_end - seg_start) // crconstants.PAGE_SIZE,
+                   generation,
+                   page_map.pages_id,
+                   offsets[idx] + (seg_start - vaddr) // crconstants.PAGE_SIZE)
+        elif flags & crconstants.PE_PARENT and page_map.parent is not None:
+            for segment in _iter_segments(page_map.parent, generation + 1, seg_start, seg_end, skip_flags):
+                yield segment
+
+
+def locate_page(page_map, vaddr):
+    """ Finds the dump, where the page is stored
+
+    :type page_map: crdata.PageMap
+    :param vaddr: any address inside the page
+    :return: (generation, pages_id, page_idx) triple (see `iter_segments`) or
+             None if the page is not stored in any dump
+    """
+    vaddr = _page_floor(vaddr)
+    generation = 0
+    while page_map is not None:
+        entries = page_map.maps
+        idx = entries.find(vaddr)
+        if idx is None:
+            return None
+
+        flags = entries.flags[idx]
+        if flags & crconstants.PE_PRESENT:
+            page_idx = entries.page_offsets()[idx] + (vaddr - entries.vaddrs[idx]) // crconstants.PAGE_SIZE
+            return generation, page_map.pages_id, page_idx
+        if not flags & crconstants.PE_PARENT:
+            return None
+
+        page_map = page_map.parent
+        generation += 1
+    return None
+
+
+def pages_by_generation(page_map):
+    """
+    :type page_map: crdata.PageMap
+    :return: list, where i-th element is the number of pages of the page map,
+             which are stored in the i-th generation dump
+    :rtype: list[int]
+    """
+    counts = []
+    for _, nr_pages, generation, _, _ in iter_segments(page_map):
+        if generation >= len(counts):
+            counts.extend([0] * (generation + 1 - len(counts)))
+        counts[generation] += nr_pages
+    return counts
+
+
+def map_pages_image(source, pages_id):
+    """ Maps pages image into memory
+
+    :param source: dump, which contains the image
+    :type source: dumpsource.DumpDirectory | dumpsource.DumpArchive
+    :return: pages-{pages_id} image data, it must be closed by the caller
+    :rtype: dumpsource.ImageData
+    """
+    # pages images are raw pages, they are never converted to json
+    image = source.map_image("pages-{}".format(pages_id), "img")
+    if image is None:
+        raise RuntimeError("No pages-{} image in {}".format(pages_id, source))
+    return image
+
+
+class PagesImages(object):
+    """ Pages images of the dump and of its parent dumps; Images are mapped
+    into memory on the first access to them
+    """
+
+    def __init__(self, source):
+        """
+        :param source: the latest dump of the chain
+        :type source: dumpsource.DumpDirectory
+        """
+        self._sources = [source]  # i-th generation dump
+        self._images = {}  # (generation, pages_id) --> pages image data (dumpsource.ImageData)
+
+    def source(self, generation):
+        """
+        :return: dump of the given generation (see `iter_segments`)
+        """
+        while len(self._sources) <= generation:
+            parent = self._sources[-1].parent()
+            if parent is None:
+                raise RuntimeError("No parent dump for {}".format(self._sources[-1]))
+            self._sources.append(parent)
+        return self._sources[generation]
+
+    def image(self, generation, pages_id):
+        """
+        :return: read only buffer with pages-{pages_id} image of the `generation` dump
+        """
+        key = (generation, pages_id)
+        if key not in self._images:
+            self._images[key] = map_pages_image(self.source(generation), pages_id)
+        return self._images[key].data
+
+    def close(self):
+        for image in self._images.itervalues():
+            image.close()
+        self._images = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class MergedPages(object):
+    """ Zero copy access to the pages data of the (incremental) dump; Pages
+    images are mapped into memory on the first access to them
+    """
+
+    def __init__(self, source, page_map):
+        """
+        :param source: dump, which page map is loaded from
+        :type source: dumpsource.DumpDirectory
+        :type page_map: crdata.PageMap
+        """
+        self._images = PagesImages(source)
+        self._page_map = page_map
+
+    def page(self, vaddr):
+        """
+        :param vaddr: any address inside the page
+        :return: read only buffer with page data or None if page is not dumped
+        """
+        location = locate_page(self._page_map, vaddr)
+        if location is None:
+            return None
+        generation, pages_id, page_idx = location
+        return buffer(self._images.image(generation, pages_id),
+                      page_idx * crconstants.PAGE_SIZE, crconstants.PAGE_SIZE)
+
+    def segments(self, start=0, end=None):
+        """ Same as `iter_segments`, but with pages data
+
+        :return: iterator over (vaddr, nr_pages, data) triples, where data is
+                 read only buffer with pages of the segment
+        """
+        for vaddr, nr_pages, generation, pages_id, page_idx in iter_segments(self._page_map, start, end):
+            data = self._images.image(generation, pages_id)
+            yield vaddr, nr_pages, buffer(data, page_idx * crconstants.PAGE_SIZE, nr_pages * crconstants.PAGE_SIZE)
+
+    def close(self):
+        self._images.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
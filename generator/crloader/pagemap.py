@@ -0,0 +1,152 @@
+""" Compact representation of pagemap image entries
+
+Pagemap of a process may contain hundreds of thousands of entries, so they
+are stored not as a list of dicts, but as parallel arrays of machine words;
+Sums over the arrays are computed with numpy, if it is available
+"""
+
+import bisect
+from array import array
+from itertools import izip
+
+import crconstants
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _find_u64_typecode():
+    """ 'Q' typecode is not supported by python 2 array module, but 'L'
+    is 64 bit wide on LP64 platforms
+    """
+    for typecode in ('Q', 'L'):
+        try:
+            if array(typecode).itemsize == 8:
+                return typecode
+        except ValueError:
+            continue
+    raise RuntimeError("No 64 bit unsigned integer array typecode available")
+
+
+U64_TYPECODE = _find_u64_typecode()
+U32_TYPECODE = 'I'
+
+
+def array_view(values):
+    """
+    :param values: array.array
+    :return: numpy array over the buffer of the array (without copying)
+    :rtype: numpy.ndarray
+    """
+    dtype = numpy.dtype(values.typecode)
+    if not len(values):
+        return numpy.empty(0, dtype=dtype)
+    return numpy.frombuffer(values, dtype=dtype)
+
+
+class PageMapEntries(object):
+    """ Pagemap entries as parallel arrays: i-th entry describes `nr_pages[i]` pages,
+    starting from virtual address `vaddrs[i]`, with pagemap flags `flags[i]`
+    (see crconstants.PE_* constants); Entries are sorted by virtual address, as
+    they are in the image
+    """
+    __slots__ = ("vaddrs", "nr_pages", "flags", "_page_offsets")
+
+    def __init__(self, vaddrs=None, nr_pages=None, flags=None):
+        self.vaddrs = array(U64_TYPECODE, vaddrs or [])
+        self.nr_pages = array(U32_TYPECODE, nr_pages or [])
+        self.flags = array(U32_TYPECODE, flags or [])
+        self._page_offsets = None
+
+    def append(self, vaddr, nr_pages, flags):
+        self.vaddrs.append(vaddr)
+        self.nr_pages.append(nr_pages)
+        self.flags.append(flags)
+        self._page_offsets = None
+
+    def __len__(self):
+        return len(self.vaddrs)
+
+    def __iter__(self):
+        """
+        :return: iterator over (vaddr, nr_pages, flags) triples
+        """
+        return izip(self.vaddrs, self.nr_pages, self.flags)
+
+    def __getitem__(self, idx):
+        return self.vaddrs[idx], self.nr_pages[idx], self.flags[idx]
+
+    def __repr__(self):
+        return "PageMapEntries(entries={}, pages={})".format(len(self), self.total_pages())
+
+    def total_pages(self, flags_mask=0):
+        """
+        :param flags_mask: if not zero, then only entries, which have any
+               of the flags from the mask, are counted
+        :return: number of pages in all entries
+        """
+        if numpy is None:
+            if not flags_mask:
+                return sum(self.nr_pages)
+            return sum(n for n, f in izip(self.nr_pages, self.flags) if f & flags_mask)
+
+        nr_pages = array_view(self.nr_pages)
+        if flags_mask:
+            nr_pages = nr_pages[(array_view(self.flags) & flags_mask) != 0]
+        return int(nr_pages.sum(dtype=numpy.uint64))
+
+    def page_offsets(self):
+        """ Pages image contains pages of entries with PE_PRESENT flag only,
+        one after another; i-th element of the result is an index of the first
+        page of i-th entry in the pages image (if entry is present one)
+
+        :rtype: array.array
+        """
+        if self._page_offsets is None:
+            self._page_offsets = self._compute_page_offsets()
+        return self._page_offsets
+
+    def _compute_page_offsets(self):
+        if numpy is None:
+            offsets = array(U64_TYPECODE)
+            offset = 0
+            for n, f in izip(self.nr_pages, self.flags):
+                offsets.append(offset)
+                if f & crconstants.PE_PRESENT:
+                    offset += n
+            return offsets
+
+        present = array_view(self.nr_pages).astype(numpy.uint64)
+        present[(array_view(self.flags) & crconstants.PE_PRESENT) == 0] = 0
+        # offset of the entry is a number of present pages before it
+        offsets = numpy.cumsum(present, dtype=numpy.uint64) - present
+        return array(U64_TYPECODE, offsets.tostring())
+
+    def entry_end(self, idx):
+        """
+        :return: end address (exclusive) of idx-th entry
+        """
+        return self.vaddrs[idx] + self.nr_pages[idx] * crconstants.PAGE_SIZE
+
+    def find(self, vaddr):
+        """
+        :return: index of the entry, which contains given address, or None
+        """
+        idx = bisect.bisect_right(self.vaddrs, vaddr) - 1
+        if idx < 0 or vaddr >= self.entry_end(idx):
+            return None
+        return idx
+
+    def range_indices(self, start, end):
+        """ Finds entries, which intersect [start, end) address range
+
+        :return: pair of indices (lo, hi), so entries lo, lo + 1, ... hi - 1 intersect
+                 the address range
+        """
+        lo = bisect.bisect_right(self.vaddrs, start) - 1
+        if lo < 0 or start >= self.entry_end(lo):
+            lo += 1
+        hi = bisect.bisect_left(self.vaddrs, end)
+        return lo, max(lo, hi)
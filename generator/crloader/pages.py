@@ -0,0 +1,432 @@
+""" Analysis of dumped pages data
+
+Pages images are memory mapped and scanned with NumPy in chunks of pages, so
+any image is analysed with bounded memory and without copying pages into Python
+strings. NumPy is optional for zero pages detection (without it pages are
+compared with the zero page one by one), but it is required to find pages,
+shared between processes.
+
+Results of the analysis are stored as additional (not CRIU) flags of page map
+entries: entries are split into runs of pages, which have the same analysis
+result, so restoration planning can skip some of the runs (see
+pagechain.iter_segments `skip_flags`).
+"""
+
+import bisect
+import mmap
+
+import crconstants
+import crdata
+import pagechain
+import vmtable
+from pagemap import PageMapEntries
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# number of pages to scan at once
+SCAN_CHUNK_PAGES = 4096
+
+_ZERO_PAGE = "\0" * crconstants.PAGE_SIZE
+_PAGE_WORDS = crconstants.PAGE_SIZE // 8
+
+# page digest is a dot product of page words and these keys (modulo 2 ** 64)
+_DIGEST_KEYS = numpy.random.RandomState(0x636f77).randint(
+    0, 2 ** 64, size=_PAGE_WORDS, dtype=numpy.uint64) | 1 if numpy is not None else None
+
+_MAP_PRIVATE_MASK = vmtable.names_to_mask([crconstants.VMA_FLAG_MAP_PRIVATE], crconstants.VMA_MAP_FLAGS)
+
+
+def _require_numpy():
+    if numpy is None:
+        raise RuntimeError("numpy package is required for pages analysis")
+
+
+def zero_page_mask(data, nr_pages):
+    """ Finds all-zero pages
+
+    :param data: buffer with pages (memory mapped pages image or part of it)
+    :param nr_pages: number of pages in the buffer to check
+    :return: sequence of bools: True for all-zero page
+    """
+    if numpy is None:
+        return [data[i * crconstants.PAGE_SIZE:(i + 1) * crconstants.PAGE_SIZE] == _ZERO_PAGE
+                for i in xrange(nr_pages)]
+
+    mask = numpy.empty(nr_pages, dtype=bool)
+    for first in xrange(0, nr_pages, SCAN_CHUNK_PAGES):
+        count = min(SCAN_CHUNK_PAGES, nr_pages - first)
+        words = numpy.frombuffer(data, dtype=numpy.uint64, count=count * _PAGE_WORDS,
+                                 offset=first * crconstants.PAGE_SIZE)
+        numpy.logical_not(words.reshape(count, _PAGE_WORDS).any(axis=1), out=mask[first:first + count])
+    return mask
+
+
+def _change_points(mask):
+    """
+    :return: sorted list of indices i, such that mask[i] != mask[i - 1]
+    """
+    if numpy is not None and isinstance(mask, numpy.ndarray):
+        return (numpy.flatnonzero(mask[1:] != mask[:-1]) + 1).tolist()
+    return [i for i in xrange(1, len(mask)) if mask[i] != mask[i - 1]]
+
+
+def split_present_entries(entries, mask, flag):
+    """ Splits present entries into runs of pages with the same mask value;
+    Entries of runs with True value get `flag`. Other entries are copied as is
+
+    :type entries: PageMapEntries
+    :param mask: sequence of bools, i-th element describes i-th page of the pages image
+    :param flag: flag to mark runs with
+    :rtype: PageMapEntries
+    """
+    changes = _change_points(mask)
+    offsets = entries.page_offsets()
+    result = PageMapEntries()
+
+    for idx, (vaddr, nr_pages, flags) in enumerate(entries):
+        if not flags & crconstants.PE_PRESENT:
+            result.append(vaddr, nr_pages, flags)
+            continue
+
+        first = offsets[idx]
+        lo = bisect.bisect_right(changes, first)
+        hi = bisect.bisect_left(changes, first + nr_pages)
+        bounds = [first] + changes[lo:hi] + [first + nr_pages]
+        for run_start, run_end in zip(bounds, bounds[1:]):
+            result.append(vaddr + (run_start - first) * crconstants.PAGE_SIZE,
+                          run_end - run_start,
+                          flags | flag if mask[run_start] else flags)
+    return result
+
+
+def annotate_zero_pages(source, page_map):
+    """ Marks all-zero pages of the page map with PE_ZERO flag; Such pages need
+    not be copied into anonymous mappings, which are zero filled already. Zero
+    pages keep PE_PRESENT flag, so they are located in pages image as before.
+    Page maps of parent dumps are annotated too
+
+    :param source: dump, which page map is loaded from
+    :type source: dumpsource.DumpDirectory
+    :type page_map: crdata.PageMap
+    :return: annotated copy of the page map
+    :rtype: crdata.PageMap
+    """
+    parent = page_map.parent
+    if parent is not None:
+        parent_source = source.parent()
+        if parent_source is None:
+            raise RuntimeError("No parent dump for {}".format(source))
+        parent = annotate_zero_pages(parent_source, parent)
+
+    nr_pages = page_map.maps.total_pages(crconstants.PE_PRESENT)
+    if nr_pages:
+        with pagechain.map_pages_image(source, page_map.pages_id) as image:
+            mask = zero_page_mask(image.data, nr_pages)
+    else:
+        mask = zero_page_mask("", 0)
+
+    return crdata.PageMap(resource_id=page_map.resource_id,
+                          pages_id=page_map.pages_id,
+                          maps=split_present_entries(page_map.maps, mask, crconstants.PE_ZERO),
+                          parent=parent)
+
+
+def page_digests(data, nr_pages):
+    """ Calculates 64 bit digests of pages; Equal pages have equal digests,
+    but pages with equal digests must be compared to be sure they are equal
+
+    :param data: buffer with pages (memory mapped pages image or part of it)
+    :param nr_pages: number of pages in the buffer
+    :rtype: numpy.ndarray
+    """
+    _require_numpy()
+    digests = numpy.empty(nr_pages, dtype=numpy.uint64)
+    for first in xrange(0, nr_pages, SCAN_CHUNK_PAGES):
+        count = min(SCAN_CHUNK_PAGES, nr_pages - first)
+        words = numpy.frombuffer(data, dtype=numpy.uint64, count=count * _PAGE_WORDS,
+                                 offset=first * crconstants.PAGE_SIZE)
+        digests[first:first + count] = numpy.dot(words.reshape(count, _PAGE_WORDS), _DIGEST_KEYS)
+    return digests
+
+
+def _page_rows(data):
+    """
+    :return: pages of the buffer as rows of 64 bit words matrix (without copying)
+    """
+    return numpy.frombuffer(data, dtype=numpy.uint64).reshape(-1, _PAGE_WORDS)
+
+
+class _ProcessPages(object):
+    """ Dumped pages of the process as per page arrays, sorted by address:
+    address, pages image, index of the page in the image and page digest
+    """
+
+    def __init__(self, process, images, digests):
+        """
+        :type process: crdata.Process
+        :type images: pagechain.PagesImages
+        :param digests: (generation, pages_id) --> digests of all pages of the image;
+               it is filled with digests of images, which are not there yet
+        """
+        self.vmas = process.vmas
+        self.image_keys = []  # (generation, pages_id) of i-th image of the process
+        vaddrs, image_ids, page_idxs = [], [], []
+
+        for vaddr, nr_pages, generation, pages_id, page_idx in pagechain.iter_segments(process.page_map):
+            key = (generation, pages_id)
+            if key not in digests:
+                data = images.image(generation, pages_id)
+                digests[key] = page_digests(data, len(data) // crconstants.PAGE_SIZE)
+            if key not in self.image_keys:
+                self.image_keys.append(key)
+
+            vaddrs.append(numpy.arange(vaddr, vaddr + nr_pages * crconstants.PAGE_SIZE, crconstants.PAGE_SIZE,
+                                       dtype=numpy.uint64))
+            image_ids.append(numpy.full(nr_pages, self.image_keys.index(key), dtype=numpy.int64))
+            page_idxs.append(numpy.arange(page_idx, page_idx + nr_pages, dtype=numpy.int64))
+
+        self.vaddrs = numpy.concatenate(vaddrs) if vaddrs else numpy.empty(0, dtype=numpy.uint64)
+        self.image_ids = numpy.concatenate(image_ids) if image_ids else numpy.empty(0, dtype=numpy.int64)
+        self.page_idxs = numpy.concatenate(page_idxs) if page_idxs else numpy.empty(0, dtype=numpy.int64)
+        self.digests = numpy.empty(len(self.vaddrs), dtype=numpy.uint64)
+        for image_id, key in enumerate(self.image_keys):
+            selected = self.image_ids == image_id
+            self.digests[selected] = digests[key][self.page_idxs[selected]]
+
+    def vma_columns(self, vaddrs):
+        """
+        :param vaddrs: page addresses of the process
+        :return: (start, end, pgoff, status) columns of VMAs, which contain pages,
+                 and mask of pages, which are in private VMAs
+        """
+        vmas = self.vmas
+        if not len(vmas):
+            # pages are out of any VMA
+            return [numpy.zeros(len(vaddrs), dtype=numpy.uint64) for _ in xrange(4)], \
+                numpy.zeros(len(vaddrs), dtype=bool)
+
+        starts = numpy.array(vmas.starts, dtype=numpy.uint64)
+        idx = numpy.maximum(numpy.searchsorted(starts, vaddrs, side="right") - 1, 0)
+        columns = [numpy.array(column, dtype=numpy.uint64)[idx]
+                   for column in (vmas.starts, vmas.ends, vmas.pgoffs, vmas.statuses)]
+        private = (numpy.array(vmas.flags, dtype=numpy.uint64)[idx] & _MAP_PRIVATE_MASK) != 0
+        inside = (columns[0] <= vaddrs) & (vaddrs < columns[1])
+        return columns, private & inside
+
+
+def _equal_pages(images, child, child_idxs, parent, parent_idxs):
+    """ Compares pages of two processes byte by byte
+
+    :type images: pagechain.PagesImages
+    :type child: _ProcessPages
+    :type parent: _ProcessPages
+    :return: mask of equal pairs of pages
+    """
+    equal = numpy.zeros(len(child_idxs), dtype=bool)
+    pairs = child.image_ids[child_idxs] * len(parent.image_keys) + parent.image_ids[parent_idxs]
+
+    for pair in numpy.unique(pairs):
+        child_rows = _page_rows(images.image(*child.image_keys[pair // len(parent.image_keys)]))
+        parent_rows = _page_rows(images.image(*parent.image_keys[pair % len(parent.image_keys)]))
+        selected = numpy.flatnonzero(pairs == pair)
+        for first in xrange(0, len(selected), SCAN_CHUNK_PAGES):
+            chunk = selected[first:first + SCAN_CHUNK_PAGES]
+            equal[chunk] = (child_rows[child.page_idxs[child_idxs[chunk]]] ==
+                            parent_rows[parent.page_idxs[parent_idxs[chunk]]]).all(axis=1)
+    return equal
+
+
+def _shared_pages(images, child, parent):
+    """ Finds pages of the child, which are equal to pages of the parent at the
+    same address in the same private VMA, so they can be inherited on fork
+
+    :type images: pagechain.PagesImages
+    :type child: _ProcessPages
+    :type parent: _ProcessPages
+    :return: sorted addresses of shared pages
+    :rtype: numpy.ndarray
+    """
+    vaddrs, child_idxs, parent_idxs = numpy.intersect1d(child.vaddrs, parent.vaddrs,
+                                                        assume_unique=True, return_indices=True)
+    candidates = child.digests[child_idxs] == parent.digests[parent_idxs]
+
+    child_vmas, child_private = child.vma_columns(vaddrs)
+    parent_vmas, parent_private = parent.vma_columns(vaddrs)
+    candidates &= child_private & parent_private
+    for child_column, parent_column in zip(child_vmas, parent_vmas):
+        candidates &= child_column == parent_column
+
+    vaddrs, child_idxs, parent_idxs = vaddrs[candidates], child_idxs[candidates], parent_idxs[candidates]
+    # digests may collide, so candidates are compared byte by byte
+    return vaddrs[_equal_pages(images, child, child_idxs, parent, parent_idxs)]
+
+
+def _mark_ranges(entries, run_starts, run_ends, flag):
+    """ Splits entries, so pages of given address ranges are in separate
+    entries, which get `flag`
+
+    :type entries: PageMapEntries
+    :param run_starts: sorted starts of not overlapping address ranges
+    :param run_ends: ends (exclusive) of address ranges
+    :param flag: flag to mark pages with
+    :rtype: PageMapEntries
+    """
+    result = PageMapEntries()
+    for idx, (vaddr, nr_pages, flags) in enumerate(entries):
+        end = entries.entry_end(idx)
+        pos = vaddr
+        for run in xrange(bisect.bisect_right(run_ends, vaddr), bisect.bisect_left(run_starts, end)):
+            run_start, run_end = max(run_starts[run], vaddr), min(run_ends[run], end)
+            if pos < run_start:
+                result.append(pos, (run_start - pos) // crconstants.PAGE_SIZE, flags)
+            result.append(run_start, (run_end - run_start) // crconstants.PAGE_SIZE, flags | flag)
+            pos = run_end
+        if pos < end:
+            result.append(pos, (end - pos) // crconstants.PAGE_SIZE, flags)
+    return result
+
+
+def _mark_pages(entries, vaddrs, flag):
+    """ Same as `_mark_ranges`, but pages are given by their addresses
+
+    :param vaddrs: sorted addresses of pages to mark
+    :type vaddrs: numpy.ndarray
+    """
+    if not len(vaddrs):
+        return _mark_ranges(entries, [], [], flag)
+
+    # runs of adjacent pages
+    breaks = numpy.flatnonzero(numpy.diff(vaddrs) != crconstants.PAGE_SIZE) + 1
+    run_starts = vaddrs[numpy.r_[0, breaks]].tolist()
+    run_ends = (vaddrs[numpy.r_[breaks - 1, len(vaddrs) - 1]] + crconstants.PAGE_SIZE).tolist()
+    return _mark_ranges(entries, run_starts, run_ends, flag)
+
+
+def annotate_cow_pages(source, processes):
+    """ Marks pages of processes, which are equal to the pages of their parent
+    processes at the same address in the same private VMA, with PE_COW flag; Such
+    pages may be filled only in the ancestor before it forks, so children get
+    them by inheriting the memory (and share them with copy-on-write); It is
+    not done yet, because private VMAs are not inherited in the IR
+
+    :param source: dump, which processes are loaded from
+    :type source: dumpsource.DumpDirectory
+    :param processes: processes of the dump
+    :type processes: list[crdata.Process]
+    :return: map from pid to annotated copy of process page map (for processes,
+             which have page map)
+    :rtype: dict[int, crdata.PageMap]
+    """
+    _require_numpy()
+    processes = [p for p in processes if p.page_map is not None]
+    page_maps = {}
+
+    with pagechain.PagesImages(source) as images:
+        digests = {}
+        pages = {p.pid: _ProcessPages(p, images, digests) for p in processes}
+        for p in processes:
+            shared = _shared_pages(images, pages[p.pid], pages[p.ppid]) if p.ppid in pages \
+                else numpy.empty(0, dtype=numpy.uint64)
+            page_maps[p.pid] = crdata.PageMap(resource_id=p.page_map.resource_id,
+                                              pages_id=p.page_map.pages_id,
+                                              maps=_mark_pages(p.page_map.maps, shared, crconstants.PE_COW),
+                                              parent=p.page_map.parent)
+    return page_maps
+
+
+def _equal_page_runs(data, file_data, nr_pages):
+    """ Compares pages of two buffers
+
+    :return: list of (first page, end page) runs of equal pages
+    """
+    if data == file_data:
+        return [(0, nr_pages)]
+
+    runs = []
+    for i in xrange(nr_pages):
+        offset = i * crconstants.PAGE_SIZE
+        if buffer(data, offset, crconstants.PAGE_SIZE) != buffer(file_data, offset, crconstants.PAGE_SIZE):
+            continue
+        if runs and runs[-1][1] == i:
+            runs[-1] = (runs[-1][0], i + 1)
+        else:
+            runs.append((i, i + 1))
+    return runs
+
+
+def _map_file(path):
+    """
+    :return: memory mapped file, empty string for empty file, None if file can't be read
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, 2)
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if f.tell() else ""
+    except (IOError, OSError, mmap.error):
+        return None
+
+
+def annotate_file_pages(source, process, reg_files):
+    """ Marks pages of private file mappings, which are equal to the contents of
+    the file at the corresponding offset, with PE_FILE flag; Such pages need not
+    be copied, mapping of the file gives them. Files are read on this host, so the
+    analysis must be done, where files are the same as at restore time. Mappings
+    of files, which can't be read, are skipped, as well as the tail of the file,
+    which is not a whole page
+
+    :param source: dump, which process is loaded from
+    :type source: dumpsource.DumpDirectory
+    :type process: crdata.Process
+    :param reg_files: regular files of the application
+    :type reg_files: list[crdata.RegFile]
+    :return: annotated copy of process page map
+    :rtype: crdata.PageMap
+    """
+    paths = {f.id: f.path for f in reg_files}
+    vmas = process.vmas
+    page_map = process.page_map
+    files = {}  # path --> memory mapped file
+    run_starts, run_ends = [], []
+
+    with pagechain.PagesImages(source) as images:
+        try:
+            for idx in vmas.select(status=[crconstants.VMA_STATUS_FILE_PRIVATE]):
+                path = paths.get(vmas.shmids[idx])
+                if path is None:
+                    continue
+                if path not in files:
+                    files[path] = _map_file(path)
+                file_data = files[path]
+                if not file_data:
+                    continue
+
+                start = vmas.starts[idx]
+                file_pages = len(file_data) // crconstants.PAGE_SIZE
+                for vaddr, nr_pages, generation, pages_id, page_idx in \
+                        pagechain.iter_segments(page_map, start, vmas.ends[idx]):
+                    # pgoff is in bytes and it is page aligned
+                    file_page = (vmas.pgoffs[idx] + vaddr - start) // crconstants.PAGE_SIZE
+                    nr_pages = min(nr_pages, file_pages - file_page)
+                    if nr_pages <= 0:
+                        continue
+
+                    size = nr_pages * crconstants.PAGE_SIZE
+                    runs = _equal_page_runs(
+                        buffer(images.image(generation, pages_id), page_idx * crconstants.PAGE_SIZE, size),
+                        buffer(file_data, file_page * crconstants.PAGE_SIZE, size),
+                        nr_pages)
+                    for first, end in runs:
+                        run_starts.append(vaddr + first * crconstants.PAGE_SIZE)
+                        run_ends.append(vaddr + end * crconstants.PAGE_SIZE)
+        finally:
+            for file_data in files.itervalues():
+                if file_data:
+                    file_data.close()
+
+    return crdata.PageMap(resource_id=page_map.resource_id,
+                          pages_id=page_map.pages_id,
+                          maps=_mark_ranges(page_map.maps, run_starts, run_ends, crconstants.PE_FILE),
+                          parent=page_map.parent)
@@ -0,0 +1,136 @@
+""" Fast decoding of CRIU images
+
+pycriu converts every protobuf message into nested dicts with pretty printed
+fields (hex strings, flag names joined with '|'), which loader parses back
+after that. For the biggest images (mm, pagemap) messages are read here
+directly and only the fields, which are used by the loader, are extracted
+as plain integers. Any other image is decoded with pycriu as usual.
+"""
+
+import struct
+
+from google.protobuf.message import DecodeError
+from pycriu import images
+
+from imgreader import ImageReader
+
+
+def read_magic(f):
+    """ Reads image magic from the beginning of the image
+
+    :return: magic name
+    :rtype: str
+    """
+    return ImageReader.from_file(f).magic
+
+
+def _decode_vma(vma):
+    return {
+        'start': vma.start,
+        'end': vma.end,
+        'pgoff': vma.pgoff,
+        'shmid': vma.shmid,
+        'prot': vma.prot,
+        'flags': vma.flags,
+        'status': vma.status,
+        'fd': vma.fd,
+        'fdflags': vma.fdflags if vma.HasField('fdflags') else None
+    }
+
+
+def _decode_mm_entry(mm):
+    return {
+        'mm_start_code': mm.mm_start_code,
+        'mm_end_code': mm.mm_end_code,
+        'mm_start_data': mm.mm_start_data,
+        'mm_end_data': mm.mm_end_data,
+        'mm_start_stack': mm.mm_start_stack,
+        'mm_start_brk': mm.mm_start_brk,
+        'mm_brk': mm.mm_brk,
+        'mm_arg_start': mm.mm_arg_start,
+        'mm_arg_end': mm.mm_arg_end,
+        'mm_env_start': mm.mm_env_start,
+        'mm_env_end': mm.mm_env_end,
+        'mm_saved_auxv': list(mm.mm_saved_auxv),
+        'exe_file_id': mm.exe_file_id,
+        'dumpable': mm.dumpable,
+        'vmas': [_decode_vma(vma) for vma in mm.vmas]
+    }
+
+
+def _decode_mm(reader):
+    """
+    :type reader: ImageReader
+    """
+    return [_decode_mm_entry(mm) for mm in reader.iter_entries(images.pb.mm_entry)]
+
+
+def _decode_pagemap(reader):
+    """ Pagemap entries are decoded lazily (one by one, while they are
+    iterated), so pagemap of any size is parsed with bounded memory
+
+    :type reader: ImageReader
+    """
+    head = reader.entry(0, images.pb.pagemap_head)
+    yield {'pages_id': head.pages_id}
+
+    for e in reader.iter_entries(images.pb.pagemap_entry, start=1):
+        entry = {'vaddr': e.vaddr, 'nr_pages': e.nr_pages}
+        if e.HasField('flags'):
+            entry['flags'] = e.flags
+        elif e.HasField('in_parent'):
+            entry['in_parent'] = e.in_parent
+        yield entry
+
+
+# magic name --> function, which decodes entries of the image
+FAST_DECODERS = {
+    'MM': _decode_mm,
+    'PAGEMAP': _decode_pagemap,
+}
+
+
+def load(f):
+    """ Loads image; Result has the same structure, as the one, returned
+    by pycriu (dict with 'magic' and 'entries'), but for images with fast
+    decoders entries contain only fields, used by the loader, and all
+    of them are plain integers; Also entries may be a lazy iterator
+    instead of a list for images, which can be big
+
+    :param f: image file opened in binary mode
+    :rtype: dict
+    """
+    reader = ImageReader.from_file(f)
+    if reader.magic not in FAST_DECODERS:
+        reader.close()
+        f.seek(0)
+        return images.load(f, True)
+
+    return {
+        'magic': reader.magic,
+        'entries': FAST_DECODERS[reader.magic](reader)
+    }
+
+
+def load_pretty(f):
+    """ Loads image as `crit decode --pretty` does (all fields, pretty printed);
+    Broken images are rejected: framing of the images with fast decoders is
+    checked (see ImageReader), and pycriu decoding errors are reported as
+    ValueError, so any broken image is told apart from the loader errors
+
+    :param f: image file opened in binary mode
+    :raises images.MagicException: image has unknown magic
+    :raises ValueError: image is truncated or corrupt
+    :rtype: dict
+    """
+    with ImageReader.from_file(f) as reader:
+        # entries of these images have no payload after them, so they are framed
+        # by sizes only; all of them are found, so truncated image is rejected
+        if reader.magic in FAST_DECODERS:
+            len(reader)
+    f.seek(0)
+
+    try:
+        return images.load(f, True)
+    except (struct.error, DecodeError) as exc:
+        raise ValueError("Image can't be decoded: {}".format(exc))
@@ -0,0 +1,146 @@
+""" Persistent cache of loaded applications (snapshots)
+
+Snapshot is a pickled crdata.Application, which is keyed by dump fingerprint:
+names, sizes and modification times of dump images. So if any image is changed,
+snapshot is not used anymore (and it is replaced with the new one on the next load).
+Total size of the cache directory is bounded: least recently used snapshots are
+evicted first.
+"""
+
+import cPickle as pickle
+import hashlib
+import os
+import tempfile
+
+# must be increased every time crdata structures are changed, so
+# snapshots, made by older loader, are not used
+SNAPSHOT_FORMAT_VERSION = 10
+
+SNAPSHOT_FILE_EXT = ".snapshot"
+
+DEFAULT_MAX_CACHE_SIZE = 2 * 1024 ** 3
+
+
+def dump_fingerprint(source, image_type):
+    """ Calculates fingerprint of the dump: hash of names, sizes and
+    modification times of all dump images (or of the dump archive); Images
+    of parent dumps are fingerprinted too in case of incremental dump
+
+    :param source: dump images
+    :type source: dumpsource.DumpDirectory | dumpsource.DumpArchive
+    :param image_type: image extension
+    :rtype: str
+    """
+    fingerprint = hashlib.sha1()
+    fingerprint.update("{}:{}\n".format(SNAPSHOT_FORMAT_VERSION, image_type))
+
+    generation = 0
+    while source is not None:
+        for name, size, mtime in source.stat_images(image_type):
+            fingerprint.update("{}:{}:{}:{}\n".format(generation, name, size, mtime))
+        source = source.parent()
+        generation += 1
+
+    return fingerprint.hexdigest()
+
+
+class SnapshotCache(object):
+    """ Directory with application snapshots; At most one snapshot
+    is stored for one dump directory
+    """
+
+    def __init__(self, cache_dir, max_size=DEFAULT_MAX_CACHE_SIZE):
+        """
+        :param cache_dir: directory to store snapshots in; created if not exists
+        :param max_size: max total size of all snapshots in bytes
+        """
+        self._cache_dir = cache_dir
+        self._max_size = max_size
+
+    def get(self, source, image_type):
+        """ Looks up snapshot for the dump
+
+        :param source: dump images, see dumpsource module
+        :param image_type: image extension
+        :return: application or None in case there is no valid snapshot
+        :rtype: crdata.Application
+        """
+        snapshot_path = self._snapshot_path(source, image_type)
+        if not os.path.isfile(snapshot_path):
+            return None
+
+        try:
+            with open(snapshot_path, "rb") as f:
+                application = pickle.load(f)
+        except (IOError, EOFError, pickle.UnpicklingError,
+                AttributeError, ImportError, IndexError, TypeError, ValueError):
+            # snapshot is broken or it refers to changed classes
+            return None
+
+        # touching the snapshot, so it is evicted later
+        os.utime(snapshot_path, None)
+        return application
+
+    def put(self, source, image_type, application):
+        """ Stores snapshot of the application, loaded from the dump; Outdated
+        snapshots of the same dump are removed
+
+        :param source: dump images, see dumpsource module
+        :param image_type: image extension
+        :type application: crdata.Application
+        """
+        if not os.path.isdir(self._cache_dir):
+            os.makedirs(self._cache_dir)
+
+        snapshot_path = self._snapshot_path(source, image_type)
+        fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(application, f, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_path, snapshot_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        dump_prefix = self._dump_prefix(source)
+        for name, _, _ in self._list_snapshots():
+            path = os.path.join(self._cache_dir, name)
+            if name.startswith(dump_prefix) and path != snapshot_path:
+                os.remove(path)
+
+        self._evict()
+
+    def _evict(self):
+        """ Removes least recently used snapshots until cache size is
+        less than max size
+        """
+        snapshots = sorted(self._list_snapshots(), key=lambda s: s[2])
+        total_size = sum(size for _, size, _ in snapshots)
+
+        # newest snapshot is always kept
+        for name, size, _ in snapshots[:-1]:
+            if total_size <= self._max_size:
+                break
+            os.remove(os.path.join(self._cache_dir, name))
+            total_size -= size
+
+    def _list_snapshots(self):
+        """
+        :return: list of (file name, size, modification time) triples
+        """
+        snapshots = []
+        for name in os.listdir(self._cache_dir):
+            if not name.endswith(SNAPSHOT_FILE_EXT):
+                continue
+            st = os.stat(os.path.join(self._cache_dir, name))
+            snapshots.append((name, st.st_size, st.st_mtime))
+        return snapshots
+
+    @staticmethod
+    def _dump_prefix(source):
+        return hashlib.sha1(source.path).hexdigest()[:16]
+
+    def _snapshot_path(self, source, image_type):
+        return os.path.join(self._cache_dir, "{}-{}{}".format(self._dump_prefix(source),
+                                                              dump_fingerprint(source, image_type),
+                                                              SNAPSHOT_FILE_EXT))
@@ -0,0 +1,180 @@
+""" Compact representation of process virtual memory areas
+
+Processes may have tens of thousands of VMAs, so they are stored as
+parallel arrays, where prot, flags and status fields are integer bit masks
+(see crconstants.VMA_*_FLAGS); crdata.VmArea objects are created only on demand;
+VMAs are selected by flags with numpy, if it is available
+"""
+
+from array import array
+from itertools import compress, izip
+
+import crconstants
+import crdata
+from pagemap import U64_TYPECODE, array_view
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+I64_TYPECODE = U64_TYPECODE.lower()
+U32_TYPECODE = 'I'
+
+# fdflags field is optional
+NO_FDFLAGS = -1
+
+# kind of VMA resource ids (see loader.make_resource_id)
+VMA_RESOURCE_KIND = "vma"
+
+
+def names_to_mask(names, flags_map):
+    """
+    :param names: iterable of flag names
+    :param flags_map: sequence of (flag name, flag value) pairs
+    :return: bit mask with all given flags set
+    :rtype: int
+    """
+    flags_dict = dict(flags_map)
+    mask = 0
+    for name in names:
+        mask |= flags_dict[name]
+    return mask
+
+
+def mask_to_names(mask, flags_map):
+    """ Converts bit mask to set of flag names; Unknown bits are
+    represented with hex number string (as in pretty decoded images);
+    Zero mask is an empty set (not a set with an empty name, as pretty
+    decoded "" value was split before)
+
+    :param flags_map: sequence of (flag name, flag value) pairs
+    :rtype: set[str]
+    """
+    names = set()
+    for name, value in flags_map:
+        if mask & value:
+            names.add(name)
+            mask &= ~value
+    if mask:
+        names.add("0x{:x}".format(mask))
+    return names
+
+
+class VmAreaTable(object):
+    """ Virtual memory areas of one process as parallel arrays (columns);
+    i-th VMA is described with i-th elements of the columns; Resource id
+    of i-th VMA is (VMA_RESOURCE_KIND, owner, i)
+    """
+    __slots__ = ("owner", "starts", "ends", "pgoffs", "shmids",
+                 "prots", "flags", "statuses", "fds", "fdflags", "_vmas")
+
+    def __init__(self, owner=0):
+        """
+        :param owner: pid of the process, which VMAs are stored in the table
+        """
+        self.owner = owner
+        self.starts = array(U64_TYPECODE)
+        self.ends = array(U64_TYPECODE)
+        self.pgoffs = array(U64_TYPECODE)
+        self.shmids = array(I64_TYPECODE)
+        self.prots = array(U32_TYPECODE)
+        self.flags = array(U32_TYPECODE)
+        self.statuses = array(U32_TYPECODE)
+        self.fds = array(I64_TYPECODE)
+        self.fdflags = array(I64_TYPECODE)
+        self._vmas = []  # materialized VmArea objects (or None)
+
+    def append(self, start, end, pgoff, shmid, prot, flags, status, fd, fdflags=None):
+        """ Appends VMA to the table; prot, flags and status are bit masks
+        """
+        self.starts.append(start)
+        self.ends.append(end)
+        self.pgoffs.append(pgoff)
+        self.shmids.append(shmid)
+        self.prots.append(prot)
+        self.flags.append(flags)
+        self.statuses.append(status)
+        self.fds.append(fd)
+        self.fdflags.append(NO_FDFLAGS if fdflags is None else fdflags)
+        self._vmas.append(None)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        """
+        :return: iterator over all VMAs (materialized)
+        :rtype: collections.Iterator[crdata.VmArea]
+        """
+        return (self.vma(idx) for idx in xrange(len(self)))
+
+    def __repr__(self):
+        return "VmAreaTable(vmas={})".format(len(self))
+
+    def resource_id(self, idx):
+        """
+        :return: resource id of idx-th VMA (without materializing it)
+        """
+        return VMA_RESOURCE_KIND, self.owner, idx
+
+    def vma(self, idx):
+        """ Returns VmArea object for idx-th VMA; Object is created only once,
+        so the same object is returned every time
+
+        :rtype: crdata.VmArea
+        """
+        vma = self._vmas[idx]
+        if vma is None:
+            fdflags = self.fdflags[idx]
+            vma = crdata.VmArea(
+                resource_id=self.resource_id(idx),
+                start=self.starts[idx],
+                end=self.ends[idx],
+                pgoff=self.pgoffs[idx],
+                shmid=self.shmids[idx],
+                prot=mask_to_names(self.prots[idx], crconstants.VMA_PROT_FLAGS),
+                flags=mask_to_names(self.flags[idx], crconstants.VMA_MAP_FLAGS),
+                status=mask_to_names(self.statuses[idx], crconstants.VMA_STATUS_FLAGS),
+                fd=self.fds[idx],
+                fdflags=None if fdflags == NO_FDFLAGS else fdflags
+            )
+            self._vmas[idx] = vma
+        return vma
+
+    def vmas_at(self, indices):
+        """
+        :param indices: VMA indices in the table
+        :rtype: list[crdata.VmArea]
+        """
+        return [self.vma(idx) for idx in indices]
+
+    def select(self, prot=(), flags=(), status=()):
+        """ Finds VMAs, which have at least one flag from every
+        non-empty flag names list
+
+        :param prot: prot flag names (PROT_*)
+        :param flags: map flag names (crconstants.VMA_FLAG_*)
+        :param status: status flag names (crconstants.VMA_STATUS_*)
+        :return: list of indices of found VMAs
+        :rtype: list[int]
+        """
+        selectors = []
+        for names, column, flags_map in ((prot, self.prots, crconstants.VMA_PROT_FLAGS),
+                                         (flags, self.flags, crconstants.VMA_MAP_FLAGS),
+                                         (status, self.statuses, crconstants.VMA_STATUS_FLAGS)):
+            if names:
+                selectors.append((column, names_to_mask(names, flags_map)))
+
+        if not selectors:
+            return range(len(self))
+        if numpy is not None:
+            selected = numpy.ones(len(self), dtype=bool)
+            for column, mask in selectors:
+                selected &= (array_view(column) & mask) != 0
+            return numpy.flatnonzero(selected).tolist()
+
+        columns = [[v & mask for v in column] for column, mask in selectors]
+        if len(columns) == 1:
+            return list(compress(xrange(len(self)), columns[0]))
+        return list(compress(xrange(len(self)), (all(s) for s in izip(*columns))))
@@ -173,6 +173,31 @@ def fill_vma_page(pid, vma_id, vma_pgoff, pagedump_pgoff):
     }
 
 
+def fill_vma_pages(pid, vma_id, vma_pgoff, nr_pages, generation, pages_id, pagedump_pgoff):
+    """
+    Command, which tells interpreter to fill the range of VMA pages with pages
+    from page dump made by CRIU (several pages at once, unlike FILL_VMA_PAGE)
+    :param pid: id of the target process
+    :param vma_id: id of vma, which pages going to be filled
+    :param vma_pgoff: offset (in pages) of the first page to fill from VMA start
+    :param nr_pages: number of pages to fill
+    :param generation: number of parent links to follow from the dump to find the
+           dump with the pages (0 if pages are in the dump itself; see crloader.pagechain)
+    :param pages_id: id of pages image (pages-{pages_id}.img) to read pages from
+    :param pagedump_pgoff: offset (in pages) of the first page in the pages image
+    """
+    return {
+        "#command": "FILL_VMA_PAGES",
+        "pid": pid,
+        "vma_id": vma_id,
+        "vma_pgoff": vma_pgoff,
+        "nr_pages": nr_pages,
+        "generation": generation,
+        "pages_id": pages_id,
+        "dump_pgoff": pagedump_pgoff
+    }
+
+
 def setup_vm_segments(pid, vm_info):
     """
     Command with data for setting up special memory areas starts and ends, like
@@ -201,3 +226,27 @@ def setup_vm_segments(pid, vm_info):
         "exe_file_id": vm_info.exe_file_id,
         "saved_auxv": vm_info.saved_auxv
     }
+
+
+def splice_pipe_data(pid, fd, fd_is_write_end, pipe_data):
+    """
+    Command, which tells interpreter to refill pipe with the data, buffered in it
+    at dump time; Data is spliced straight from the image file, so it is never
+    copied through the user space of the interpreter
+    :param pid: id of the process, which refills the pipe
+    :param fd: file descriptor of the pipe end in the process
+    :param fd_is_write_end: if False, then fd is a read end, so interpreter must
+           reopen it for writing (through /proc/self/fd) to splice the data
+    :type pipe_data: crdata.PipeData
+    :param pipe_data: location of the data in the image
+    """
+    return {
+        "#command": "SPLICE_PIPE_DATA",
+        "pid": pid,
+        "fd": fd,
+        "fd_is_write_end": fd_is_write_end,
+        "pipe_size": pipe_data.pipe_size,  # None if default pipe size must be kept
+        "path": pipe_data.image_path,
+        "offset": pipe_data.offset,
+        "length": pipe_data.length
+    }
@@ -0,0 +1,87 @@
+""" Intersection of page map entries with VMAs
+
+Lowering of page maps to memory filling commands needs to know, which pages
+of the entries fall into which VMA. Both VMAs and page map entries are sorted
+by address and do not overlap, so intersections are found with sorted searches
+over the columns (one per entry), without any loop over the pages or entries.
+"""
+
+from crloader import crconstants
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# columns of the runs array (see `intersect`)
+RUN_VMA = 0
+RUN_VMA_PGOFF = 1
+RUN_DUMP_PGOFF = 2
+RUN_COUNT = 3
+
+
+def _require_numpy():
+    if numpy is None:
+        raise RuntimeError("numpy package is required for page map intersection")
+
+
+def column(values):
+    """ Converts column (array.array, list or numpy array) to uint64 numpy
+    array; array.array is not iterated, its buffer is read directly; Columns
+    are unsigned, because addresses of kernel mappings (e.g. vsyscall) do not
+    fit into int64
+
+    :rtype: numpy.ndarray
+    """
+    _require_numpy()
+    if hasattr(values, "typecode"):
+        if not len(values):
+            return numpy.empty(0, dtype=numpy.uint64)
+        return numpy.frombuffer(values, dtype=numpy.dtype(values.typecode)).astype(numpy.uint64)
+    return numpy.asarray(values, dtype=numpy.uint64)
+
+
+def intersect(vma_starts, vma_ends, vaddrs, nr_pages, dump_pgoffs, flags=None, vma_skip_flags=None):
+    """ Finds intersections of page map entries with VMAs
+
+    :param vma_starts: start addresses of VMAs
+    :param vma_ends: end addresses (exclusive) of VMAs
+    :param vaddrs: start addresses of page map entries
+    :param nr_pages: numbers of pages of page map entries
+    :param dump_pgoffs: index of the first page of every entry in the pages image
+    :param flags: flags of page map entries (needed if vma_skip_flags are given)
+    :param vma_skip_flags: flags of page map entries, which pages are not needed
+           in the VMA, for every VMA
+    :return: runs as rows of (N, 4) int64 array (offsets are computed in uint64,
+             only the results are cast), sorted by address: VMA index,
+             offset (in pages) of the first page of the run from the VMA start,
+             offset (in pages) of the first page in the pages image and number
+             of pages (see RUN_* columns)
+    :rtype: numpy.ndarray
+    """
+    vma_starts, vma_ends = column(vma_starts), column(vma_ends)
+    entry_starts, dump_pgoffs = column(vaddrs), column(dump_pgoffs)
+    entry_ends = entry_starts + column(nr_pages) * crconstants.PAGE_SIZE
+
+    # VMAs lo, lo + 1, ... hi - 1 intersect the entry
+    lo = numpy.searchsorted(vma_ends, entry_starts, side="right")
+    hi = numpy.searchsorted(vma_starts, entry_ends, side="left")
+    counts = numpy.maximum(hi - lo, 0)
+
+    entry = numpy.repeat(numpy.arange(len(entry_starts)), counts)
+    first_run = numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    vma = numpy.repeat(lo, counts) + numpy.arange(len(entry)) - first_run
+
+    if vma_skip_flags is not None:
+        needed = (column(flags)[entry] & column(vma_skip_flags)[vma]) == 0
+        entry, vma = entry[needed], vma[needed]
+
+    run_starts = numpy.maximum(entry_starts[entry], vma_starts[vma])
+    run_ends = numpy.minimum(entry_ends[entry], vma_ends[vma])
+
+    runs = numpy.empty((len(entry), 4), dtype=numpy.int64)
+    runs[:, RUN_VMA] = vma
+    runs[:, RUN_VMA_PGOFF] = (run_starts - vma_starts[vma]) // crconstants.PAGE_SIZE
+    runs[:, RUN_DUMP_PGOFF] = dump_pgoffs[entry] + (run_starts - entry_starts[entry]) // crconstants.PAGE_SIZE
+    runs[:, RUN_COUNT] = (run_ends - run_starts) // crconstants.PAGE_SIZE
+    return runs
@@ -0,0 +1,71 @@
+""" Planning of process memory filling with dumped pages
+"""
+
+from crloader import crconstants
+from crloader import pagechain
+from crloader import vmtable
+
+import command
+import intersect
+
+_ANON_PRIVATE_MASK = vmtable.names_to_mask([crconstants.VMA_STATUS_ANON_PRIVATE], crconstants.VMA_STATUS_FLAGS)
+
+
+def plan_page_fills(pid, vmas, page_map):
+    """ Plans filling of process VMAs with dumped pages, one command per
+    contiguous segment of pages; Zero pages of anonymous private mappings
+    are not copied, because such mappings are zero filled already; Pages of
+    private file mappings, which are equal to the file contents, are not copied
+    too, mapping gives them. Page map must be annotated to find such pages (see
+    crloader.pages module). Pages, which are shared with the parent process
+    (PE_COW), are still copied: private VMAs are not inherited in the IR yet
+
+    :param pid: id of the process
+    :type vmas: vmtable.VmAreaTable
+    :type page_map: crdata.PageMap
+    :return: list of FILL_VMA_PAGES commands
+    """
+    if page_map is None:
+        return []
+    if intersect.numpy is not None and page_map.parent is None:
+        return _plan_page_fills_vectorized(pid, vmas, page_map)
+
+    commands = []
+    for idx in xrange(len(vmas)):
+        start = vmas.starts[idx]
+        for vaddr, nr_pages, generation, pages_id, page_idx in \
+                pagechain.iter_segments(page_map, start, vmas.ends[idx], _vma_skip_flags(vmas.statuses[idx])):
+            commands.append(command.fill_vma_pages(pid, vmas.resource_id(idx),
+                                                   (vaddr - start) // crconstants.PAGE_SIZE,
+                                                   nr_pages, generation, pages_id, page_idx))
+    return commands
+
+
+def _vma_skip_flags(status):
+    """
+    :param status: VMA status bit mask
+    :return: flags of page map entries, which pages are not copied into the VMA
+    """
+    skip_flags = crconstants.PE_FILE
+    if status & _ANON_PRIVATE_MASK:
+        skip_flags |= crconstants.PE_ZERO
+    return skip_flags
+
+
+def _plan_page_fills_vectorized(pid, vmas, page_map):
+    """ Same as `plan_page_fills` for page map of not incremental dump, but
+    pages of all VMAs are found at once (see intersect module)
+    """
+    entries = page_map.maps
+    flags = intersect.column(entries.flags)
+    present = (flags & crconstants.PE_PRESENT) != 0
+
+    runs = intersect.intersect(vmas.starts, vmas.ends,
+                               intersect.column(entries.vaddrs)[present],
+                               intersect.column(entries.nr_pages)[present],
+                               intersect.column(entries.page_offsets())[present],
+                               flags[present],
+                               [_vma_skip_flags(status) for status in vmas.statuses])
+
+    return [command.fill_vma_pages(pid, vmas.resource_id(vma), vma_pgoff, count, 0, page_map.pages_id, dump_pgoff)
+            for vma, vma_pgoff, dump_pgoff, count in runs.tolist()]
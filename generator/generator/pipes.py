@@ -0,0 +1,60 @@
+""" Planning of pipe buffers refill
+
+Data, which was buffered in pipes at dump time, is left in pipes-data image
+(see crdata.PipeData), so pipes are refilled by splicing the data straight
+from the image file, no matter how big buffers are.
+"""
+
+from crloader import crconstants
+from crloader import crdata
+
+import command
+
+
+def _find_pipe_holders(app):
+    """ Finds process file descriptors to refill pipes through; Write end
+    is preferred, but read end may be used too (if every writer is closed)
+
+    :type app: crdata.Application
+    :return: map from pipe id to (pid, fd, whether fd is a write end)
+    :rtype: dict[int, tuple]
+    """
+    pipe_ends = {pf.id: pf for pf in app.pipe_files}
+    holders = {}
+
+    for p in app.processes:
+        for fd, file_id in sorted(p.fdt.iteritems()):
+            if file_id not in pipe_ends:
+                continue
+
+            pf = pipe_ends[file_id]
+            is_write_end = (pf.flags & crconstants.FILE_ACCMODE_MASK) == crconstants.FILE_WRONLY_FLAG
+            holder = holders.get(pf.pipe_id)
+            if holder is None or (is_write_end and not holder[2]):
+                holders[pf.pipe_id] = (p.pid, fd, is_write_end)
+
+    return holders
+
+
+def plan_pipe_refills(app):
+    """ Plans refill of every pipe, which had buffered data at dump time;
+    Commands must be executed after pipes are created and before any
+    process reads from them
+
+    :type app: crdata.Application
+    :return: list of SPLICE_PIPE_DATA commands
+    """
+    holders = _find_pipe_holders(app)
+    commands = []
+
+    for data in app.pipe_data:
+        if not data.length or data.image_path is None:
+            # data without location is not refilled (loader warns about it)
+            continue
+        if data.pipe_id not in holders:
+            raise RuntimeError("Pipe {} has buffered data, but no process holds it".format(data.pipe_id))
+
+        pid, fd, is_write_end = holders[data.pipe_id]
+        commands.append(command.splice_pipe_data(pid, fd, is_write_end, data))
+
+    return commands
@@ -52,6 +52,43 @@ class DuplicateFieldInit(Exception):
         return "Can't change immutable field: {}".format(repr(self.field))
 
 
+# slot of data classes with value semantics, where hash is cached
+_HASH_SLOT = '_hash'
+
+
+def _freeze(value):
+    """ Converts mutable containers to immutable ones: lists to tuples and
+    sets to frozensets, recursively; Fields of data classes with value
+    semantics are frozen on assignment, so their hash never changes
+    """
+    if type(value) is list:
+        return tuple(_freeze(v) for v in value)
+    if type(value) is set:
+        return frozenset(_freeze(v) for v in value)
+    return value
+
+
+def _value_hash(self):
+    try:
+        return object.__getattribute__(self, _HASH_SLOT)
+    except AttributeError:
+        value_hash = hash((type(self).__name__,) + tuple(getattr(self, f) for f in self._fields))
+        object.__setattr__(self, _HASH_SLOT, value_hash)
+        return value_hash
+
+
+def _value_eq(self, other):
+    if self is other:
+        return True
+    if type(other) is not type(self) or hash(self) != hash(other):
+        return False
+    return all(getattr(self, f) == getattr(other, f) for f in self._fields)
+
+
+def _value_ne(self, other):
+    return not _value_eq(self, other)
+
+
 class DataClassMeta(type):
     @staticmethod
     def __pop_field_names(attrs):
@@ -69,8 +106,9 @@ class DataClassMeta(type):
         return filed_names
 
     @staticmethod
-    def __hooked_init(self, *args, **kwargs):
-        """Method, which is called during instance creation
+    def _hooked_init(self, *args, **kwargs):
+        """Generic constructor; Generated constructor (see `__make_init`) falls
+        back to it, if instance is created with positional arguments
 
         Ensures, that all fields are initialized
         
@@ -82,26 +120,67 @@ class DataClassMeta(type):
             if type(a) not in bases:
                 raise BadInitArgument()
             bases.remove(type(a))
-            for field in a.__slots__:
+            for field in a._fields:
                 setattr(self, field, getattr(a, field))
 
         for field in kwargs:
             if hasattr(self, field):
                 raise DuplicateFieldInit(field)
-            if field not in self.__slots__:
+            if field not in self._fields:
                 raise UnknownFieldSpecified(field)
 
             setattr(self, field, kwargs[field])
 
-        not_initialized_fields = [field for field in self.__slots__ if not hasattr(self, field)]
+        not_initialized_fields = [field for field in self._fields if not hasattr(self, field)]
         if not_initialized_fields:
             raise FieldsNotInitialized(not_initialized_fields)
 
+    @staticmethod
+    def __missing_fields(self, kwargs):
+        """ Raises an error for keyword arguments, which do not initialize
+        all the fields of the data class exactly
+        """
+        for field in kwargs:
+            if field not in self._fields:
+                raise UnknownFieldSpecified(field)
+        raise FieldsNotInitialized([field for field in self._fields if field not in kwargs])
+
+    @staticmethod
+    def __make_init(cls):
+        """ Generates constructor, specialized for the data class: fields are
+        set directly with slot descriptors, instead of going through the loop
+        over fields and `__setattr__` hook; Guarantees are the same as of
+        `_hooked_init`: all fields must be initialized and only them
+        """
+        field_names = cls._fields
+        namespace = {
+            "hooked_init": DataClassMeta._hooked_init,
+            "missing_fields": DataClassMeta.__missing_fields,
+            "freeze": _freeze,
+        }
+        value_fmt = "freeze(kwargs[{!r}])" if cls._value_semantics else "kwargs[{!r}]"
+        lines = ["def __init__(self, *args, **kwargs):",
+                 "    if args:",
+                 "        return hooked_init(self, *args, **kwargs)",
+                 "    if len(kwargs) != {}:".format(len(field_names)),
+                 "        missing_fields(self, kwargs)"]
+        if field_names:
+            # number of arguments is right, so missing field means unknown one is passed
+            lines.append("    try:")
+            for i, field in enumerate(field_names):
+                namespace["set_{}".format(i)] = getattr(cls, field).__set__
+                lines.append("        set_{}(self, {})".format(i, value_fmt.format(field)))
+            lines += ["    except KeyError:",
+                      "        missing_fields(self, kwargs)"]
+
+        exec("\n".join(lines), namespace)
+        return namespace["__init__"]
+
     @staticmethod
     def __hooked_repr(self):
         return "{}({})".format(
             type(self).__name__,
-            ", ".join(["{}={}".format(k, getattr(self, k)) for k in self.__slots__])
+            ", ".join(["{}={}".format(k, getattr(self, k)) for k in self._fields])
         )
 
     @staticmethod
@@ -115,6 +194,13 @@ class DataClassMeta(type):
         else:
             raise ImmutableFieldChange(field)
 
+    @staticmethod
+    def __hooked_value_setattr(self, field, value):
+        """
+        Same as `__hooked_setattr`, but value is frozen (see `_freeze`)
+        """
+        DataClassMeta.__hooked_setattr(self, field, _freeze(value))
+
     @classmethod
     def __prepare__(mcs, name, bases, **kwargs):
         # only python 3
@@ -123,16 +209,59 @@ class DataClassMeta(type):
     def __new__(mcs, name, bases, attrs, **kwargs):
         field_names = list(itertools.chain(
             DataClassMeta.__pop_field_names(attrs),
-            *[getattr(b, '__slots__') if hasattr(b, '__slots__') else [] for b in bases]
+            *[getattr(b, '_fields', []) for b in bases]
         ))
 
+        attrs['_fields'] = tuple(field_names)
         attrs['__slots__'] = field_names
-        attrs['__init__'] = DataClassMeta.__hooked_init
         attrs['__repr__'] = DataClassMeta.__hooked_repr
         attrs['__setattr__'] = DataClassMeta.__hooked_setattr
 
-        return super(DataClassMeta, mcs).__new__(mcs, name, bases, attrs)
+        value_semantics = attrs.get('_value_semantics', any(getattr(b, '_value_semantics', False) for b in bases))
+        attrs['_value_semantics'] = value_semantics
+        if value_semantics:
+            attrs['__slots__'] = field_names + [_HASH_SLOT]
+            attrs['__setattr__'] = DataClassMeta.__hooked_value_setattr
+            attrs['__eq__'] = _value_eq
+            attrs['__ne__'] = _value_ne
+            attrs['__hash__'] = _value_hash
+
+        cls = super(DataClassMeta, mcs).__new__(mcs, name, bases, attrs)
+        cls.__init__ = DataClassMeta.__make_init(cls)
+        return cls
+
+
+def _restore(cls, state):
+    """ Recreates data class instance from the state, see `DataClass.__reduce__`
+    """
+    obj = cls.__new__(cls)
+    obj.__setstate__(state)
+    return obj
 
 
 class DataClass(object):
     __metaclass__ = DataClassMeta
+
+    def __getstate__(self):
+        """
+        :return: values of the fields in the order of `_fields`; Field names
+                 are not stored, so state is compact; Cached hash is not a part
+                 of the state, hashes are not the same in different processes
+        :rtype: tuple
+        """
+        return tuple(getattr(self, field) for field in self._fields)
+
+    def __setstate__(self, state):
+        if len(state) != len(self._fields):
+            raise ValueError("{} has {} fields, but state has {} values".format(
+                type(self).__name__, len(self._fields), len(state)))
+        if self._value_semantics:
+            state = (_freeze(value) for value in state)
+        for field, value in itertools.izip(self._fields, state):
+            object.__setattr__(self, field, value)
+
+    def __reduce__(self):
+        """ Instance is pickled as the class and the tuple state, constructor
+        is not called on unpickling
+        """
+        return _restore, (type(self), self.__getstate__())
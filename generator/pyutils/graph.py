@@ -1,7 +1,12 @@
 from abc import ABCMeta, abstractmethod, abstractproperty
+import itertools
+from array import array
 
 import func
 
+# typecode of vertex indices in arrays of CsrGraph
+_INDEX_TYPECODE = 'i'
+
 
 class GraphInterface(object):
     __metaclass__ = ABCMeta
@@ -160,17 +165,176 @@ class DirectedGraph(GraphInterface):
                 continue
             self._dfs(v, pre_visit, post_visit, visited_map)
 
-    def _dfs(self, cur_v, pre_visit, post_visit, visited_map):
-        pre_visit(cur_v)
+    def _dfs(self, v_from, pre_visit, post_visit, visited_map):
+        """ Dfs with explicit stack of neighbour iterators, so depth of the
+        traversal is not limited by the recursion limit; Visitors are invoked
+        in the same order, as in recursive dfs
+        """
+        adjacency_list = self._adjacency_list
 
-        if visited_map[cur_v]:
+        pre_visit(v_from)
+        if visited_map[v_from]:
             return
-        visited_map[cur_v] = True
+        visited_map[v_from] = True
+
+        path = [v_from]
+        neighbours_stack = [iter(adjacency_list[v_from])]
+        while neighbours_stack:
+            for v in neighbours_stack[-1]:
+                pre_visit(v)
+                if not visited_map[v]:
+                    visited_map[v] = True
+                    path.append(v)
+                    neighbours_stack.append(iter(adjacency_list[v]))
+                    break
+            else:
+                neighbours_stack.pop()
+                post_visit(path.pop())
+
+
+class CsrGraph(GraphInterface):
+    """ Compact directed graph: vertices are interned to dense indices (in the
+    order they are added) and adjacency is stored in compressed sparse row
+    (CSR) arrays: neighbours of i-th vertex are targets[offsets[i]:offsets[i + 1]],
+    sorted by index
+
+    Graph is built with add_vertex/add_edge as DirectedGraph is, added edges
+    are kept in plain arrays; Graph is sealed by `seal` (or by the first query
+    of edges): CSR arrays are built once and vertices and edges can't be added
+    after that. Duplicate edges are merged, like in DirectedGraph
+    """
+    NoSuchVertex = DirectedGraph.NoSuchVertex
+    VertexAlreadyExists = DirectedGraph.VertexAlreadyExists
 
-        for v in self._adjacency_list[cur_v]:
-            self._dfs(v, pre_visit, post_visit, visited_map)
+    def __init__(self):
+        super(CsrGraph, self).__init__()
+        self._vertices = []  # index --> vertex
+        self._indices = {}  # vertex --> index
+        self._offsets = None  # CSR arrays are built, when graph is sealed
+        self._targets = None
+        # edges, added while graph is built
+        self._pending_sources = array(_INDEX_TYPECODE)
+        self._pending_targets = array(_INDEX_TYPECODE)
+
+    @classmethod
+    def from_graph(cls, graph):
+        """ Makes compact copy of the graph
+
+        :type graph: GraphInterface
+        :rtype: CsrGraph
+        """
+        compact = cls()
+        for v in graph.vertices_iter:
+            compact.add_vertex(v)
+        for v, u in graph.edges_iter:
+            compact.add_edge(v, u)
+        compact.seal()
+        return compact
+
+    @property
+    def sealed(self):
+        return self._offsets is not None
+
+    @property
+    def vertex_num(self):
+        return len(self._vertices)
+
+    @property
+    def edges_num(self):
+        self.seal()
+        return len(self._targets)
+
+    @property
+    def vertices_iter(self):
+        return iter(self._vertices)
+
+    @property
+    def edges_iter(self):
+        self.seal()
+        vertices, offsets, targets = self._vertices, self._offsets, self._targets
+        for i, v in enumerate(vertices):
+            for j in targets[offsets[i]:offsets[i + 1]]:
+                yield (v, vertices[j])
+
+    def add_vertex(self, vertex):
+        self._check_not_sealed()
+        if vertex in self._indices:
+            raise CsrGraph.VertexAlreadyExists(vertex)
+
+        self._indices[vertex] = len(self._vertices)
+        self._vertices.append(vertex)
+
+    def add_edge(self, v_from, v_to):
+        self._check_not_sealed()
+        self._pending_sources.append(self.vertex_index(v_from))
+        self._pending_targets.append(self.vertex_index(v_to))
+
+    def vertex_index(self, vertex):
+        """
+        :return: index of the vertex: number of vertices, added before it
+        :rtype: int
+        """
+        try:
+            return self._indices[vertex]
+        except KeyError:
+            raise CsrGraph.NoSuchVertex(vertex)
 
-        post_visit(cur_v)
+    def vertex_at(self, idx):
+        """
+        :return: vertex with given index
+        """
+        return self._vertices[idx]
+
+    def neighbour_indices(self, idx):
+        """
+        :param idx: index of the vertex
+        :return: sorted indices of the vertex neighbours
+        :rtype: array.array
+        """
+        self.seal()
+        return self._targets[self._offsets[idx]:self._offsets[idx + 1]]
+
+    def vertex_neighbours(self, vertex):
+        vertices = self._vertices
+        return [vertices[j] for j in self.neighbour_indices(self.vertex_index(vertex))]
+
+    def _check_not_sealed(self):
+        if self.sealed:
+            raise RuntimeError("Graph is sealed, it can't be changed")
+
+    def seal(self):
+        """ Builds CSR arrays, if they are not built yet: edges are grouped by
+        source with counting sort, then every row is sorted and duplicates
+        are dropped; Graph can't be changed after that
+        """
+        if self.sealed:
+            return
+
+        vertex_num = len(self._vertices)
+        pending_sources, pending_targets = self._pending_sources, self._pending_targets
+        row_offsets = array(_INDEX_TYPECODE, [0]) * (vertex_num + 1)
+        for s in pending_sources:
+            row_offsets[s + 1] += 1
+        for i in xrange(vertex_num):
+            row_offsets[i + 1] += row_offsets[i]
+
+        grouped = array(_INDEX_TYPECODE, [0]) * len(pending_targets)
+        fill = row_offsets[:-1]
+        for s, t in itertools.izip(pending_sources, pending_targets):
+            grouped[fill[s]] = t
+            fill[s] += 1
+
+        offsets = array(_INDEX_TYPECODE, [0])
+        targets = array(_INDEX_TYPECODE)
+        for i in xrange(vertex_num):
+            row = grouped[row_offsets[i]:row_offsets[i + 1]]
+            if len(row) > 1:
+                row = sorted(set(row))
+            targets.extend(row)
+            offsets.append(len(targets))
+
+        self._offsets, self._targets = offsets, targets
+        self._pending_sources = self._pending_targets = None
 
 
 class GraphIsNotAcyclic(Exception):
@@ -183,21 +347,11 @@ def topological_sort(graph):
     """ Sorts graph topologically
 
     :param graph: graph to sort
-    :type graph: DirectedGraph
+    :type graph: GraphInterface
     :return: list iterator of vertices sorted topologically or exception is
              raised in case graph is not acyclic
     """
-    sorted_actions = []
-
-    def post_visit(vertex):
-        sorted_actions.append(vertex)
-
-    top_sort_dfs = _dfs_stack(_cycle_search_dfs(),
-                              post_visit=post_visit)
-    # run dfs
-    top_sort_dfs(graph)
-
-    return reversed(sorted_actions)
+    return reversed(_cycle_search_dfs(graph))
 
 
 def bucket_top_sort(graph):
@@ -260,88 +414,44 @@ def make_chain_graph(nodes):
     return graph
 
 
-def _bucket_top_sort_dfs(v_from, graph, vertex_priority_map, visited, depth, buckets):
-    if v_from in visited:
-        return
-
-    visited.add(v_from)
-    neighbours = graph.vertex_neighbours(v_from)
-    sorted_neigh = sorted(neighbours, key=lambda x: vertex_priority_map[x])
-
-    for u in sorted_neigh:
-        _bucket_top_sort_dfs(u, graph, vertex_priority_map, visited, depth + 1, buckets)
-
-    buckets.setdefault(depth, []).append(v_from)
-
-
-def _cycle_search_dfs():
-    no_color = 0
-    entered_color = 1
-    exited_color = 2
-    vertex_color = {}
-    vertex_stack = []
-
-    def pre_visit(vertex):
-        cur_color = vertex_color.setdefault(vertex, no_color)
-
-        if cur_color == entered_color:
-            # already entered there!
-            idx = vertex_stack.index(vertex)
-            raise GraphIsNotAcyclic(vertex_stack[idx:])
-
-        if cur_color == exited_color:
-            # we are already traversed from this vertex, so we not entering it again
-            return
-
-        vertex_stack.append(vertex)
-
-        vertex_color[vertex] = entered_color
-
-    def post_visit(vertex):
-        vertex_stack.pop()
-        vertex_color[vertex] = exited_color
-
-    dfs = _dfs_init()
-    return _dfs_stack(dfs, pre_visit, post_visit)
-
-
-class _DfsStack(object):
-    def __init__(self):
-        self._post_visitors = []
-        self._pre_visitors = []
-
-    def add_visitors(self, pre_visit, post_visit):
-        self._pre_visitors.append(pre_visit)
-        self._post_visitors.append(post_visit)
-
-    def __call__(self, graph):
-        """
-        :type graph: DirectedGraph
-        """
-
-        def chained_pre_visit(cur_v):
-            for f in self._pre_visitors:
-                f(cur_v)
-
-        def chained_post_visit(cur_v):
-            for f in self._post_visitors:
-                f(cur_v)
-
-        graph.dfs(
-            pre_visit=chained_pre_visit,
-            post_visit=chained_post_visit
-        )
-
-
-def _dfs_stack(dfs, pre_visit=func.noop_fun, post_visit=func.noop_fun):
-    """ Add pre and post visit functions to dfs object
-    :type dfs: _DfsStack
-    """
-    dfs.add_visitors(pre_visit, post_visit)
-    return dfs
-
+def _cycle_search_dfs(graph):
+    """ Dfs of the whole graph, which checks that graph is acyclic; Dfs is
+    iterative: stack of neighbour iterators is kept along with the path
+    from the dfs root to the current vertex
 
-def _dfs_init():
-    """ No operation dfs traversal
+    :type graph: GraphInterface
+    :return: list of vertices in the order of exit from them (post order)
+    :raise GraphIsNotAcyclic: if vertex on the path is entered again; cycle
+           is the part of the path, which starts from that vertex
     """
-    return _DfsStack()
+    post_order = []
+    entered = set()  # vertices on the path
+    exited = set()
+
+    for root in graph.vertices_iter:
+        if root in exited:
+            continue
+
+        entered.add(root)
+        path = [root]
+        neighbours_stack = [iter(graph.vertex_neighbours(root))]
+        while neighbours_stack:
+            for v in neighbours_stack[-1]:
+                if v in exited:
+                    # we are already traversed from this vertex, so we not entering it again
+                    continue
+                if v in entered:
+                    raise GraphIsNotAcyclic(path[path.index(v):])
+
+                entered.add(v)
+                path.append(v)
+                neighbours_stack.append(iter(graph.vertex_neighbours(v)))
+                break
+            else:
+                neighbours_stack.pop()
+                v = path.pop()
+                entered.remove(v)
+                exited.add(v)
+                post_order.append(v)
+
+    return post_order
@@ -0,0 +1,44 @@
+""" Actions graph building testing
+"""
+
+import unittest
+
+from abstractir import actions_gen
+from abstractir.actgraph_build import build_actions_graph
+from abstractir.concept import build_concept_process_tree
+from crloader import loader
+from tests.crloader.loader_test import DUMP_DIR
+
+
+def _copy_action(action):
+    """
+    :return: action, which is equal to the given one, but is not the same object
+    """
+    return type(action)(**{field: getattr(action, field) for field in action._fields})
+
+
+class TestBuildActionsGraph(unittest.TestCase):
+    def test_duplicate_actions(self):
+        tree = build_concept_process_tree(loader.load_from_jsons(DUMP_DIR))
+        expected = build_actions_graph(tree)
+
+        gen_actions_vertices = actions_gen.gen_actions_vertices
+
+        def gen_with_duplicates(process_tree):
+            for action in gen_actions_vertices(process_tree):
+                yield action
+                yield _copy_action(action)
+
+        actions_gen.gen_actions_vertices = gen_with_duplicates
+        try:
+            for compact in (False, True):
+                graph = build_actions_graph(tree, compact=compact)
+                self.assertEqual(graph.vertex_num, expected.vertex_num)
+                self.assertEqual(set(graph.vertices_iter), set(expected.vertices_iter))
+                self.assertEqual(set(graph.edges_iter), set(expected.edges_iter))
+        finally:
+            actions_gen.gen_actions_vertices = gen_actions_vertices
+
+
+if __name__ == '__main__':
+    unittest.main()
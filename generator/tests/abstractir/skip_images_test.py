@@ -0,0 +1,87 @@
+""" Skipping of not rendered images testing
+"""
+
+import argparse
+import itertools
+import unittest
+
+import criugen
+from abstractir.actgraph_build import build_actions_graph
+from abstractir.concept import build_concept_process_tree
+from abstractir.pstree import process_tree_copy
+from crloader import loader
+from tests.crloader.loader_test import DUMP_DIR
+
+
+def _describe_handle(handle, is_tmp):
+    # handles of temporary resources are allocated automatically,
+    # so their values depend on the order of closure
+    return type(handle).__name__ if is_tmp else repr(handle)
+
+
+def _describe_pstree(tree):
+    return {p.pid: sorted((r.minimalistic_repr, _describe_handle(h, p.is_tmp_resource(r, h)), p.is_tmp_resource(r, h))
+                          for r, h in p.iter_all_resource_handle_pairs())
+            for p in tree.processes}
+
+
+def _describe_action(action):
+    fields = [type(action).__name__]
+    for field in action._fields:
+        value = getattr(action, field)
+        if hasattr(value, "pid"):
+            value = value.pid
+        elif hasattr(value, "minimalistic_repr"):
+            value = value.minimalistic_repr
+        else:
+            # handles of actions may be temporary ones
+            value = _describe_handle(value, True)
+        fields.append(value)
+    return tuple(fields)
+
+
+def _describe_actions_graph(graph):
+    return (sorted(_describe_action(a) for a in graph.vertices_iter),
+            sorted((_describe_action(a), _describe_action(b)) for a, b in graph.edges_iter))
+
+
+def _render(application, resource_types_to_skip):
+    """
+    :return: description of what pstree and actions-graph commands render
+    """
+    pstree = process_tree_copy(build_concept_process_tree(application), resource_types_to_skip)
+    graph = build_actions_graph(build_concept_process_tree(application), resource_types_to_skip)
+    return _describe_pstree(pstree), _describe_actions_graph(graph)
+
+
+class TestSkipNotRenderedImages(unittest.TestCase):
+    def test_images_to_skip(self):
+        def images_to_skip(skip):
+            args = argparse.Namespace(skip=skip, keep=criugen.get_all_resources_type_names())
+            return criugen.skip_not_rendered_images(args)
+
+        self.assertEqual(images_to_skip([]), ())
+        self.assertEqual(images_to_skip(["vmas"]), ())
+        self.assertEqual(images_to_skip(["private"]), (loader.IMAGES_PRIVATE,))
+        self.assertEqual(images_to_skip(["vmas", "regfiles", "shmem", "private"]),
+                         (loader.IMAGES_PRIVATE, loader.IMAGES_VMAS))
+
+    def test_rendering_parity(self):
+        # skipped images never change what is rendered
+        full_app = loader.load_from_jsons(DUMP_DIR)
+        apps = {(): full_app}
+        names = criugen.get_all_resources_type_names()
+
+        for skip in itertools.chain.from_iterable(itertools.combinations(names, n) for n in xrange(len(names) + 1)):
+            args = argparse.Namespace(skip=skip, keep=names)
+            images = criugen.skip_not_rendered_images(args)
+            if images not in apps:
+                apps[images] = loader.load_from_jsons(DUMP_DIR, skip=images)
+
+            resource_types_to_skip = criugen.get_resources_types_to_skip(skip, names)
+            self.assertEqual(_render(apps[images], resource_types_to_skip),
+                             _render(full_app, resource_types_to_skip), (skip, images))
+
+
+if __name__ == '__main__':
+    unittest.main()
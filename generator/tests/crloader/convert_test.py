@@ -0,0 +1,60 @@
+""" Images conversion testing
+"""
+
+import json
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from StringIO import StringIO
+
+try:
+    from pycriu import images
+    from crloader import convert
+    from tests.crloader.pbdecode_test import _make_image, _make_mm_image
+except ImportError:
+    images = None
+
+
+@unittest.skipIf(images is None, "pycriu is not installed")
+class TestConvert(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.dump_dir = os.path.join(self.tmp_dir, "dump")
+        self.output_dir = os.path.join(self.tmp_dir, "json")
+        os.mkdir(self.dump_dir)
+
+        self.inventory = _make_image('INVENTORY', [images.pb.inventory_entry(img_version=2)])
+        for name, data in (("inventory.img", self.inventory),
+                           ("mm-1.img", _make_mm_image()[:-1]),
+                           ("core-1.img", struct.pack('ii', 0, 0)),
+                           ("pages-1.img", "\0" * 4096)):
+            with open(os.path.join(self.dump_dir, name), "wb") as f:
+                f.write(data)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_broken_images(self):
+        for workers in (1, 2):
+            reported = []
+            stats = convert.convert_dump(self.dump_dir, self.output_dir, workers=workers,
+                                         on_image=lambda name, *args: reported.append(name))
+
+            # broken images are reported, but they do not stop the conversion
+            self.assertEqual(stats.images, 3)
+            self.assertEqual(sorted(reported), ["core-1", "inventory", "mm-1"])
+            self.assertEqual(sorted(name for name, _ in stats.errors), ["core-1", "mm-1"])
+            self.assertEqual(sorted(os.listdir(self.output_dir)), ["inventory.json"])
+
+            with open(os.path.join(self.output_dir, "inventory.json")) as f:
+                self.assertEqual(json.load(f), images.load(StringIO(self.inventory), True))
+            shutil.rmtree(self.output_dir)
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, convert.convert_dump, self.dump_dir, self.output_dir, output_format="xml")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+""" Dump sources testing
+"""
+
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from crloader import dumpsource
+from crloader.dumpsource import DumpArchive, DumpDirectory, open_dump
+from crloader.pagechain import map_pages_image
+
+IMAGES = {
+    "pstree.img": "pstree",
+    "core-1.img": "core",
+    "pages-1.img": "pages",
+    "pstree.json": "{}",
+}
+
+
+class TestDumpSources(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.dump_dir = os.path.join(self.tmp_dir, "dump")
+        os.mkdir(self.dump_dir)
+        for name, contents in IMAGES.items():
+            with open(os.path.join(self.dump_dir, name), "wb") as f:
+                f.write(contents)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _make_archive(self, name, mode):
+        path = os.path.join(self.tmp_dir, name)
+        with tarfile.open(path, mode) as tar:
+            tar.add(self.dump_dir, arcname="dump")
+        return path
+
+    def test_directory(self):
+        source = open_dump(self.dump_dir)
+        self.assertIsInstance(source, DumpDirectory)
+        self.assertEqual(source.image_names("img"), ["core-1", "pages-1", "pstree"])
+        self.assertEqual(source.open_image("core-1", "img").read(), "core")
+        self.assertIsNone(source.open_image("core-2", "img"))
+        self.assertEqual(source.image_size("pstree", "img"), 6)
+        self.assertIsNone(source.image_size("dump", "img"))
+        self.assertIsNone(source.parent())
+        self.assertEqual([s[0] for s in source.stat_images("json")], ["pstree.json"])
+        with map_pages_image(source, 1) as image:
+            self.assertEqual(image.data[:], "pages")
+        self.assertIsNone(image.data)
+
+    def test_directory_listdir(self):
+        os.mkdir(os.path.join(self.dump_dir, "dir.img"))
+        scandir, stat = dumpsource.scandir, os.stat
+        stated = []
+
+        def counting_stat(path):
+            stated.append(os.path.basename(path))
+            return stat(path)
+
+        dumpsource.scandir = None
+        os.stat = counting_stat
+        try:
+            source = DumpDirectory(self.dump_dir)
+            self.assertEqual(source.image_names("img"), ["core-1", "dir", "pages-1", "pstree"])
+            self.assertEqual(stated, [])
+
+            # only opened images are stat'ed
+            self.assertEqual(source.open_image("core-1", "img").read(), "core")
+            self.assertIsNone(source.open_image("dir", "img"))
+            self.assertEqual(sorted(stated), ["core-1.img", "dir.img"])
+
+            # pages are not fingerprinted
+            self.assertEqual([s[0] for s in source.stat_images("img")], ["core-1.img", "pstree.img"])
+            self.assertNotIn("pages-1.img", stated)
+        finally:
+            dumpsource.scandir = scandir
+            os.stat = stat
+
+    def test_archive(self):
+        for name, mode in (("dump.tar", "w"), ("dump.tar.gz", "w:gz"), ("dump.tar.bz2", "w:bz2")):
+            source = open_dump(self._make_archive(name, mode))
+            self.assertIsInstance(source, DumpArchive)
+            self.assertEqual(source.image_names("img"), ["core-1", "pages-1", "pstree"])
+            self.assertEqual(source.open_image("pstree", "json").read(), "{}")
+            self.assertIsNone(source.open_image("core-2", "img"))
+            self.assertEqual(source.image_size("core-1", "img"), 4)
+            self.assertEqual([s[0] for s in source.stat_images("img")], [name])
+            with map_pages_image(source, 1) as image:
+                self.assertEqual(str(image.data), "pages")
+            self.assertRaises(RuntimeError, map_pages_image, source, 2)
+
+    def test_compressed_archive(self):
+        source = open_dump(self._make_archive("dump.tar.gz", "w:gz"))
+        self.assertEqual(source.open_image("core-1", "img").read(), "core")
+
+        # archive is read in one pass, pages are read only when they are mapped
+        self.assertIsNone(source._data)
+        self.assertEqual(source._members["core-1.img"][2], "core")
+        self.assertIsNone(source._members["pages-1.img"][2])
+        self.assertEqual(source.open_image("pages-1", "img").read(), "pages")
+        with map_pages_image(source, 1) as image:
+            self.assertEqual(str(image.data), "pages")
+
+    def test_archive_member_file(self):
+        source = open_dump(self._make_archive("dump.tar", "w"))
+        with source.open_image("pstree", "img") as f:
+            self.assertEqual(f.read(2), "ps")
+            self.assertEqual(f.tell(), 2)
+            self.assertEqual(f.read(), "tree")
+            self.assertEqual(f.read(), "")
+            f.seek(0)
+            self.assertEqual(f.read(100), "pstree")
+            f.seek(-2, 2)
+            self.assertEqual(f.read(), "ee")
+
+    def test_archive_duplicate_names(self):
+        other_dir = os.path.join(self.tmp_dir, "other")
+        os.mkdir(other_dir)
+        with open(os.path.join(other_dir, "core-1.img"), "wb") as f:
+            f.write("other")
+        path = self._make_archive("dump.tar", "w")
+        with tarfile.open(path, "a") as tar:
+            tar.add(other_dir, arcname="other")
+        self.assertRaises(RuntimeError, open_dump(path).image_names, "img")
+
+    def test_missing(self):
+        self.assertRaises(RuntimeError, open_dump, os.path.join(self.tmp_dir, "nothing"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+""" Image reader testing
+"""
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from StringIO import StringIO
+
+try:
+    from pycriu import images
+    from crloader.imgreader import ImageReader
+except ImportError:
+    images = None
+
+
+class _RawMessage(object):
+    """ Message, which keeps its serialized payload as is
+    """
+
+    def ParseFromString(self, data):
+        self.data = data
+
+
+def _make_image(magic_name, payloads, common=True):
+    magic = struct.pack('i', images.magic.by_name[magic_name])
+    if common:
+        magic = struct.pack('i', images.magic.by_name['IMG_COMMON']) + magic
+    return magic + "".join(struct.pack('i', len(p)) + p for p in payloads)
+
+
+@unittest.skipIf(images is None, "pycriu is not installed")
+class TestImageReader(unittest.TestCase):
+    def test_magic(self):
+        self.assertEqual(ImageReader(_make_image('MM', [])).magic, 'MM')
+        self.assertEqual(ImageReader(_make_image('PAGEMAP', [], common=False)).magic, 'PAGEMAP')
+
+        # image is shorter than its magic
+        for buf in ("", "\x19", _make_image('MM', [])[:6]):
+            self.assertRaises(images.MagicException, ImageReader, buf)
+        self.assertRaises(images.MagicException, ImageReader, struct.pack('ii', 0, 0))
+
+    def test_entries(self):
+        payloads = ["first", "", "third entry"]
+        reader = ImageReader(_make_image('MM', payloads))
+
+        # entries are found lazily
+        self.assertEqual(reader.raw_entry(1), "")
+        self.assertEqual(reader.entry(2, _RawMessage).data, "third entry")
+        self.assertRaises(IndexError, reader.raw_entry, 3)
+        self.assertEqual([m.data for m in reader.iter_entries(_RawMessage)], payloads)
+        self.assertEqual([m.data for m in reader.iter_entries(_RawMessage, start=2)], payloads[2:])
+        self.assertEqual(len(reader), 3)
+        self.assertEqual(len(ImageReader(_make_image('MM', []))), 0)
+
+    def test_truncated(self):
+        image = _make_image('MM', ["first", "second"])
+
+        # size of the entry is cut
+        reader = ImageReader(image[:-len("second") - 2])
+        self.assertEqual(reader.raw_entry(0), "first")
+        self.assertRaises(ValueError, reader.raw_entry, 1)
+
+        # payload of the entry is cut
+        reader = ImageReader(image[:-1])
+        self.assertEqual(reader.raw_entry(0), "first")
+        self.assertRaises(ValueError, len, reader)
+        self.assertRaises(ValueError, list, reader.iter_entries(_RawMessage))
+
+    def test_entries_with_payload(self):
+        # entry is the size of the payload, which follows it
+        payloads = ["abc", "", "defgh"]
+        entries = [(str(len(p)), p) for p in payloads]
+        image = _make_image('PIPES_DATA', []) + "".join(struct.pack('i', len(e)) + e + p for e, p in entries)
+
+        reader = ImageReader(image)
+        result = [(m.data, image[offset:offset + size])
+                  for m, offset, size in reader.iter_entries_with_payload(_RawMessage, lambda m: int(m.data))]
+        self.assertEqual(result, entries)
+
+        # payload or entry is cut
+        for end in (-1, -len("defgh") - 1):
+            with self.assertRaises(ValueError):
+                list(ImageReader(image[:end]).iter_entries_with_payload(_RawMessage, lambda m: int(m.data)))
+
+    def test_from_file(self):
+        image = _make_image('MM', ["first"])
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "mm-1.img")
+            with open(path, "wb") as f:
+                f.write(image)
+            with ImageReader.open(path) as reader:
+                self.assertEqual(reader.raw_entry(0), "first")
+
+            # file objects without fileno are read into memory
+            self.assertEqual(ImageReader.from_file(StringIO(image)).raw_entry(0), "first")
+
+            open(path, "wb").close()
+            self.assertRaises(images.MagicException, ImageReader.open, path)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+""" Loaded values interning testing
+"""
+
+import unittest
+
+from crloader.interning import Interner
+
+
+class TestInterner(unittest.TestCase):
+    def test_equal_values(self):
+        interner = Interner()
+        a = interner.intern({"creds": {"uid": 0, "caps": [1, 2]}, "flags": 1})
+        b = interner.intern({"flags": 1, "creds": {"caps": [1, 2], "uid": 0}})
+        self.assertIs(a, b)
+        self.assertEqual(a, {"creds": {"uid": 0, "caps": [1, 2]}, "flags": 1})
+
+    def test_nested_sharing(self):
+        interner = Interner()
+        a = interner.intern({"creds": {"uid": 0}, "flags": 1})
+        b = interner.intern({"creds": {"uid": 0}, "flags": 2})
+        self.assertIsNot(a, b)
+        self.assertIs(a["creds"], b["creds"])
+
+    def test_types(self):
+        interner = Interner()
+        self.assertIsNot(interner.intern([1]), interner.intern([1.0]))
+        self.assertIsNot(interner.intern([1]), interner.intern([True]))
+        self.assertIsNot(interner.intern([]), interner.intern({}))
+        self.assertIs(interner.intern([[]]), interner.intern([[]]))
+
+
+if __name__ == '__main__':
+    unittest.main()
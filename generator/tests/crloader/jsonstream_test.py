@@ -0,0 +1,52 @@
+""" Incremental json images parsing testing
+"""
+
+import io
+import json
+import unittest
+
+from crloader import jsonstream
+
+MM_IMAGE = {
+    "magic": "MM",
+    "entries": [
+        {
+            "mm_start_code": "0x400000",
+            "vmas": [{"start": "0x400000", "end": "0x401000"}, {"start": "0x500000", "end": "0x501000"}],
+            "dumpable": 1,
+            "mm_saved_auxv": [-1.5, 12345678901234]
+        }
+    ]
+}
+
+
+def _load(doc, nested=(), chunk_size=3):
+    return jsonstream.load(io.BytesIO(json.dumps(doc, indent=4)), nested, chunk_size=chunk_size)
+
+
+class TestJsonStream(unittest.TestCase):
+    def test_entries(self):
+        doc = {"magic": "PAGEMAP", "entries": [{"pages_id": 1}, {"vaddr": "0x1000", "nr_pages": 12}]}
+        item = _load(doc)
+        self.assertEqual(item["magic"], "PAGEMAP")
+        self.assertIsInstance(item["entries"], jsonstream.ArrayStream)
+        self.assertEqual(list(item["entries"]), doc["entries"])
+        self.assertRaises(RuntimeError, list, item["entries"])
+        self.assertEqual(list(_load({"magic": "PAGEMAP", "entries": []})["entries"]), [])
+
+    def test_nested(self):
+        entry = next(iter(_load(MM_IMAGE, nested=("vmas",))["entries"]))
+        self.assertNotIn("dumpable", entry)
+        self.assertEqual(list(entry["vmas"]), MM_IMAGE["entries"][0]["vmas"])
+        # members after streamed array are parsed after it
+        self.assertEqual(entry["dumpable"], 1)
+        self.assertEqual(entry["mm_saved_auxv"], [-1.5, 12345678901234])
+
+    def test_materialize(self):
+        item = _load(MM_IMAGE, nested=("vmas",))
+        item["entries"] = list(item["entries"])
+        self.assertEqual(item, MM_IMAGE)
+
+
+if __name__ == '__main__':
+    unittest.main()
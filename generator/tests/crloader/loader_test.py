@@ -0,0 +1,111 @@
+""" Images parsing testing
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from crloader import crconstants, interning, loader, pagemap, snapshot, vmtable
+from pyutils.dataclass import DataClass
+
+# small json dump: process 1 (with thread 3) and its children 2 and 4, process 5 is
+# a zombie child of 2; pipe 55 is shared by 1 and 2, /lib/x.so is only mapped
+DUMP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "data", "dump")
+
+
+def _describe(value):
+    """ Converts loaded application to plain values, so applications can be
+    compared (process class and internal representations are not compared)
+    """
+    if isinstance(value, DataClass):
+        return {field: _describe(getattr(value, field)) for field in value._fields}
+    if isinstance(value, (vmtable.VmAreaTable, pagemap.PageMapEntries, list, tuple)):
+        return [_describe(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _describe(v) for k, v in value.iteritems()}
+    return value
+
+
+def _make_core_item(nr_sigactions=3):
+    sigactions = [dict(sigaction=idx, flags=0, restorer=0, mask=0, compat_sigaction=False)
+                  for idx in xrange(nr_sigactions)]
+    tc = dict(task_state=1, exit_code=0, personality=0, flags=0, blk_sigset=0, comm="worker", timers=None,
+              rlimits={"rlimits": [{"cur": 1024, "max": 4096}]}, cg_set=1, signals_s=None, loginuid=1000,
+              oom_score_adj=0, sigactions=sigactions)
+    return {"magic": "CORE", "entries": [{"tc": tc}]}
+
+
+class TestTaskCoreParsing(unittest.TestCase):
+    def test_sigactions_per_process(self):
+        interner = interning.Interner()
+        cores = [loader._parse_task_core(_make_core_item(), pid, interner) for pid in (1, 2)]
+
+        # payloads are shared, but signal actions are resources of the process
+        self.assertIs(cores[0].rlimits, cores[1].rlimits)
+        for pid, core in zip((1, 2), cores):
+            self.assertEqual([a.resource_id for a in core.sigactions],
+                             [loader.make_resource_id(loader.RID_SIGACTION, pid, idx) for idx in xrange(3)])
+        self.assertIsNot(cores[0].sigactions[0], cores[1].sigactions[0])
+
+        # identical signal actions share one payload
+        for first, second in zip(cores[0].sigactions, cores[1].sigactions):
+            self.assertIs(first.action, second.action)
+        self.assertEqual(cores[0].sigactions[2].action,
+                         dict(sigaction=2, flags=0, restorer=0, mask=0, compat_sigaction=False))
+        other = loader._parse_task_core(_make_core_item(nr_sigactions=1), 3, interner)
+        self.assertIs(other.sigactions[0].action, cores[0].sigactions[0].action)
+
+
+class TestLoad(unittest.TestCase):
+    def test_serial(self):
+        app = loader.load_from_jsons(DUMP_DIR)
+        self.assertEqual([(p.pid, p.ppid) for p in app.processes], [(1, 0), (2, 1), (4, 1), (5, 2)])
+
+        server = app.processes[0]
+        self.assertEqual(server.fdt, {0: 11, 3: 20, 4: 21})
+        self.assertEqual([t.thread_id for t in server.thread_cores], [1, 3])
+        self.assertEqual(len(server.core.sigactions), 3)
+        self.assertEqual([(v.start, v.shmid) for v in server.vmas],
+                         [(0x400000, 5), (0x7f0000000000, 13), (0x7f0000010000, 0), (0x7f0000020000, 40)])
+        self.assertEqual(list(server.page_map.maps), [(0x401000, 1, crconstants.PE_PRESENT),
+                                                      (0x7f0000010000, 2, crconstants.PE_PRESENT),
+                                                      (0x7f0000012000, 2, crconstants.PE_PRESENT | crconstants.PE_LAZY)])
+        self.assertEqual(server.vm_info.exe_file_id, 5)
+        self.assertEqual(server.fs.cwd_id, 6)
+
+        # zombie has nothing, but the core
+        zombie = app.processes[3]
+        self.assertEqual((zombie.fdt, len(zombie.vmas), zombie.page_map), ({}, 0, None))
+
+        self.assertEqual([f.path for f in app.regular_files], ["/bin/app", "/", "/tmp/log", "/lib/x.so"])
+        self.assertEqual([(f.id, f.pipe_id) for f in app.pipe_files], [(20, 55), (21, 55)])
+        self.assertEqual([(m.id, m.pagemap.maps.total_pages()) for m in app.shared_anon_mem], [(40, 1)])
+        # data of json images can't be spliced
+        self.assertEqual([(d.pipe_id, d.length, d.image_path) for d in app.pipe_data], [(55, 3, None)])
+
+    def test_workers(self):
+        # the result does not depend on the number of workers
+        self.assertEqual(_describe(loader.load_from_jsons(DUMP_DIR, workers=2)),
+                         _describe(loader.load_from_jsons(DUMP_DIR)))
+
+    def test_snapshot(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            cache = snapshot.SnapshotCache(cache_dir)
+            app = loader.load_from_jsons(DUMP_DIR, cache=cache)
+            cached = cache.get(loader.dumpsource.open_dump(DUMP_DIR), "json")
+            self.assertIsNotNone(cached)
+            self.assertEqual(_describe(cached), _describe(app))
+            self.assertEqual(_describe(loader.load_from_jsons(DUMP_DIR, cache=cache)), _describe(app))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_img_without_pycriu(self):
+        if loader.pycriu is not None:
+            self.skipTest("pycriu is installed")
+        self.assertRaises(RuntimeError, loader.load_from_imgs, DUMP_DIR)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+""" Incremental dump pages resolution testing
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from crloader.crconstants import PAGE_SIZE, PE_LAZY, PE_PARENT, PE_PRESENT
+from crloader.crdata import PageMap
+from crloader.dumpsource import DumpDirectory
+from crloader.pagechain import MergedPages, iter_segments, locate_page, pages_by_generation
+from crloader.pagemap import PageMapEntries
+
+
+def _make_page_map(pages_id, entries, parent=None):
+    maps = PageMapEntries()
+    for vaddr_page, nr_pages, flags in entries:
+        maps.append(vaddr_page * PAGE_SIZE, nr_pages, flags)
+    return PageMap(resource_id=pages_id, pages_id=pages_id, maps=maps, parent=parent)
+
+
+def _make_chain():
+    """ pages 0..9 are dumped at first, pages 2, 3 and 8 are changed after that,
+    and page 3 is changed once again (page 9 became lazy)
+    """
+    gen2 = _make_page_map(1, [(0, 10, PE_PRESENT)])
+    gen1 = _make_page_map(2, [(0, 2, PE_PARENT), (2, 2, PE_PRESENT), (4, 4, PE_PARENT),
+                              (8, 1, PE_PRESENT), (9, 1, PE_PARENT)], gen2)
+    return _make_page_map(3, [(0, 3, PE_PARENT), (3, 1, PE_PRESENT), (4, 5, PE_PARENT),
+                              (9, 1, PE_LAZY)], gen1)
+
+
+class TestPageChain(unittest.TestCase):
+    def test_segments(self):
+        segments = [(vaddr // PAGE_SIZE, n, g, p, i) for vaddr, n, g, p, i in iter_segments(_make_chain())]
+        self.assertEqual(segments, [(0, 2, 2, 1, 0),
+                                    (2, 1, 1, 2, 0),
+                                    (3, 1, 0, 3, 0),
+                                    (4, 4, 2, 1, 4),
+                                    (8, 1, 1, 2, 2)])
+        self.assertEqual(pages_by_generation(_make_chain()), [1, 2, 6])
+
+    def test_segments_range(self):
+        segments = [(vaddr // PAGE_SIZE, n, g) for vaddr, n, g, _, _ in
+                    iter_segments(_make_chain(), 1 * PAGE_SIZE, 5 * PAGE_SIZE)]
+        self.assertEqual(segments, [(1, 1, 2), (2, 1, 1), (3, 1, 0), (4, 1, 2)])
+
+    def test_locate(self):
+        page_map = _make_chain()
+        self.assertEqual(locate_page(page_map, 3 * PAGE_SIZE + 10), (0, 3, 0))
+        self.assertEqual(locate_page(page_map, 8 * PAGE_SIZE), (1, 2, 2))
+        self.assertEqual(locate_page(page_map, 6 * PAGE_SIZE), (2, 1, 6))
+        self.assertIsNone(locate_page(page_map, 9 * PAGE_SIZE))
+        self.assertIsNone(locate_page(page_map, 20 * PAGE_SIZE))
+
+    def test_pages_data(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            # pages image contents: page of i-th generation dump has value i * 10 + page_idx
+            for gen, pages_id, nr_pages in ((2, 1, 10), (1, 2, 3), (0, 3, 1)):
+                dump_dir = os.path.join(tmp_dir, str(gen))
+                os.mkdir(dump_dir)
+                with open(os.path.join(dump_dir, "pages-{}.img".format(pages_id)), "wb") as f:
+                    f.write("".join(chr(gen * 10 + i) * PAGE_SIZE for i in range(nr_pages)))
+                if gen < 2:
+                    os.symlink(os.path.join("..", str(gen + 1)), os.path.join(dump_dir, "parent"))
+
+            source = DumpDirectory(os.path.join(tmp_dir, "0"))
+            with MergedPages(source, _make_chain()) as pages:
+                self.assertEqual(str(pages.page(3 * PAGE_SIZE)), chr(0) * PAGE_SIZE)
+                self.assertEqual(str(pages.page(8 * PAGE_SIZE)), chr(12) * PAGE_SIZE)
+                self.assertEqual(str(pages.page(5 * PAGE_SIZE)), chr(25) * PAGE_SIZE)
+                self.assertIsNone(pages.page(9 * PAGE_SIZE))
+                data = [(vaddr // PAGE_SIZE, str(d)[::PAGE_SIZE]) for vaddr, _, d in pages.segments()]
+                self.assertEqual(data, [(0, "\x14\x15"), (2, "\x0a"), (3, "\x00"),
+                                        (4, "\x18\x19\x1a\x1b"), (8, "\x0c")])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
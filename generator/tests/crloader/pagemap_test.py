@@ -0,0 +1,70 @@
+""" Compact pagemap representation testing
+"""
+
+import unittest
+
+from crloader import pagemap
+from crloader.crconstants import PAGE_SIZE, PE_PARENT, PE_PRESENT
+from crloader.pagemap import PageMapEntries
+
+
+def _make_entries():
+    entries = PageMapEntries()
+    entries.append(0x1000, 2, PE_PRESENT)
+    entries.append(0x8000, 1, PE_PARENT)
+    entries.append(0x10000, 4, PE_PRESENT)
+    return entries
+
+
+class TestPageMapEntries(unittest.TestCase):
+    def test_iteration(self):
+        entries = _make_entries()
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(list(entries), [(0x1000, 2, PE_PRESENT),
+                                         (0x8000, 1, PE_PARENT),
+                                         (0x10000, 4, PE_PRESENT)])
+        self.assertEqual(entries[1], (0x8000, 1, PE_PARENT))
+
+    def _check_sums(self):
+        entries = _make_entries()
+        self.assertEqual(entries.total_pages(), 7)
+        self.assertEqual(entries.total_pages(PE_PRESENT), 6)
+        self.assertEqual(entries.total_pages(PE_PARENT), 1)
+        self.assertEqual(PageMapEntries().total_pages(), 0)
+        self.assertEqual(PageMapEntries().total_pages(PE_PRESENT), 0)
+
+        self.assertEqual(list(entries.page_offsets()), [0, 2, 2])
+        self.assertEqual(entries.page_offsets().typecode, pagemap.U64_TYPECODE)
+        self.assertEqual(list(PageMapEntries().page_offsets()), [])
+
+    def test_sums(self):
+        self._check_sums()
+
+        numpy = pagemap.numpy
+        pagemap.numpy = None
+        try:
+            self._check_sums()
+        finally:
+            pagemap.numpy = numpy
+
+    def test_find(self):
+        entries = _make_entries()
+        self.assertEqual(entries.find(0x1000), 0)
+        self.assertEqual(entries.find(0x1000 + 2 * PAGE_SIZE - 1), 0)
+        self.assertIsNone(entries.find(0x1000 + 2 * PAGE_SIZE))
+        self.assertIsNone(entries.find(0))
+        self.assertEqual(entries.find(0x10000 + 3 * PAGE_SIZE), 2)
+        self.assertIsNone(entries.find(0x10000 + 4 * PAGE_SIZE))
+
+    def test_range_indices(self):
+        entries = _make_entries()
+        self.assertEqual(entries.range_indices(0, 0x1000), (0, 0))
+        self.assertEqual(entries.range_indices(0, 0x1001), (0, 1))
+        self.assertEqual(entries.range_indices(0x2000, 0x9000), (0, 2))
+        self.assertEqual(entries.range_indices(0x3000, 0x8000), (1, 1))
+        self.assertEqual(entries.range_indices(0x9000, 0x100000), (2, 3))
+        self.assertEqual(entries.range_indices(0x100000, 0x200000), (3, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+""" Pages data analysis testing
+"""
+
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from crloader import pages, vmtable
+from crloader.crconstants import PAGE_SIZE, PE_COW, PE_FILE, PE_LAZY, PE_PRESENT, PE_ZERO, VMA_MAP_FLAGS
+from crloader.crdata import PageMap, Process, RegFile
+from crloader.dumpsource import DumpDirectory, open_dump
+from crloader.pagemap import PageMapEntries
+
+# pages of the pages image: 0 is a zero page
+PAGES = [0, 1, 0, 0, 2, 0, 3]
+
+
+def _make_page_map():
+    maps = PageMapEntries()
+    maps.append(0, 4, PE_PRESENT)
+    maps.append(10 * PAGE_SIZE, 2, PE_LAZY)
+    maps.append(20 * PAGE_SIZE, 3, PE_PRESENT)
+    return PageMap(resource_id=1, pages_id=1, maps=maps, parent=None)
+
+
+class TestZeroPages(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.tmp_dir, "pages-1.img"), "wb") as f:
+            f.write("".join(chr(p) * PAGE_SIZE for p in PAGES))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _annotate(self):
+        page_map = pages.annotate_zero_pages(DumpDirectory(self.tmp_dir), _make_page_map())
+        return [(vaddr // PAGE_SIZE, n, f) for vaddr, n, f in page_map.maps]
+
+    def test_annotate(self):
+        expected = [(0, 1, PE_PRESENT | PE_ZERO), (1, 1, PE_PRESENT), (2, 2, PE_PRESENT | PE_ZERO),
+                    (10, 2, PE_LAZY),
+                    (20, 1, PE_PRESENT), (21, 1, PE_PRESENT | PE_ZERO), (22, 1, PE_PRESENT)]
+        self.assertEqual(self._annotate(), expected)
+
+        numpy = pages.numpy
+        pages.numpy = None
+        try:
+            self.assertEqual(self._annotate(), expected)
+        finally:
+            pages.numpy = numpy
+
+    def test_archive(self):
+        # pages of archives are annotated the same way
+        expected = self._annotate()
+        for name, mode in (("dump.tar", "w"), ("dump.tar.gz", "w:gz")):
+            path = os.path.join(self.tmp_dir, name)
+            with tarfile.open(path, mode) as tar:
+                tar.add(os.path.join(self.tmp_dir, "pages-1.img"), arcname="pages-1.img")
+            page_map = pages.annotate_zero_pages(open_dump(path), _make_page_map())
+            self.assertEqual([(vaddr // PAGE_SIZE, n, f) for vaddr, n, f in page_map.maps], expected)
+
+    def test_mask_chunks(self):
+        chunk_pages = pages.SCAN_CHUNK_PAGES
+        pages.SCAN_CHUNK_PAGES = 3
+        try:
+            data = "".join(chr(p) * PAGE_SIZE for p in PAGES)
+            self.assertEqual(list(pages.zero_page_mask(data, len(PAGES))), [p == 0 for p in PAGES])
+        finally:
+            pages.SCAN_CHUNK_PAGES = chunk_pages
+
+
+def _make_process(pid, ppid, pages_id, vmas_pages, entries, file_vma=None):
+    vmas = vmtable.VmAreaTable(owner=pid)
+    for start_page, end_page in vmas_pages:
+        vmas.append(start=start_page * PAGE_SIZE, end=end_page * PAGE_SIZE, pgoff=0, shmid=0, prot=0x3,
+                    flags=vmtable.names_to_mask(["MAP_PRIVATE", "MAP_ANON"], VMA_MAP_FLAGS), status=0x201, fd=-1)
+    if file_vma is not None:
+        start_page, end_page, pgoff, file_id = file_vma
+        vmas.append(start=start_page * PAGE_SIZE, end=end_page * PAGE_SIZE, pgoff=pgoff, shmid=file_id, prot=0x1,
+                    flags=vmtable.names_to_mask(["MAP_PRIVATE"], VMA_MAP_FLAGS), status=0x41, fd=-1)
+    maps = PageMapEntries()
+    for vaddr_page, nr_pages, flags in entries:
+        maps.append(vaddr_page * PAGE_SIZE, nr_pages, flags)
+    return Process(resource_id=pid, pid=pid, ppid=ppid, pgid=pid, sid=pid, thread_cores=[], core=None, fdt={},
+                   vm_info=None, vmas=vmas, ids={},
+                   page_map=PageMap(resource_id=pid, pages_id=pages_id, maps=maps, parent=None), fs=None)
+
+
+class TestCowPages(unittest.TestCase):
+    def test_annotate(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            # parent pages 0..5 (page value is a value of every byte of the page)
+            # child pages 0..3, 5 and 8, page 2 is changed, page 5 is in another VMA
+            for pages_id, values in ((1, [1, 2, 3, 4, 5, 6]), (2, [1, 2, 7, 4, 6, 9])):
+                with open(os.path.join(tmp_dir, "pages-{}.img".format(pages_id)), "wb") as f:
+                    f.write("".join(chr(v) * PAGE_SIZE for v in values))
+            processes = [_make_process(1, 0, 1, [(0, 4), (4, 8)], [(0, 6, PE_PRESENT)]),
+                         _make_process(2, 1, 2, [(0, 4), (5, 10)], [(0, 4, PE_PRESENT), (5, 1, PE_PRESENT),
+                                                                    (6, 2, PE_LAZY), (8, 1, PE_PRESENT)])]
+
+            page_maps = pages.annotate_cow_pages(DumpDirectory(tmp_dir), processes)
+            self.assertEqual(list(page_maps[1].maps), list(processes[0].page_map.maps))
+            self.assertEqual([(vaddr // PAGE_SIZE, n, f) for vaddr, n, f in page_maps[2].maps],
+                             [(0, 2, PE_PRESENT | PE_COW), (2, 1, PE_PRESENT), (3, 1, PE_PRESENT | PE_COW),
+                              (5, 1, PE_PRESENT), (6, 2, PE_LAZY), (8, 1, PE_PRESENT)])
+
+            # pages of processes without VMAs are not shared
+            for vmas_pages in ([], [(0, 4)]):
+                processes = [_make_process(1, 0, 1, [], [(0, 4, PE_PRESENT)]),
+                             _make_process(2, 1, 2, vmas_pages, [(0, 4, PE_PRESENT)])]
+                page_maps = pages.annotate_cow_pages(DumpDirectory(tmp_dir), processes)
+                self.assertEqual(list(page_maps[2].maps), list(processes[1].page_map.maps))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+class TestFilePages(unittest.TestCase):
+    def test_annotate(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            # file pages 0..3 and a half of page 4, mapping starts from file page 1
+            file_path = os.path.join(tmp_dir, "libfoo.so")
+            with open(file_path, "wb") as f:
+                f.write("".join(chr(v) * PAGE_SIZE for v in [10, 11, 12, 13]) + chr(14) * (PAGE_SIZE // 2))
+            with open(os.path.join(tmp_dir, "pages-1.img"), "wb") as f:
+                f.write("".join(chr(v) * PAGE_SIZE for v in [1, 11, 12, 99, 14]))
+            process = _make_process(1, 0, 1, [(0, 1)], [(0, 1, PE_PRESENT), (20, 4, PE_PRESENT)],
+                                    file_vma=(20, 25, PAGE_SIZE, 5))
+            reg_files = [RegFile(resource_id=5, id=5, path=file_path, size=None, pos=0, flags=[], mode=0)]
+
+            page_map = pages.annotate_file_pages(DumpDirectory(tmp_dir), process, reg_files)
+            self.assertEqual([(vaddr // PAGE_SIZE, n, f) for vaddr, n, f in page_map.maps],
+                             [(0, 1, PE_PRESENT), (20, 2, PE_PRESENT | PE_FILE), (22, 2, PE_PRESENT)])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+""" Fast images decoding testing
+"""
+
+import struct
+import unittest
+from StringIO import StringIO
+
+try:
+    from pycriu import images
+    from crloader import pbdecode
+except ImportError:
+    images = None
+
+
+def _make_image(magic_name, messages):
+    magic = struct.pack('ii', images.magic.by_name['IMG_COMMON'], images.magic.by_name[magic_name])
+    payloads = [m.SerializeToString() for m in messages]
+    return magic + "".join(struct.pack('i', len(p)) + p for p in payloads)
+
+
+def _make_mm_image():
+    mm = images.pb.mm_entry(mm_start_code=0x400000, mm_end_code=0x401000, mm_start_data=0x600000,
+                            mm_end_data=0x601000, mm_start_stack=0x7ffd0000, mm_start_brk=0x602000,
+                            mm_brk=0x623000, mm_arg_start=0x7ffd1000, mm_arg_end=0x7ffd1010,
+                            mm_env_start=0x7ffd1010, mm_env_end=0x7ffd1100, exe_file_id=3, dumpable=True)
+    mm.mm_saved_auxv.extend([33, 0x7ffd2000, 0, 0])
+    mm.vmas.add(start=0x400000, end=0x401000, pgoff=0, shmid=3, prot=5, flags=0x2, status=0x41, fd=-1)
+    mm.vmas.add(start=0x7f0000000000, end=0x7f0000004000, pgoff=0, shmid=0, prot=3, flags=0x22, status=0x201,
+                fd=-1, fdflags=2)
+    return _make_image('MM', [mm])
+
+
+def _make_pagemap_image():
+    messages = [images.pb.pagemap_head(pages_id=7),
+                images.pb.pagemap_entry(vaddr=0x400000, nr_pages=1, flags=1),
+                images.pb.pagemap_entry(vaddr=0x600000, nr_pages=2, in_parent=True),
+                images.pb.pagemap_entry(vaddr=0x7f0000000000, nr_pages=4)]
+    return _make_image('PAGEMAP', messages)
+
+
+@unittest.skipIf(images is None, "pycriu is not installed")
+class TestFastDecoders(unittest.TestCase):
+    def assertDecodedAsPycriu(self, decoded, expected):
+        """ Decoded values are the same, as in not pretty pycriu output
+        """
+        self.assertEqual(len(decoded), len(expected))
+        for d, e in zip(decoded, expected):
+            for field, value in d.iteritems():
+                if isinstance(value, list) and value and isinstance(value[0], dict):
+                    self.assertDecodedAsPycriu(value, e[field])
+                else:
+                    self.assertEqual(value, e.get(field), field)
+
+    def test_mm(self):
+        image = _make_mm_image()
+        item = pbdecode.load(StringIO(image))
+        self.assertEqual(item['magic'], 'MM')
+
+        mm = item['entries'][0]
+        self.assertEqual(mm['mm_saved_auxv'], [33, 0x7ffd2000, 0, 0])
+        self.assertEqual([(v['start'], v['fdflags']) for v in mm['vmas']], [(0x400000, None), (0x7f0000000000, 2)])
+        self.assertDecodedAsPycriu(item['entries'], images.load(StringIO(image))['entries'])
+
+    def test_pagemap(self):
+        image = _make_pagemap_image()
+        item = pbdecode.load(StringIO(image))
+        item['entries'] = list(item['entries'])
+        self.assertEqual(item['magic'], 'PAGEMAP')
+        self.assertEqual(item['entries'], [{'pages_id': 7},
+                                           {'vaddr': 0x400000, 'nr_pages': 1, 'flags': 1},
+                                           {'vaddr': 0x600000, 'nr_pages': 2, 'in_parent': True},
+                                           {'vaddr': 0x7f0000000000, 'nr_pages': 4}])
+        self.assertDecodedAsPycriu(item['entries'], images.load(StringIO(image))['entries'])
+
+    def test_truncated(self):
+        image = _make_pagemap_image()
+        # entries are decoded lazily, so truncated image fails, when entries are iterated
+        item = pbdecode.load(StringIO(image[:-1]))
+        self.assertRaises(ValueError, list, item['entries'])
+        self.assertRaises(ValueError, pbdecode.load, StringIO(_make_mm_image()[:-1]))
+
+        # image is shorter than its magic
+        self.assertRaises(images.MagicException, pbdecode.load, StringIO(image[:6]))
+        self.assertRaises(images.MagicException, pbdecode.read_magic, StringIO(""))
+
+    def test_pretty(self):
+        # all fields are pretty printed, as crit does
+        image = _make_mm_image()
+        self.assertEqual(pbdecode.load_pretty(StringIO(image)), images.load(StringIO(image), True))
+
+        self.assertRaises(ValueError, pbdecode.load_pretty, StringIO(image[:-1]))
+        self.assertRaises(images.MagicException, pbdecode.load_pretty, StringIO(image[:6]))
+
+    def test_other_images(self):
+        # images without fast decoders are loaded by pycriu
+        image = _make_image('INVENTORY', [images.pb.inventory_entry(img_version=2)])
+        item = pbdecode.load(StringIO(image))
+        self.assertEqual(item, images.load(StringIO(image), True))
+        self.assertEqual(pbdecode.read_magic(StringIO(image)), 'INVENTORY')
+
+
+if __name__ == '__main__':
+    unittest.main()
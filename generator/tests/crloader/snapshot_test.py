@@ -0,0 +1,103 @@
+""" Snapshot cache testing
+"""
+
+import cPickle as pickle
+import os
+import shutil
+import tempfile
+import unittest
+
+from crloader import snapshot
+from crloader.crdata import Application
+from crloader.dumpsource import DumpDirectory
+
+
+def _make_application(nr_files=0):
+    return Application(processes=[], regular_files=range(nr_files), pipe_files=[], pipe_data=[], shared_anon_mem=[])
+
+
+class TestSnapshotCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, "cache")
+        self.dumps = [self._make_dump("dump{}".format(i)) for i in xrange(2)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _make_dump(self, name):
+        path = os.path.join(self.tmp_dir, name)
+        os.mkdir(path)
+        with open(os.path.join(path, "pstree.img"), "wb") as f:
+            f.write("pstree")
+        return path
+
+    def _snapshots(self):
+        return [n for n in os.listdir(self.cache_dir) if n.endswith(snapshot.SNAPSHOT_FILE_EXT)]
+
+    def test_hit(self):
+        cache = snapshot.SnapshotCache(self.cache_dir)
+        self.assertIsNone(cache.get(DumpDirectory(self.dumps[0]), "img"))
+
+        cache.put(DumpDirectory(self.dumps[0]), "img", _make_application(3))
+        app = cache.get(DumpDirectory(self.dumps[0]), "img")
+        self.assertEqual(app.regular_files, [0, 1, 2])
+        self.assertIsNone(cache.get(DumpDirectory(self.dumps[0]), "json"))
+        self.assertIsNone(cache.get(DumpDirectory(self.dumps[1]), "img"))
+
+    def test_invalidation(self):
+        cache = snapshot.SnapshotCache(self.cache_dir)
+        cache.put(DumpDirectory(self.dumps[0]), "img", _make_application())
+
+        with open(os.path.join(self.dumps[0], "pstree.img"), "ab") as f:
+            f.write("changed")
+        self.assertIsNone(cache.get(DumpDirectory(self.dumps[0]), "img"))
+
+        # outdated snapshot of the same dump is replaced
+        cache.put(DumpDirectory(self.dumps[0]), "img", _make_application())
+        self.assertEqual(len(self._snapshots()), 1)
+
+    def test_version(self):
+        cache = snapshot.SnapshotCache(self.cache_dir)
+        cache.put(DumpDirectory(self.dumps[0]), "img", _make_application())
+
+        version = snapshot.SNAPSHOT_FORMAT_VERSION
+        snapshot.SNAPSHOT_FORMAT_VERSION = version + 1
+        try:
+            self.assertIsNone(cache.get(DumpDirectory(self.dumps[0]), "img"))
+        finally:
+            snapshot.SNAPSHOT_FORMAT_VERSION = version
+
+    def test_broken_snapshot(self):
+        cache = snapshot.SnapshotCache(self.cache_dir)
+        source = DumpDirectory(self.dumps[0])
+        cache.put(source, "img", _make_application())
+
+        snapshot_path = os.path.join(self.cache_dir, self._snapshots()[0])
+        # snapshot, which refers to the class, which does not exist anymore
+        for contents in ("cnot_existing_module\nApplication\n.", "ccrloader.crdata\nNotExistingClass\n.", "garbage"):
+            with open(snapshot_path, "wb") as f:
+                f.write(contents)
+            self.assertIsNone(cache.get(source, "img"))
+
+    def test_failed_put(self):
+        cache = snapshot.SnapshotCache(self.cache_dir)
+        with self.assertRaises(pickle.PicklingError):
+            cache.put(DumpDirectory(self.dumps[0]), "img", lambda: None)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_eviction(self):
+        cache = snapshot.SnapshotCache(self.cache_dir, max_size=1)
+        cache.put(DumpDirectory(self.dumps[0]), "img", _make_application())
+        old_snapshot = self._snapshots()
+        os.utime(os.path.join(self.cache_dir, old_snapshot[0]), (1, 1))
+
+        # the newest snapshot is kept, even if it is bigger than the max size
+        cache.put(DumpDirectory(self.dumps[1]), "img", _make_application())
+        self.assertEqual(len(self._snapshots()), 1)
+        self.assertNotEqual(self._snapshots(), old_snapshot)
+        self.assertIsNotNone(cache.get(DumpDirectory(self.dumps[1]), "img"))
+
+
+if __name__ == '__main__':
+    unittest.main()
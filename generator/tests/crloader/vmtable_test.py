@@ -0,0 +1,65 @@
+""" Compact VMA table testing
+"""
+
+import unittest
+
+from crloader import vmtable
+from crloader.crconstants import *
+from crloader.vmtable import VMA_RESOURCE_KIND, VmAreaTable, mask_to_names, names_to_mask
+
+
+def _make_table():
+    table = VmAreaTable(owner=42)
+    table.append(0x1000, 0x3000, 0, 0,
+                 prot=0x1 | 0x2, flags=0x2 | 0x20, status=0x1 | 0x200, fd=-1)
+    table.append(0x3000, 0x4000, 0x1000, 7,
+                 prot=0x1 | 0x4, flags=0x2, status=0x1 | 0x40, fd=-1, fdflags=0x8000)
+    table.append(0x8000, 0x9000, 0, 9,
+                 prot=0x1, flags=0x1 | 0x20, status=0x1 | 0x100, fd=-1)
+    return table
+
+
+class TestVmAreaTable(unittest.TestCase):
+    def test_masks(self):
+        self.assertEqual(names_to_mask([VMA_FLAG_MAP_SHARED, VMA_FLAG_MAP_ANON], VMA_MAP_FLAGS), 0x21)
+        self.assertEqual(mask_to_names(0x21, VMA_MAP_FLAGS), {VMA_FLAG_MAP_SHARED, VMA_FLAG_MAP_ANON})
+        self.assertEqual(mask_to_names(0x1 | 0x4000, VMA_MAP_FLAGS), {VMA_FLAG_MAP_SHARED, "0x4000"})
+        self.assertEqual(mask_to_names(0, VMA_MAP_FLAGS), set())
+
+    def test_materialize(self):
+        table = _make_table()
+        vma = table.vma(1)
+        self.assertIs(vma, table.vma(1))
+        self.assertEqual((vma.resource_id, vma.start, vma.end, vma.pgoff, vma.shmid),
+                         ((VMA_RESOURCE_KIND, 42, 1), 0x3000, 0x4000, 0x1000, 7))
+        self.assertEqual(vma.prot, {'PROT_READ', 'PROT_EXEC'})
+        self.assertEqual(vma.flags, {VMA_FLAG_MAP_PRIVATE})
+        self.assertEqual(vma.status, {VMA_STATUS_AREA_REGULAR, VMA_STATUS_FILE_PRIVATE})
+        self.assertEqual(vma.fdflags, 0x8000)
+        self.assertIsNone(table.vma(0).fdflags)
+        self.assertEqual([v.start for v in table], [0x1000, 0x3000, 0x8000])
+
+    def test_select(self):
+        self._check_select()
+
+        numpy = vmtable.numpy
+        vmtable.numpy = None
+        try:
+            self._check_select()
+        finally:
+            vmtable.numpy = numpy
+
+    def _check_select(self):
+        table = _make_table()
+        self.assertEqual(table.select(), [0, 1, 2])
+        self.assertEqual(table.select(flags=[VMA_FLAG_MAP_PRIVATE]), [0, 1])
+        self.assertEqual(table.select(flags=[VMA_FLAG_MAP_SHARED]), [2])
+        self.assertEqual(table.select(flags=[VMA_FLAG_MAP_ANON],
+                                      status=[VMA_STATUS_ANON_PRIVATE, VMA_STATUS_FILE_PRIVATE]), [0])
+        self.assertEqual(table.select(prot=['PROT_EXEC'], flags=[VMA_FLAG_MAP_SHARED]), [])
+        self.assertEqual(VmAreaTable().select(flags=[VMA_FLAG_MAP_SHARED]), [])
+        self.assertEqual(VmAreaTable().select(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
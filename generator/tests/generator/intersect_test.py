@@ -0,0 +1,73 @@
+""" Page map and VMAs intersection testing
+"""
+
+import random
+import unittest
+
+from crloader.crconstants import PAGE_SIZE
+from generator.intersect import intersect
+
+
+def _intersect_by_pages(vmas, entries):
+    """ Page by page intersection: list of (vma index, vma_pgoff, dump_pgoff) for every page
+    """
+    pages = []
+    dump_pgoff = 0
+    for vaddr, nr_pages in entries:
+        for i in range(nr_pages):
+            page = vaddr // PAGE_SIZE + i
+            for vma, (start, end) in enumerate(vmas):
+                if start <= page < end:
+                    pages.append((vma, page - start, dump_pgoff + i))
+        dump_pgoff += nr_pages
+    return pages
+
+
+def _make_ranges(rnd, count):
+    """
+    :return: sorted not overlapping (start page, end page) ranges
+    """
+    ranges, pos = [], 0
+    for _ in range(count):
+        pos += rnd.randint(0, 5)
+        size = rnd.randint(1, 6)
+        ranges.append((pos, pos + size))
+        pos += size
+    return ranges
+
+
+class TestIntersect(unittest.TestCase):
+    def test_simple(self):
+        # entry spans two VMAs and the gap between them
+        runs = intersect([0, 4 * PAGE_SIZE], [2 * PAGE_SIZE, 8 * PAGE_SIZE], [PAGE_SIZE], [5], [10])
+        self.assertEqual(runs.tolist(), [[0, 1, 10, 1], [1, 0, 13, 2]])
+
+    def test_skip_flags(self):
+        runs = intersect([0, 4 * PAGE_SIZE], [4 * PAGE_SIZE, 8 * PAGE_SIZE],
+                         [0, 2 * PAGE_SIZE, 4 * PAGE_SIZE], [2, 2, 4], [0, 2, 4],
+                         flags=[0x4, 0x104, 0x104], vma_skip_flags=[0x100, 0])
+        self.assertEqual(runs.tolist(), [[0, 0, 0, 2], [1, 0, 4, 4]])
+
+    def test_high_addresses(self):
+        # vsyscall VMA is above 2^63
+        vsyscall = 0xffffffffff600000
+        runs = intersect([PAGE_SIZE, vsyscall], [2 * PAGE_SIZE, vsyscall + PAGE_SIZE],
+                         [PAGE_SIZE, vsyscall], [1, 1], [0, 1])
+        self.assertEqual(runs.tolist(), [[0, 0, 0, 1], [1, 0, 1, 1]])
+
+    def test_random(self):
+        rnd = random.Random(42)
+        for _ in range(200):
+            vmas = _make_ranges(rnd, rnd.randint(0, 8))
+            entries = [(start * PAGE_SIZE, end - start) for start, end in _make_ranges(rnd, rnd.randint(0, 8))]
+            dump_pgoffs = [sum(n for _, n in entries[:i]) for i in range(len(entries))]
+
+            runs = intersect([s * PAGE_SIZE for s, _ in vmas], [e * PAGE_SIZE for _, e in vmas],
+                             [v for v, _ in entries], [n for _, n in entries], dump_pgoffs)
+            pages = [(vma, vma_pgoff + i, dump_pgoff + i)
+                     for vma, vma_pgoff, dump_pgoff, count in runs.tolist() for i in range(count)]
+            self.assertEqual(pages, _intersect_by_pages(vmas, entries))
+
+
+if __name__ == '__main__':
+    unittest.main()
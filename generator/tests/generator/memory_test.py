@@ -0,0 +1,81 @@
+""" Memory filling planning testing
+"""
+
+import unittest
+
+from crloader import vmtable
+from crloader.crconstants import PAGE_SIZE, PE_COW, PE_PRESENT, PE_ZERO, VMA_STATUS_FLAGS, VMA_MAP_FLAGS
+from crloader.crdata import PageMap
+from crloader.pagemap import PageMapEntries
+from generator import intersect
+from generator.memory import plan_page_fills
+
+
+def _append_vma(vmas, start_page, end_page, status):
+    vmas.append(start=start_page * PAGE_SIZE, end=end_page * PAGE_SIZE, pgoff=0, shmid=0, prot=0x3,
+                flags=vmtable.names_to_mask(["MAP_PRIVATE"], VMA_MAP_FLAGS),
+                status=vmtable.names_to_mask(["VMA_AREA_REGULAR", status], VMA_STATUS_FLAGS), fd=-1)
+
+
+class TestPageFills(unittest.TestCase):
+    def test_zero_pages_skipped(self):
+        vmas = vmtable.VmAreaTable(owner=10)
+        _append_vma(vmas, 0, 4, "VMA_ANON_PRIVATE")
+        _append_vma(vmas, 4, 8, "VMA_FILE_PRIVATE")
+        maps = PageMapEntries()
+        for vaddr_page, nr_pages, flags in ((0, 1, PE_PRESENT), (1, 2, PE_PRESENT | PE_ZERO),
+                                            (3, 2, PE_PRESENT), (5, 2, PE_PRESENT | PE_ZERO)):
+            maps.append(vaddr_page * PAGE_SIZE, nr_pages, flags)
+        page_map = PageMap(resource_id=1, pages_id=7, maps=maps, parent=None)
+
+        commands = plan_page_fills(10, vmas, page_map)
+        # zero pages of file mapping are copied: file contents are not zeros
+        self.assertEqual([(c["vma_id"][2], c["vma_pgoff"], c["nr_pages"], c["dump_pgoff"]) for c in commands],
+                         [(0, 0, 1, 0), (0, 3, 1, 3), (1, 0, 1, 4), (1, 1, 2, 5)])
+
+        # vectorized planning gives the same commands as planning VMA by VMA
+        numpy = intersect.numpy
+        intersect.numpy = None
+        try:
+            self.assertEqual(plan_page_fills(10, vmas, page_map), commands)
+        finally:
+            intersect.numpy = numpy
+
+    def test_high_addresses(self):
+        vmas = vmtable.VmAreaTable(owner=10)
+        _append_vma(vmas, 0x400, 0x402, "VMA_ANON_PRIVATE")
+        # vsyscall VMA (0xffffffffff600000), its address does not fit into int64
+        vsyscall_page = 0xffffffffff600
+        _append_vma(vmas, vsyscall_page, vsyscall_page + 1, "VMA_ANON_PRIVATE")
+        maps = PageMapEntries()
+        maps.append(0x400 * PAGE_SIZE, 2, PE_PRESENT)
+        maps.append(vsyscall_page * PAGE_SIZE, 1, PE_PRESENT)
+        page_map = PageMap(resource_id=1, pages_id=7, maps=maps, parent=None)
+
+        commands = plan_page_fills(10, vmas, page_map)
+        self.assertEqual([(c["vma_id"][2], c["vma_pgoff"], c["nr_pages"], c["dump_pgoff"]) for c in commands],
+                         [(0, 0, 2, 0), (1, 0, 1, 2)])
+
+        numpy = intersect.numpy
+        intersect.numpy = None
+        try:
+            self.assertEqual(plan_page_fills(10, vmas, page_map), commands)
+        finally:
+            intersect.numpy = numpy
+
+    def test_cow_pages_filled(self):
+        vmas = vmtable.VmAreaTable(owner=10)
+        _append_vma(vmas, 0, 4, "VMA_ANON_PRIVATE")
+        maps = PageMapEntries()
+        maps.append(0, 2, PE_PRESENT)
+        maps.append(2 * PAGE_SIZE, 2, PE_PRESENT | PE_COW)
+        page_map = PageMap(resource_id=1, pages_id=7, maps=maps, parent=None)
+
+        # pages, shared with the parent, are not inherited yet
+        commands = plan_page_fills(10, vmas, page_map)
+        self.assertEqual([(c["vma_pgoff"], c["nr_pages"], c["dump_pgoff"]) for c in commands],
+                         [(0, 2, 0), (2, 2, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
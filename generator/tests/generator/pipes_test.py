@@ -0,0 +1,63 @@
+""" Pipe buffers refill planning testing
+"""
+
+import os
+import unittest
+
+from crloader.crconstants import FILE_RDONLY_FLAG, FILE_WRONLY_FLAG
+from crloader.crdata import Application, PipeData, PipeFile, Process
+from generator.pipes import plan_pipe_refills
+
+
+def _make_process(pid, fdt):
+    return Process(resource_id=pid, pid=pid, ppid=0, pgid=pid, sid=pid, thread_cores=[], core=None,
+                   fdt=fdt, vm_info=None, vmas=None, ids={}, page_map=None, fs=None)
+
+
+def _make_pipe_file(file_id, pipe_id, flags):
+    return PipeFile(resource_id=file_id, id=file_id, pipe_id=pipe_id, flags=flags, fown=None)
+
+
+def _make_pipe_data(pipe_id, offset, length, image_path="/dump/pipes-data.img"):
+    return PipeData(resource_id=pipe_id, pipe_id=pipe_id, pipe_size=None,
+                    image_path=image_path, offset=offset, length=length)
+
+
+class TestPipeRefills(unittest.TestCase):
+    def test_plan(self):
+        pipe_files = [_make_pipe_file(1, 100, FILE_RDONLY_FLAG), _make_pipe_file(2, 100, FILE_WRONLY_FLAG),
+                      _make_pipe_file(3, 200, FILE_RDONLY_FLAG), _make_pipe_file(4, 300, FILE_RDONLY_FLAG)]
+        processes = [_make_process(10, {0: 1, 5: 3}), _make_process(11, {4: 2, 7: 4})]
+        app = Application(processes=processes, regular_files=[], pipe_files=pipe_files, shared_anon_mem=[],
+                          pipe_data=[_make_pipe_data(100, 12, 3 << 20), _make_pipe_data(200, 3145752, 17),
+                                     _make_pipe_data(300, 3145781, 0)])
+
+        commands = plan_pipe_refills(app)
+        # write end is preferred, read end is used if there is no writer
+        self.assertEqual([(c["pid"], c["fd"], c["fd_is_write_end"]) for c in commands],
+                         [(11, 4, True), (10, 5, False)])
+        self.assertEqual([(c["offset"], c["length"]) for c in commands], [(12, 3 << 20), (3145752, 17)])
+
+    def test_write_end_flags(self):
+        pipe_files = [_make_pipe_file(1, 100, FILE_RDONLY_FLAG | os.O_NONBLOCK),
+                      _make_pipe_file(2, 100, FILE_WRONLY_FLAG | os.O_NONBLOCK)]
+        app = Application(processes=[_make_process(10, {0: 1, 1: 2})], regular_files=[], pipe_files=pipe_files,
+                          shared_anon_mem=[], pipe_data=[_make_pipe_data(100, 12, 1)])
+        self.assertEqual([(c["fd"], c["fd_is_write_end"]) for c in plan_pipe_refills(app)], [(1, True)])
+
+    def test_not_spliced(self):
+        # data of json images and archives has no location in the image file
+        app = Application(processes=[_make_process(10, {1: 2})], regular_files=[],
+                          pipe_files=[_make_pipe_file(2, 100, FILE_WRONLY_FLAG)], shared_anon_mem=[],
+                          pipe_data=[_make_pipe_data(100, None, 17, image_path=None)])
+        self.assertEqual(plan_pipe_refills(app), [])
+
+    def test_no_holder(self):
+        app = Application(processes=[_make_process(10, {})], regular_files=[],
+                          pipe_files=[_make_pipe_file(1, 100, FILE_RDONLY_FLAG)], shared_anon_mem=[],
+                          pipe_data=[_make_pipe_data(100, 12, 1)])
+        self.assertRaises(RuntimeError, plan_pipe_refills, app)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,9 +7,9 @@ import unittest
 import pyutils.graph as g
 
 
-def _generate_acyclic_graph(node_cnt=100):
+def _generate_acyclic_graph(node_cnt=100, graph_type=g.DirectedGraph):
     nodes = range(node_cnt)
-    graph = g.DirectedGraph()
+    graph = graph_type()
 
     for node in nodes:
         graph.add_vertex(node)
@@ -43,6 +43,92 @@ class TestDirectedGraph(unittest.TestCase):
         graph = _generate_acyclic_graph(node_cnt=graph_size)
         buckets = g.bucket_top_sort(graph)
 
+    def test_top_sort_order(self):
+        graph = _generate_acyclic_graph(node_cnt=100)
+        position = {v: i for i, v in enumerate(g.topological_sort(graph))}
+        for v, u in graph.edges_iter:
+            self.assertLess(position[v], position[u])
+
+    def test_cycle(self):
+        graph = g.make_cycle_graph(range(5))
+        graph.add_vertex(5)
+        graph.add_edge(5, 0)
+        with self.assertRaises(g.GraphIsNotAcyclic) as ctx:
+            list(g.topological_sort(graph))
+        self.assertEqual(sorted(ctx.exception.cycle), range(5))
+
+    def test_deep_chain(self):
+        depth = 20000
+        graph = g.make_chain_graph(range(depth))
+        self.assertEqual(list(g.topological_sort(graph)), range(depth))
+        self.assertEqual(g.bucket_top_sort(graph)[depth - 1], [depth - 1])
+
+        visits = []
+        graph.dfs_from(0, pre_visit=lambda v: visits.append(("pre", v)),
+                       post_visit=lambda v: visits.append(("post", v)))
+        self.assertEqual(visits, [("pre", v) for v in range(depth)] + [("post", v) for v in reversed(range(depth))])
+
+    def test_dfs_visits(self):
+        graph = g.make_chain_graph(["a", "b"])
+        graph.add_vertex("c")
+        graph.add_edge("a", "c")
+        graph.add_edge("c", "b")
+        pre, post = [], []
+        graph.dfs_from("a", pre_visit=pre.append, post_visit=post.append)
+        # pre_visit is invoked for already visited vertices too
+        self.assertEqual(sorted(pre), ["a", "b", "b", "c"])
+        self.assertEqual(post[-1], "a")
+        self.assertLess(post.index("b"), post.index("c"))
+
+
+class TestCsrGraph(unittest.TestCase):
+    def test_same_as_directed_graph(self):
+        graph = _generate_acyclic_graph(node_cnt=150)
+        compact = g.CsrGraph.from_graph(graph)
+
+        self.assertEqual(compact.vertex_num, graph.vertex_num)
+        self.assertEqual(compact.edges_num, graph.edges_num)
+        self.assertEqual(set(compact.edges_iter), set(graph.edges_iter))
+        for v in graph.vertices_iter:
+            self.assertEqual(sorted(compact.vertex_neighbours(v)), sorted(graph.vertex_neighbours(v)))
+        self.assertEqual(g.bucket_top_sort(compact), g.bucket_top_sort(graph))
+
+    def test_top_sort(self):
+        graph = _generate_acyclic_graph(node_cnt=200, graph_type=g.CsrGraph)
+        position = {v: i for i, v in enumerate(g.topological_sort(graph))}
+        self.assertEqual(len(position), graph.vertex_num)
+        for v, u in graph.edges_iter:
+            self.assertLess(position[v], position[u])
+
+    def test_seal(self):
+        graph = g.CsrGraph()
+        for v in "abcd":
+            graph.add_vertex(v)
+        graph.add_edge("a", "c")
+        graph.add_edge("d", "a")
+        graph.add_edge("a", "b")
+        graph.add_edge("a", "c")
+        self.assertFalse(graph.sealed)
+
+        # the first query seals the graph
+        self.assertEqual(graph.vertex_neighbours("a"), ["b", "c"])
+        self.assertTrue(graph.sealed)
+        self.assertEqual(graph.edges_num, 3)
+        self.assertEqual(list(graph.neighbour_indices(graph.vertex_index("d"))), [0])
+        self.assertEqual(graph.vertex_at(3), "d")
+        self.assertRaises(RuntimeError, graph.add_edge, "a", "d")
+        self.assertRaises(RuntimeError, graph.add_vertex, "e")
+
+    def test_errors(self):
+        graph = g.CsrGraph()
+        graph.add_vertex(1)
+        self.assertRaises(g.DirectedGraph.VertexAlreadyExists, graph.add_vertex, 1)
+        self.assertRaises(g.DirectedGraph.NoSuchVertex, graph.add_edge, 1, 2)
+        self.assertRaises(g.DirectedGraph.NoSuchVertex, graph.vertex_neighbours, 2)
+
+        cycle = g.CsrGraph.from_graph(g.make_cycle_graph(range(3)))
+        self.assertRaises(g.GraphIsNotAcyclic, g.topological_sort, cycle)
+
 
 if __name__ == '__main__':
     unittest.main()
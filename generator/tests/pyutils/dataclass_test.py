@@ -0,0 +1,105 @@
+""" Data classes testing
+"""
+
+import cPickle as pickle
+import copy
+import unittest
+
+from pyutils.dataclass import (DataClass, DuplicateFieldInit, FieldsNotInitialized, ImmutableFieldChange,
+                               UnknownFieldSpecified, BadInitArgument)
+
+
+class Base(DataClass):
+    id = "id"
+
+
+class Point(Base):
+    x = "x coordinate"
+    y = "y coordinate"
+
+
+class Empty(DataClass):
+    pass
+
+
+class Value(DataClass):
+    _value_semantics = True
+
+    name = "name"
+    items = "list of items"
+
+
+class NamedValue(Value):
+    title = "title"
+
+
+class TestDataClass(unittest.TestCase):
+    def test_init(self):
+        p = Point(id=1, x=2, y=3)
+        self.assertEqual((p.id, p.x, p.y), (1, 2, 3))
+        self.assertEqual(repr(Empty()), "Empty()")
+
+    def test_init_errors(self):
+        self.assertRaises(FieldsNotInitialized, Point, id=1, x=2)
+        self.assertRaises(UnknownFieldSpecified, Point, id=1, x=2, z=3)
+        self.assertRaises(UnknownFieldSpecified, Point, id=1, x=2, y=3, z=4)
+        self.assertRaises(UnknownFieldSpecified, Empty, z=1)
+        self.assertRaises(FieldsNotInitialized, Point, Base(id=1), x=2)
+        self.assertRaises(DuplicateFieldInit, Point, Base(id=1), id=2, x=2, y=3)
+        self.assertRaises(BadInitArgument, Point, Point(id=1, x=2, y=3))
+
+    def test_base_init(self):
+        p = Point(Base(id=1), x=2, y=3)
+        self.assertEqual((p.id, p.x, p.y), (1, 2, 3))
+
+    def test_immutable(self):
+        p = Point(id=1, x=2, y=3)
+        with self.assertRaises(ImmutableFieldChange):
+            p.x = 5
+        self.assertEqual(p.x, 2)
+
+    def test_identity_semantics(self):
+        self.assertNotEqual(Point(id=1, x=2, y=3), Point(id=1, x=2, y=3))
+        self.assertEqual(len({Point(id=1, x=2, y=3), Point(id=1, x=2, y=3)}), 2)
+
+    def test_value_semantics(self):
+        a, b = Value(name="a", items=[1, 2]), Value(name="a", items=[1, 2])
+        self.assertEqual(a, b)
+        self.assertFalse(a != b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertEqual(len({a, b}), 1)
+        self.assertNotEqual(a, Value(name="a", items=[2, 1]))
+        self.assertNotEqual(a, NamedValue(name="a", items=[1, 2], title="t"))
+        self.assertEqual(NamedValue(Value(name="a", items=[]), title="t"), NamedValue(name="a", items=[], title="t"))
+
+    def test_value_fields_frozen(self):
+        a = Value(name="a", items=[1, [2], {3}])
+        self.assertEqual(a.items, (1, (2,), frozenset([3])))
+        self.assertEqual(a, Value(name="a", items=(1, (2,), frozenset([3]))))
+        self.assertEqual(NamedValue(Value(name="a", items=[1]), title="t").items, (1,))
+        with self.assertRaises(ImmutableFieldChange):
+            a.name = "b"
+
+    def test_pickle(self):
+        p = Point(id=1, x=[2], y=3)
+        for protocol in xrange(pickle.HIGHEST_PROTOCOL + 1):
+            restored = pickle.loads(pickle.dumps(p, protocol))
+            self.assertIs(type(restored), Point)
+            self.assertEqual((restored.id, restored.x, restored.y), (1, [2], 3))
+            with self.assertRaises(ImmutableFieldChange):
+                restored.x = 5
+        self.assertEqual(p.__getstate__(), tuple(getattr(p, f) for f in Point._fields))
+        self.assertIsNot(copy.deepcopy(p).x, p.x)
+        self.assertRaises(ValueError, Point.__new__(Point).__setstate__, (1, 2))
+
+    def test_pickle_value_hash(self):
+        a = Value(name="a", items=[1])
+        hash(a)
+        restored = pickle.loads(pickle.dumps(a, pickle.HIGHEST_PROTOCOL))
+        self.assertRaises(AttributeError, object.__getattribute__, restored, "_hash")
+        self.assertEqual(restored, a)
+        self.assertEqual(hash(restored), hash(a))
+
+
+if __name__ == '__main__':
+    unittest.main()